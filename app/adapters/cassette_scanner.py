@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner, ScanImageProfile
+from app.db.schemas import ExpenseCreate
+from app.utils.image_hashing import sha256_hex
+from app.utils.logger import get_logger
+from app.utils.scan_usage import collect_scan_usage, report_usage
+
+"""
+Record/replay scanner adapter for deterministic offline benchmarks and load tests.
+In record mode, scans go to a real provider and each answer and its latency are appended to a
+cassette (JSON lines) keyed by the SHA-256 of the image sent. In replay mode, the recorded answer
+is returned after the recorded latency (times time_scale) without any network access.
+"""
+
+logger = get_logger(__name__)
+
+
+class CassetteScanner(ReceiptScanner):
+    # Parsed cassettes by path, reloaded when the file changes
+    _cassettes: Dict[str, tuple] = {}
+    _write_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = 'replay',
+        inner: Optional[Callable[[], ReceiptScanner]] = None,
+        scan_profile: Optional[ScanImageProfile] = None,
+        time_scale: float = 1.0,
+    ):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Recording needs a provider scanner")
+        self.path = path
+        self.mode = mode
+        self._inner = inner
+        # Same preprocessing as the recorded provider, so replayed images hash the same
+        self.scan_profile = scan_profile
+        self.time_scale = time_scale
+
+    def _load(self) -> tuple:
+        """(entries by hash, entries in recording order) of the cassette file."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}, []
+        cached = CassetteScanner._cassettes.get(self.path)
+        if cached is None or cached[0] != mtime:
+            entries = []
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+            cached = (mtime, {entry['hash']: entry for entry in entries}, entries)
+            CassetteScanner._cassettes[self.path] = cached
+        return cached[1], cached[2]
+
+    def scan_receipt(self, image_path: str) -> ExpenseCreate:
+        return asyncio.run(self.scan_image_async(ReceiptImage(image_path)))
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        image_hash = sha256_hex(image.read())
+        if self.mode == 'record':
+            return await self._record(image, image_hash)
+        return await self._replay(image, image_hash)
+
+    async def _record(self, image: ReceiptImage, image_hash: str) -> ExpenseCreate:
+        start = time.monotonic()
+        # Capture the provider's usage for the cassette, then hand it on to the surrounding scan
+        with collect_scan_usage() as usage:
+            result = await self._inner().scan_image_async(image)
+        latency = time.monotonic() - start
+        report_usage(usage.provider, usage.model, usage.input_tokens, usage.output_tokens)
+
+        entry = {
+            'hash': image_hash,
+            'provider': usage.provider,
+            'model': usage.model,
+            'latency': round(latency, 4),
+            'input_tokens': usage.input_tokens,
+            'output_tokens': usage.output_tokens,
+            'result': result.model_dump(mode='json', exclude={'receipt_image_path'}),
+        }
+        line = json.dumps(entry) + '\n'
+        await asyncio.to_thread(self._append, line)
+        return result
+
+    def _append(self, line: str) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with CassetteScanner._write_lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    async def _replay(self, image: ReceiptImage, image_hash: str) -> ExpenseCreate:
+        by_hash, entries = self._load()
+        if not entries:
+            raise RuntimeError(f"Scan cassette {self.path} is empty or missing; record one first")
+
+        entry = by_hash.get(image_hash)
+        if entry is None:
+            # Unknown image (e.g. generated load test uploads): a recorded answer picked by the
+            # image hash, so the same image always replays the same way
+            entry = random.Random(image_hash).choice(entries)
+            logger.debug(f"Cassette miss for {image.path}, replaying a recorded scan")
+
+        if self.time_scale > 0:
+            await asyncio.sleep(entry['latency'] * self.time_scale)
+        report_usage(entry['provider'], entry['model'], entry['input_tokens'], entry['output_tokens'])
+        return ExpenseCreate(**entry['result'], receipt_image_path=image.path)
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner, ScanImageProfile
+from app.db.schemas import ExpenseCreate
+from app.core.config import settings
+from app.utils.ai_parsing import AIResponseParseError
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.logger import get_logger
+
+"""
+Scanner adapter that guards providers with circuit breakers and walks a fallback chain,
+so scans fail fast (or move on to the next provider) while a provider is down or rate-limiting.
+"""
+
+logger = get_logger(__name__)
+
+
+class FallbackScanner(ReceiptScanner):
+    # One breaker per provider name; scanners are created per scan, so the state is shared
+    _breakers: Dict[str, CircuitBreaker] = {}
+    # Global per-provider scan limits, keyed by provider -> (event loop, semaphore)
+    _semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+    def __init__(self, providers: List[str], factory: Callable[[str], ReceiptScanner]):
+        self.providers = providers
+        self._factory = factory
+        self._scanners: Dict[str, ReceiptScanner] = {}
+
+    @staticmethod
+    def get_breaker(provider: str) -> CircuitBreaker:
+        if provider not in FallbackScanner._breakers:
+            FallbackScanner._breakers[provider] = CircuitBreaker(
+                provider,
+                window_size=settings.SCAN_BREAKER_WINDOW_SIZE,
+                min_calls=settings.SCAN_BREAKER_MIN_CALLS,
+                failure_rate=settings.SCAN_BREAKER_FAILURE_RATE,
+                slow_call_seconds=settings.SCAN_BREAKER_SLOW_CALL_SECONDS,
+                open_seconds=settings.SCAN_BREAKER_OPEN_SECONDS,
+            )
+        return FallbackScanner._breakers[provider]
+
+    @staticmethod
+    def get_semaphore(provider: str) -> asyncio.Semaphore:
+        """Return the semaphore bounding concurrent calls to a provider on the running loop."""
+        loop = asyncio.get_running_loop()
+        entry = FallbackScanner._semaphores.get(provider)
+        # Semaphores are bound to the loop they were first awaited on, so recreate per loop
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(max(1, settings.SCAN_MAX_CONCURRENCY)))
+            FallbackScanner._semaphores[provider] = entry
+        return entry[1]
+
+    @staticmethod
+    def get_breaker_states() -> List[Dict[str, Any]]:
+        return [breaker.snapshot() for breaker in FallbackScanner._breakers.values()]
+
+    def _scanner(self, provider: str) -> ReceiptScanner:
+        # Providers further down the chain are only created when they are needed
+        if provider not in self._scanners:
+            self._scanners[provider] = self._factory(provider)
+        return self._scanners[provider]
+
+    @property
+    def scan_profile(self) -> Optional[ScanImageProfile]:
+        return self._scanner(self.providers[0]).scan_profile
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._scanner(self.providers[0]).max_batch_size
+
+    def scan_receipt(self, image_path: str) -> ExpenseCreate:
+        return asyncio.run(self.scan_image_async(ReceiptImage(image_path)))
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        return await self._call_chain(lambda scanner: scanner.scan_image_async(image))
+
+    async def scan_images_async(self, images: List[ReceiptImage]) -> List[ExpenseCreate]:
+        return await self._call_chain(lambda scanner: scanner.scan_images_async(images))
+
+    async def _call_chain(self, call: Callable[[ReceiptScanner], Awaitable[Any]]) -> Any:
+        last_error: Optional[Exception] = None
+        for provider in self.providers:
+            breaker = FallbackScanner.get_breaker(provider)
+            if not breaker.allow():
+                logger.debug(f"Skipping {provider}: circuit breaker is {breaker.state}")
+                continue
+
+            try:
+                # The limit applies to the provider actually called, including fallbacks and hedges
+                async with FallbackScanner.get_semaphore(provider):
+                    start = time.monotonic()
+                    result = await asyncio.wait_for(
+                        call(self._scanner(provider)),
+                        timeout=settings.SCAN_PROVIDER_TIMEOUT_SECONDS,
+                    )
+            except asyncio.CancelledError:
+                # E.g. the losing side of a hedge: says nothing about the provider's health, but
+                # a claimed half-open trial must be given back or the breaker never closes again
+                breaker.release()
+                raise
+            except AIResponseParseError:
+                # The provider answered; an unreadable receipt says nothing about its health
+                breaker.record_success(time.monotonic() - start)
+                raise
+            except asyncio.TimeoutError:
+                breaker.record_failure(time.monotonic() - start)
+                last_error = TimeoutError(
+                    f"{provider} did not answer within {settings.SCAN_PROVIDER_TIMEOUT_SECONDS:.0f}s"
+                )
+            except Exception as err:
+                breaker.record_failure(time.monotonic() - start)
+                last_error = err
+            else:
+                breaker.record_success(time.monotonic() - start)
+                return result
+
+            if breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"Circuit breaker for {provider} opened: {last_error}")
+            if provider != self.providers[-1]:
+                logger.info(f"Scan with {provider} failed, falling back to the next provider: {last_error}")
+
+        if last_error is None:
+            raise CircuitOpenError("All scan providers are temporarily unavailable, please try again shortly")
+        raise last_error
@@ -1,21 +1,100 @@
+from typing import List
 import google.genai as genai
-import PIL.Image
-from app.interfaces.scanner import ReceiptScanner
+from google.genai import types
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner, ScanImageProfile
 from app.db.schemas import ExpenseCreate
 from app.core.config import settings
-from app.core.prompts import RECEIPT_ANALYSIS_PROMPT
-from app.utils.ai_parsing import parse_ai_response
+from app.core.prompts import (
+    RECEIPT_ANALYSIS_PROMPT, RECEIPT_BATCH_RESPONSE_SCHEMA, RECEIPT_RESPONSE_SCHEMA, RECEIPT_STRUCTURED_PROMPT,
+    receipt_batch_prompt,
+)
+from app.utils.ai_parsing import is_structured_output_failure, parse_ai_batch_response, parse_ai_response
+from app.utils.logger import get_logger
+from app.utils.scan_usage import report_usage
+
+logger = get_logger(__name__)
 
 class GeminiScanner(ReceiptScanner):
+    # gemini-1.5 bills a flat 258 tokens per image, so only the payload size matters here
+    scan_profile = ScanImageProfile(max_size=1024)
+    max_batch_size = 16
+
     def __init__(self):
         self.client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+        self.model = 'gemini-1.5-flash'
+
+    def _build_contents(self, image: ReceiptImage, prompt: str = RECEIPT_ANALYSIS_PROMPT) -> list:
+        # Send the stored (already encoded) bytes as is instead of decoding them with PIL
+        # and letting the SDK re-encode the bitmap
+        return [prompt, types.Part.from_bytes(data=image.read(), mime_type=image.mime_type)]
+
+    def _request(self, image: ReceiptImage, structured: bool) -> dict:
+        if not structured:
+            return {'model': self.model, 'contents': self._build_contents(image)}
+        return {
+            'model': self.model,
+            'contents': self._build_contents(image, RECEIPT_STRUCTURED_PROMPT),
+            'config': types.GenerateContentConfig(
+                response_mime_type='application/json',
+                response_schema=RECEIPT_RESPONSE_SCHEMA,
+                max_output_tokens=settings.SCAN_MAX_OUTPUT_TOKENS,
+                temperature=0,
+            ),
+        }
+
+    def _report(self, response) -> None:
+        usage = getattr(response, 'usage_metadata', None)
+        report_usage('gemini', self.model, usage and usage.prompt_token_count, usage and usage.candidates_token_count)
 
     def scan_receipt(self, image_path: str) -> ExpenseCreate:
-        img = PIL.Image.open(image_path)
-
-        response = self.client.models.generate_content(
-            model='gemini-1.5-flash',
-            contents=[RECEIPT_ANALYSIS_PROMPT, img]
-        )
-        
-        return parse_ai_response(response.text, image_path)
+        image = ReceiptImage(image_path)
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            try:
+                response = self.client.models.generate_content(**self._request(image, structured=True))
+                self._report(response)
+                return parse_ai_response(response.text, image.path)
+            except Exception as err:
+                if not is_structured_output_failure(err):
+                    raise
+                logger.warning(f"Structured scan failed, retrying with the plain prompt: {err}")
+
+        response = self.client.models.generate_content(**self._request(image, structured=False))
+        self._report(response)
+        return parse_ai_response(response.text, image.path)
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        # Native async client: no worker thread is held during the LLM round trip
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            try:
+                response = await self.client.aio.models.generate_content(**self._request(image, structured=True))
+                self._report(response)
+                return parse_ai_response(response.text, image.path)
+            except Exception as err:
+                if not is_structured_output_failure(err):
+                    raise
+                logger.warning(f"Structured scan failed, retrying with the plain prompt: {err}")
+
+        response = await self.client.aio.models.generate_content(**self._request(image, structured=False))
+        self._report(response)
+        return parse_ai_response(response.text, image.path)
+
+    async def scan_images_async(self, images: List[ReceiptImage]) -> List[ExpenseCreate]:
+        # One request for all receipts: the prompt and the round trip are paid once
+        contents = [receipt_batch_prompt(len(images))]
+        for index, image in enumerate(images, start=1):
+            contents += [f"Receipt {index}:", types.Part.from_bytes(data=image.read(), mime_type=image.mime_type)]
+        config = None
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            config = types.GenerateContentConfig(
+                response_mime_type='application/json',
+                response_schema=RECEIPT_BATCH_RESPONSE_SCHEMA,
+                max_output_tokens=settings.SCAN_MAX_OUTPUT_TOKENS * len(images),
+                temperature=0,
+            )
+
+        response = await self.client.aio.models.generate_content(model=self.model, contents=contents, config=config)
+        self._report(response)
+        return parse_ai_batch_response(response.text, [image.path for image in images])
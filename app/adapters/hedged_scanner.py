@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner, ScanImageProfile
+from app.db.schemas import ExpenseCreate
+from app.core.config import settings
+from app.utils.latency_window import LatencyWindow
+from app.utils.logger import get_logger
+
+"""
+Hedging scanner adapter: sends a scan to a secondary provider when the primary has not answered
+within its usual (p95) latency, and keeps whichever valid result arrives first.
+"""
+
+logger = get_logger(__name__)
+
+
+class HedgedScanner(ReceiptScanner):
+    # Primary latencies per provider name; scanners are created per scan, so the state is shared
+    _windows: Dict[str, LatencyWindow] = {}
+    # Process-wide counters since startup
+    _stats = {'scans': 0, 'hedged': 0, 'secondary_wins': 0, 'saved_seconds': 0.0}
+
+    def __init__(self, primary: ReceiptScanner, secondary: ReceiptScanner, primary_name: str = 'primary'):
+        self.primary = primary
+        self.secondary = secondary
+        self.primary_name = primary_name
+
+    @property
+    def scan_profile(self) -> Optional[ScanImageProfile]:
+        # The image is prepared once, for the provider that answers most scans
+        return self.primary.scan_profile
+
+    @property
+    def window(self) -> LatencyWindow:
+        if self.primary_name not in HedgedScanner._windows:
+            HedgedScanner._windows[self.primary_name] = LatencyWindow(settings.SCAN_HEDGE_WINDOW_SIZE)
+        return HedgedScanner._windows[self.primary_name]
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before hedging: its p95 latency once enough scans are known."""
+        if len(self.window) < settings.SCAN_HEDGE_MIN_SAMPLES:
+            return settings.SCAN_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(settings.SCAN_HEDGE_MIN_DELAY_SECONDS, self.window.percentile(settings.SCAN_HEDGE_PERCENTILE))
+
+    def scan_receipt(self, image_path: str) -> ExpenseCreate:
+        return asyncio.run(self.scan_image_async(ReceiptImage(image_path)))
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        stats = HedgedScanner._stats
+        stats['scans'] += 1
+        start = time.monotonic()
+        primary = asyncio.create_task(self.primary.scan_image_async(image))
+        tasks = {primary}
+        secondary = None
+        errors = []
+        try:
+            delay = self.hedge_delay()
+            while True:
+                timeout = None if secondary else max(0.0, delay - (time.monotonic() - start))
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is primary:
+                            self.window.add(time.monotonic() - start)
+                        if task is secondary:
+                            self._record_secondary_win(time.monotonic() - start)
+                        return task.result()
+                    errors.append(task.exception())
+
+                if secondary is None:
+                    # Primary is slow (timeout) or failed: hedge to the secondary provider
+                    stats['hedged'] += 1
+                    reason = 'failed' if errors else f'no answer after {delay:.1f}s'
+                    logger.info(f"Hedging scan to secondary provider ({self.primary_name} {reason})")
+                    secondary = asyncio.create_task(self.secondary.scan_image_async(image))
+                    tasks.add(secondary)
+                elif not tasks:
+                    raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            if primary in tasks:
+                # Cancelled primary: it took at least this long, which keeps the p95 honest
+                self.window.add(time.monotonic() - start)
+
+    def _record_secondary_win(self, elapsed: float) -> None:
+        stats = HedgedScanner._stats
+        stats['secondary_wins'] += 1
+        # The primary's answer would have arrived after elapsed; estimate when from its slow scans
+        expected = self.window.tail_mean(elapsed)
+        if expected is not None:
+            stats['saved_seconds'] += expected - elapsed
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        stats = HedgedScanner._stats
+        return {
+            **stats,
+            "hedge_rate": stats['hedged'] / stats['scans'] if stats['scans'] else 0.0,
+            "avg_saved_seconds": stats['saved_seconds'] / stats['secondary_wins'] if stats['secondary_wins'] else 0.0,
+        }
@@ -1,48 +1,145 @@
 import base64
-from openai import OpenAI
-from app.interfaces.scanner import ReceiptScanner
+from typing import List
+from openai import AsyncOpenAI, OpenAI
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner, ScanImageProfile
 from app.db.schemas import ExpenseCreate
 from app.core.config import settings
-from app.core.prompts import RECEIPT_ANALYSIS_PROMPT
-from app.utils.ai_parsing import parse_ai_response
+from app.core.prompts import (
+    RECEIPT_ANALYSIS_PROMPT, RECEIPT_BATCH_RESPONSE_SCHEMA, RECEIPT_RESPONSE_SCHEMA, RECEIPT_STRUCTURED_PROMPT,
+    receipt_batch_prompt,
+)
+from app.utils.ai_parsing import is_structured_output_failure, parse_ai_batch_response, parse_ai_response
+from app.utils.logger import get_logger
+from app.utils.scan_usage import report_usage
 
-import mimetypes
+logger = get_logger(__name__)
 
 class OpenAIScanner(ReceiptScanner):
+    # High detail bills 170 tokens per 512x512 tile (after scaling the short side to <= 768)
+    scan_profile = ScanImageProfile(max_size=1024, tile_size=512)
+    max_batch_size = 10
+
+    # Strict mode needs every property required and no extra ones
+    RESPONSE_FORMAT = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "receipt",
+            "strict": True,
+            "schema": {**RECEIPT_RESPONSE_SCHEMA, "additionalProperties": False},
+        },
+    }
+    BATCH_RESPONSE_FORMAT = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "receipts",
+            "strict": True,
+            "schema": {
+                **RECEIPT_BATCH_RESPONSE_SCHEMA,
+                "properties": {
+                    "receipts": {
+                        "type": "array",
+                        "items": {**RECEIPT_BATCH_RESPONSE_SCHEMA["properties"]["receipts"]["items"], "additionalProperties": False},
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    }
+
     def __init__(self):
         self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = "gpt-4o" # Or gpt-4-turbo, capable of vision
 
-    def _encode_image(self, image_path):
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+    def _encode_image(self, image: ReceiptImage) -> str:
+        # Uses the bytes the caller already holds; only reads the file if there are none
+        return base64.b64encode(image.read()).decode('utf-8')
 
-    def scan_receipt(self, image_path: str) -> ExpenseCreate:
-        base64_image = self._encode_image(image_path)
-        
-        # Determine MIME type
-        mime_type, _ = mimetypes.guess_type(image_path)
-        if not mime_type:
-            mime_type = "image/jpeg"
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": RECEIPT_ANALYSIS_PROMPT},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{base64_image}"
-                            },
+    def _build_messages(self, image: ReceiptImage, prompt: str = RECEIPT_ANALYSIS_PROMPT) -> list:
+        base64_image = self._encode_image(image)
+        mime_type = image.mime_type
+
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime_type};base64,{base64_image}"
                         },
-                    ],
-                }
-            ],
-            max_tokens=500,
-        )
-
-        content = response.choices[0].message.content
-        return parse_ai_response(content, image_path)
+                    },
+                ],
+            }
+        ]
+
+    def _request(self, image: ReceiptImage, structured: bool) -> dict:
+        if not structured:
+            return {'model': self.model, 'messages': self._build_messages(image), 'max_tokens': 500}
+        return {
+            'model': self.model,
+            'messages': self._build_messages(image, RECEIPT_STRUCTURED_PROMPT),
+            'max_tokens': settings.SCAN_MAX_OUTPUT_TOKENS,
+            'response_format': self.RESPONSE_FORMAT,
+            'temperature': 0,
+        }
+
+    def _report(self, response) -> None:
+        usage = getattr(response, 'usage', None)
+        report_usage('openai', self.model, usage and usage.prompt_tokens, usage and usage.completion_tokens)
+
+    def scan_receipt(self, image_path: str) -> ExpenseCreate:
+        image = ReceiptImage(image_path)
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            try:
+                response = self.client.chat.completions.create(**self._request(image, structured=True))
+                self._report(response)
+                return parse_ai_response(response.choices[0].message.content, image_path)
+            except Exception as err:
+                if not is_structured_output_failure(err):
+                    raise
+                logger.warning(f"Structured scan failed, retrying with the plain prompt: {err}")
+
+        response = self.client.chat.completions.create(**self._request(image, structured=False))
+        self._report(response)
+        return parse_ai_response(response.choices[0].message.content, image_path)
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            try:
+                response = await self.async_client.chat.completions.create(**self._request(image, structured=True))
+                self._report(response)
+                return parse_ai_response(response.choices[0].message.content, image.path)
+            except Exception as err:
+                if not is_structured_output_failure(err):
+                    raise
+                logger.warning(f"Structured scan failed, retrying with the plain prompt: {err}")
+
+        response = await self.async_client.chat.completions.create(**self._request(image, structured=False))
+        self._report(response)
+        return parse_ai_response(response.choices[0].message.content, image.path)
+
+    async def scan_images_async(self, images: List[ReceiptImage]) -> List[ExpenseCreate]:
+        # One request for all receipts: the prompt and the round trip are paid once
+        content = [{"type": "text", "text": receipt_batch_prompt(len(images))}]
+        for index, image in enumerate(images, start=1):
+            content += [
+                {"type": "text", "text": f"Receipt {index}:"},
+                {"type": "image_url", "image_url": {"url": f"data:{image.mime_type};base64,{self._encode_image(image)}"}},
+            ]
+        request = {
+            'model': self.model,
+            'messages': [{"role": "user", "content": content}],
+            'max_tokens': settings.SCAN_MAX_OUTPUT_TOKENS * len(images),
+            'temperature': 0,
+        }
+        if settings.SCAN_STRUCTURED_OUTPUT:
+            request['response_format'] = self.BATCH_RESPONSE_FORMAT
+
+        response = await self.async_client.chat.completions.create(**request)
+        self._report(response)
+        return parse_ai_batch_response(response.choices[0].message.content, [image.path for image in images])
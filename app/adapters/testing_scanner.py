@@ -1,10 +1,12 @@
 from datetime import date
 from decimal import Decimal
+import asyncio
 import time
-from app.interfaces.scanner import ReceiptScanner
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner
 from app.db.schemas import ExpenseCreate
 from app.utils.logger import get_logger
 from app.core.config import settings
+from app.utils.scan_usage import report_usage
 
 """
 Testing scanner adapter for simulating receipt scanning during development and testing
@@ -22,7 +24,19 @@ class TestingScanner(ReceiptScanner):
         # Debugging logger level
         # print(f"Logger Level: {self.logger.getEffectiveLevel()}, Config Level: {settings.LOG_LEVEL}")
         
+        return self._build_result(image_path)
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        return await self.scan_image_async(ReceiptImage(image_path))
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        # Simulate network latency without blocking a worker thread
+        await asyncio.sleep(1.5)
+        return self._build_result(image.path)
+
+    def _build_result(self, image_path: str) -> ExpenseCreate:
         self.logger.info(f"Simulating receipt scan for image: {image_path}")
+        report_usage('testing', 'testing', 0, 0)
         
         return ExpenseCreate(
             date=date.today(),
@@ -17,6 +17,46 @@ class Settings(BaseSettings):
     AI_PROVIDER: str = "gemini" # Default to gemini
     GOOGLE_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    SCAN_MAX_CONCURRENCY: int = 4 # Max in-flight scans per provider
+    SCAN_BATCH_CONCURRENCY: int = 3 # Background scan workers (parallel scan jobs, e.g. for "Scan All")
+    SCAN_BATCH_MAX_IMAGES: int = 5 # Queued receipts packed into one multi-image request (1 = one request each)
+    SCAN_MAX_RETRIES: int = 3 # Retries on provider rate-limit errors
+    SCAN_RETRY_BASE_DELAY_SECONDS: float = 1.0 # Doubled on every retry
+    SCAN_JOB_MAX_ATTEMPTS: int = 3 # Attempts per queued scan job (incl. restarts)
+    SCAN_JOB_POLL_SECONDS: float = 2.0
+    SCAN_JOB_RETENTION_DAYS: int = 7 # Purge dismissed/failed jobs after this age
+    SCAN_PREPROCESS_ENABLED: bool = True # Send scanners a cropped grayscale copy sized per provider
+    SCAN_STRUCTURED_OUTPUT: bool = True # Request schema-constrained JSON (falls back to the plain prompt)
+    SCAN_MAX_OUTPUT_TOKENS: int = 150 # Output limit for structured answers (~60 tokens are needed)
+    SCAN_FALLBACK_PROVIDERS: list[str] = [] # Tried in order after AI_PROVIDER fails or its breaker is open ('testing' is ignored)
+    SCAN_PROVIDER_TIMEOUT_SECONDS: float = 45.0 # Longest a single provider call may take
+    SCAN_BREAKER_WINDOW_SIZE: int = 20 # Recent calls per provider the error rate is computed over
+    SCAN_BREAKER_MIN_CALLS: int = 5 # Calls needed in the window before the breaker may open
+    SCAN_BREAKER_FAILURE_RATE: float = 0.5 # Failed or slow share of calls that opens the breaker
+    SCAN_BREAKER_SLOW_CALL_SECONDS: float = 30.0 # Successful calls slower than this count as failures
+    SCAN_BREAKER_OPEN_SECONDS: float = 30.0 # Time an open breaker refuses calls before one trial call
+    SCAN_TELEMETRY_RETENTION_DAYS: int = 400 # Scan telemetry rows older than this are purged
+    SCAN_TOKEN_PRICES_USD: dict[str, list[float]] = { # Model -> [input, output] USD per 1M tokens
+        "gemini-1.5-flash": [0.075, 0.30],
+        "gpt-4o": [2.50, 10.00],
+    }
+    SCAN_CASSETTE_MODE: str = "replay" # AI_PROVIDER "cassette": record (real scans are saved) or replay (offline)
+    SCAN_CASSETTE_PROVIDER: str = "gemini" # Provider recorded from (its image preprocessing is replayed too)
+    SCAN_CASSETTE_PATH: str = "app/data/scan_cassette.jsonl"
+    SCAN_CASSETTE_TIME_SCALE: float = 1.0 # Replayed latency = recorded latency x scale (0 = answer immediately)
+    SCAN_HEDGE_PRIMARY: str = "gemini" # AI_PROVIDER "hedged": provider asked first
+    SCAN_HEDGE_SECONDARY: str = "openai" # Asked as well when the primary is slower than its usual latency
+    SCAN_HEDGE_PERCENTILE: float = 95.0 # Primary latency percentile after which the scan is hedged
+    SCAN_HEDGE_DEFAULT_DELAY_SECONDS: float = 8.0 # Hedge delay until SCAN_HEDGE_MIN_SAMPLES scans are known
+    SCAN_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    SCAN_HEDGE_MIN_SAMPLES: int = 20
+    SCAN_HEDGE_WINDOW_SIZE: int = 200 # Recent primary latencies the percentile is taken from
+
+    # Scan Result Cache (skips paid LLM calls for re-uploaded receipts)
+    SCAN_CACHE_ENABLED: bool = True
+    SCAN_CACHE_MAX_ENTRIES: int = 5000
+    SCAN_CACHE_MAX_AGE_DAYS: int = 180
+    SCAN_CACHE_NEAR_DUPLICATE_DISTANCE: int = 0 # Max dHash bit difference for a near-duplicate hit (0 = exact only; dHash misses edited totals, and different stores' receipts can be ~13 bits apart)
 
     # Auth Settings
     ADMIN_USERNAME: str = "admin"
@@ -36,9 +76,25 @@ class Settings(BaseSettings):
     DASHBOARD_CACHE_TTL_SECONDS: int = 30
 
     # File Upload Settings
-    UPLOAD_RETENTION_MINUTES: int = 1440
+    UPLOAD_RETENTION_MINUTES: int = 1440 # Unreferenced receipts older than this are removed by the upload sweeper
+    UPLOAD_SWEEP_INTERVAL_MINUTES: int = 60
+    UPLOAD_SWEEP_BATCH_SIZE: int = 200 # Receipts deleted per sweeper transaction
     RECEIPT_MAX_SIZE_PX: int = 1200
     RECEIPT_JPEG_QUALITY: int = 75
+    RECEIPT_THUMB_SIZE_PX: int = 360 # Longest side of the preview thumbnail (2x the 180px card preview)
+    RECEIPT_WEBP_QUALITY: int = 70 # Quality of the WebP display variants
+    RECEIPT_ARCHIVE_AFTER_DAYS: int = 90 # Receipts of saved expenses older than this are recompressed (0 = never)
+    RECEIPT_ARCHIVE_FORMAT: str = "WEBP" # WEBP or AVIF (denser, but much slower to encode on the Pi)
+    RECEIPT_ARCHIVE_MAX_SIZE_PX: int = 1000
+    RECEIPT_ARCHIVE_QUALITY: int = 50
+    RECEIPT_ARCHIVE_INTERVAL_HOURS: int = 24
+    RECEIPT_ARCHIVE_BATCH_SIZE: int = 50 # Receipts recompressed per run
+    IMAGE_WORKER_PROCESSES: int = 2 # Processes for image decode/resize/encode (0 = run in a thread)
+    IMAGE_QUEUE_MAX_DEPTH: int = 16 # Uploads allowed to wait for a worker before new ones are rejected
+    IMAGE_JOB_TIMEOUT_SECONDS: float = 60.0
+    HEIF_DECODE_THREADS: int = 0 # libheif threads per image worker (0 = CPU cores / IMAGE_WORKER_PROCESSES)
+    UPLOAD_MEMORY_BUDGET_MB: int = 256 # Estimated memory all running image jobs may use together
+    UPLOAD_BUDGET_WAIT_SECONDS: float = 30.0 # Longest an upload waits for budget before it is rejected
 
     # SQLite Performance Settings
     SQLITE_CACHE_SIZE_KB: int = 20000  # Negative value uses KB units in PRAGMA cache_size
@@ -48,6 +104,12 @@ class Settings(BaseSettings):
     # Logging Settings
     LOG_LEVEL: str = "INFO"
 
+    # Event Loop Monitoring (lag and blocking callbacks, exposed on /metrics)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.1 # Heartbeat of the lag sampler
+    LOOP_MONITOR_WINDOW_SIZE: int = 600 # Lag samples kept for percentiles (1 minute at the default interval)
+    LOOP_BLOCKING_THRESHOLD_SECONDS: float = 0.25 # A callback blocking the loop longer than this is logged with its stack
+
     # Performance Toggles
     INIT_DB_ON_STARTUP: bool = True
     ENABLE_CHARTS: bool = True
@@ -12,3 +12,48 @@ and 'description' (shop name).
 If the currency is not EUR, return 'UNKNOWN' for the currency field.
 Return ONLY the raw JSON string, no markdown formatting.
 """
+
+# Structured output: the response schema constrains the format, so the prompt only describes the content
+RECEIPT_STRUCTURED_PROMPT = """
+Extract the receipt's date, total amount, currency (ISO code, 'UNKNOWN' if not EUR),
+category (guess based on items) and the shop name as description.
+"""
+
+RECEIPT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "date": {"type": "string", "description": "DD.MM.YYYY"},
+        "total_amount": {"type": "number"},
+        "currency": {"type": "string", "enum": settings.CURRENCIES},
+        "category": {"type": "string", "enum": settings.EXPENSE_CATEGORIES},
+        "description": {"type": "string"},
+    },
+    "required": ["date", "total_amount", "currency", "category", "description"],
+}
+
+
+def receipt_batch_prompt(count: int) -> str:
+    """Prompt for one request carrying several receipts, labelled 'Receipt 1' .. 'Receipt <count>'."""
+    return f"""
+The {count} images are separate receipts, each preceded by its label "Receipt 1" to "Receipt {count}".
+For every receipt extract 'index' (its receipt number), 'date' (DD.MM.YYYY), 'total_amount' (float),
+'currency' (ISO code, 'UNKNOWN' if not EUR), 'category' (guess based on items: {categories_str})
+and 'description' (shop name).
+Return ONLY a raw JSON object {{"receipts": [...]}} with exactly one entry per receipt, no markdown formatting.
+"""
+
+
+RECEIPT_BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "receipts": {
+            "type": "array",
+            "items": {
+                **RECEIPT_RESPONSE_SCHEMA,
+                "properties": {"index": {"type": "integer"}, **RECEIPT_RESPONSE_SCHEMA["properties"]},
+                "required": ["index"] + RECEIPT_RESPONSE_SCHEMA["required"],
+            },
+        },
+    },
+    "required": ["receipts"],
+}
@@ -1,10 +1,14 @@
 """Database-related models and schemas."""
 
-from .models import Expense
+from .models import Expense, ScanJob, ScanCacheEntry, ReceiptBlob, ScanTelemetry
 from .schemas import Expense as ExpenseSchema, ExpenseBase, ExpenseCreate
 
 __all__ = [
     "Expense",
+    "ScanJob",
+    "ScanCacheEntry",
+    "ReceiptBlob",
+    "ScanTelemetry",
     "ExpenseSchema",
     "ExpenseBase",
     "ExpenseCreate",
@@ -24,4 +24,57 @@ class Expense(Base):
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
 
-__all__ = ["Expense"]
+class ScanJob(Base):
+    __tablename__ = "scan_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_path = Column(Text, nullable=False)
+    status = Column(String(20), default="queued", nullable=False, index=True)  # queued, running, done, failed, dismissed
+    attempts = Column(Integer, default=0, nullable=False)
+    result_json = Column(Text, nullable=True)  # ExpenseCreate serialized as JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class ScanCacheEntry(Base):
+    __tablename__ = "scan_cache"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the normalized image bytes
+    perceptual_hash = Column(String(16), nullable=False, index=True)  # 64-bit dHash, hex
+    provider = Column(String(20), nullable=False)
+    result_json = Column(Text, nullable=False)  # ExpenseCreate serialized as JSON
+    image_bytes = Column(Integer, default=0, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    last_hit_at = Column(TIMESTAMP, nullable=True)
+
+
+class ReceiptBlob(Base):
+    __tablename__ = "receipt_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the stored (normalized) image
+    source_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the raw upload it was encoded from
+    file_path = Column(Text, nullable=False)  # Same value as Expense.receipt_image_path
+    size_bytes = Column(Integer, default=0, nullable=False)  # All files currently stored for the receipt
+    tier = Column(String(20), default="original", nullable=False, index=True)  # original, archive
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)  # Expiry index for the upload sweeper
+
+
+class ScanTelemetry(Base):
+    __tablename__ = "scan_telemetry"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
+    provider = Column(String(50), nullable=False)  # Provider that answered (or was tried last), "cache" for cache hits
+    model = Column(String(100), nullable=True)
+    image_bytes = Column(Integer, default=0, nullable=False)  # Image payload sent to the provider
+    latency_ms = Column(Integer, default=0, nullable=False)
+    input_tokens = Column(Integer, default=0, nullable=False)
+    output_tokens = Column(Integer, default=0, nullable=False)
+    parse_ok = Column(Boolean, default=True, nullable=False)  # False if the answer could not be parsed
+    retries = Column(Integer, default=0, nullable=False)  # Rate-limit retries plus extra provider calls
+    error = Column(Text, nullable=True)
+
+
+__all__ = ["Expense", "ScanJob", "ScanCacheEntry", "ReceiptBlob", "ScanTelemetry"]
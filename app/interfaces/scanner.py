@@ -1,10 +1,80 @@
+import asyncio
+import mimetypes
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional
+
 from app.db.schemas import ExpenseCreate
 
+
+@dataclass
+class ReceiptImage:
+    """
+    Receipt image handed to a scanner: the stored path plus, when the caller already holds them,
+    the encoded bytes, so adapters can send the image without reading or decoding the file again.
+    """
+    path: str
+    data: Optional[bytes] = None
+    mime_type: Optional[str] = None
+
+    def __post_init__(self):
+        if self.mime_type is None:
+            self.mime_type = mimetypes.guess_type(self.path)[0] or "image/jpeg"
+
+    def read(self) -> bytes:
+        """Encoded image bytes; read from path once if they were not provided."""
+        if self.data is None:
+            with open(self.path, "rb") as f:
+                self.data = f.read()
+        return self.data
+
+
+@dataclass(frozen=True)
+class ScanImageProfile:
+    """
+    How ReceiptService prepares images for a provider (see prepare_scan_image): longest side,
+    JPEG quality and the provider's image tile size (0 = the provider does not bill per tile).
+    """
+    max_size: int
+    quality: int = 80
+    tile_size: int = 0
+    grayscale: bool = True
+    crop: bool = True
+
+
 class ReceiptScanner(ABC):
+    # Image preprocessing before scanning; None sends the stored receipt image unchanged
+    scan_profile: Optional[ScanImageProfile] = None
+    # Receipts one provider request can carry in scan_images_async (1 = no multi-image requests)
+    max_batch_size: int = 1
+
     @abstractmethod
     def scan_receipt(self, image_path: str) -> ExpenseCreate:
         """
         Scans a receipt image and returns an ExpenseCreate schema.
         """
         pass
+
+    async def scan_receipt_async(self, image_path: str) -> ExpenseCreate:
+        """
+        Async variant of scan_receipt.
+        Adapters should override this with their provider's async client; the default
+        falls back to running the blocking implementation in a worker thread.
+        """
+        return await asyncio.to_thread(self.scan_receipt, image_path)
+
+    async def scan_image_async(self, image: ReceiptImage) -> ExpenseCreate:
+        """
+        Scans an already loaded receipt image; this is what ReceiptService calls.
+        Adapters that can send image.read() directly should override this; the default
+        scans image.path, re-reading the file.
+        """
+        return await self.scan_receipt_async(image.path)
+
+    async def scan_images_async(self, images: List[ReceiptImage]) -> List[ExpenseCreate]:
+        """
+        Scans several receipts and returns their results in order.
+        Adapters with max_batch_size > 1 send them in one request and raise AIResponseParseError
+        when the answer does not match the images; the default scans them one by one, concurrently.
+        """
+        return list(await asyncio.gather(*(self.scan_image_async(image) for image in images)))
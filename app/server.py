@@ -0,0 +1,102 @@
+"""
+The web app: pages, API routes, static files and the background services started with it.
+Imported by app/main.py, which runs the server.
+"""
+from nicegui import ui, app
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from app.core.database import Base, engine
+from app.core.config import settings
+from app.ui.dashboard import dashboard_page
+from app.ui.add_expense import add_expense_page
+from app.ui.history import history_page, history_rows
+from app.ui.settings_page import settings_page
+from app.services.scan_worker import scan_worker_pool
+from app.services.image_worker import image_worker_pool
+from app.services.upload_sweeper import upload_sweeper
+from app.services.receipt_archiver import receipt_archiver
+from app.services.loop_monitor import loop_monitor
+import os
+
+# Ensure data directory exists for SQLite and settings
+os.makedirs('app/data', exist_ok=True)
+
+# Initialize DB tables (optional for faster startup in production)
+if settings.INIT_DB_ON_STARTUP:
+    Base.metadata.create_all(bind=engine)
+
+# Serve uploads directory
+os.makedirs('app/data/uploads', exist_ok=True)
+app.add_static_files('/uploads', 'app/data/uploads')
+app.add_static_files('/ui/static', 'app/ui/static')
+
+# Event loop lag and blocking-callback monitor, first so it also sees the other services start
+app.on_startup(loop_monitor.start)
+app.on_shutdown(loop_monitor.stop)
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def metrics():
+    return loop_monitor.render_metrics()
+
+# Background scan workers (persistent job queue, independent of browser tabs), upload retention and archiving
+app.on_startup(scan_worker_pool.start)
+app.on_startup(image_worker_pool.start)
+app.on_startup(upload_sweeper.start)
+app.on_startup(receipt_archiver.start)
+app.on_shutdown(scan_worker_pool.stop)
+app.on_shutdown(image_worker_pool.shutdown)
+app.on_shutdown(upload_sweeper.stop)
+app.on_shutdown(receipt_archiver.stop)
+
+def check_auth():
+    if not app.storage.user.get('authenticated', False):
+        return RedirectResponse('/login')
+    return None
+
+@ui.page('/login')
+def login():
+    def try_login():
+        if username.value == settings.ADMIN_USERNAME and password.value == settings.ADMIN_PASSWORD:
+            app.storage.user['authenticated'] = True
+            ui.navigate.to('/')
+        else:
+            ui.notify('Invalid username or password', color='negative')
+
+    if app.storage.user.get('authenticated', False):
+        return RedirectResponse('/')
+
+    with ui.card().classes('absolute-center w-80 p-6 shadow-lg'):
+        ui.label('🔐 Login').classes('text-2xl font-bold mb-4 text-center w-full')
+        username = ui.input('Username').classes('w-full mb-2').on('keydown.enter', try_login)
+        password = ui.input('Password', password=True, password_toggle_button=True).classes('w-full mb-4').on('keydown.enter', try_login)
+        ui.button('Login', on_click=try_login).classes('w-full').props('color=primary')
+
+@ui.page('/')
+def index_page():
+    if auth := check_auth(): return auth
+    dashboard_page()
+
+@ui.page('/add')
+def add_page():
+    if auth := check_auth(): return auth
+    add_expense_page()
+
+@ui.page('/history')
+def history_page_route():
+    if auth := check_auth(): return auth
+    history_page()
+
+@app.get('/api/history/rows')
+def history_rows_route(request: Request):
+    # Blocks for the History grid's infinite row model; a sync route runs in the threadpool, off the event loop
+    if not app.storage.user.get('authenticated', False):
+        raise HTTPException(status_code=401, detail='Not authenticated')
+    try:
+        return history_rows(request.query_params)
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+@ui.page('/settings')
+def settings_page_route():
+    if auth := check_auth(): return auth
+    settings_page()
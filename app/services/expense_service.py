@@ -1,14 +1,25 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from datetime import date
 
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, Session
 
 from app.db.models import Expense
 from app.db.schemas import ExpenseCreate
 
 class ExpenseService:
+    # History grid columns (AG Grid colId) that are sorted and filtered in SQL
+    GRID_COLUMNS = {
+        'date': Expense.date,
+        'type': Expense.type,
+        'category': Expense.category,
+        'description': Expense.description,
+        'amount': Expense.amount,
+        'currency': Expense.currency,
+        'amount_eur': Expense.amount_eur,
+    }
+
     @staticmethod
     def create_expense(db: Session, expense: ExpenseCreate) -> Expense:
         # Simplified Logic: No currency conversion. 
@@ -34,7 +45,8 @@ class ExpenseService:
         return db_expense
 
     @staticmethod
-    def update_expense(db: Session, expense_id: int, updates: Dict[str, Any]) -> Any:
+    def update_expense(db: Session, expense_id: int, updates: Dict[str, Any]) -> Optional[Expense]:
+        """Applies the updates and returns the refreshed expense, or None if it does not exist."""
         expense = db.query(Expense).filter(Expense.id == expense_id).first()
         if expense:
             for key, value in updates.items():
@@ -51,31 +63,34 @@ class ExpenseService:
         return None
 
     @staticmethod
-    def delete_expense(db: Session, expense_id: int) -> bool:
+    def delete_expense(db: Session, expense_id: int) -> Optional[Expense]:
+        """Deletes an expense and returns it with its last values (detached), or None if it does not exist."""
         expense = db.query(Expense).filter(Expense.id == expense_id).first()
         if expense:
             db.delete(expense)
+            db.flush()
+            # Detached before the commit, so its attributes are not expired and stay readable
+            db.expunge(expense)
             db.commit()
-            return True
-        return False
+        return expense
+
+    @staticmethod
+    def get_expense(db: Session, expense_id: int) -> Optional[Expense]:
+        return db.query(Expense).filter(Expense.id == expense_id).first()
 
     @staticmethod
     def get_expenses(db: Session, skip: int = 0, limit: int = 100) -> List[Expense]:
         return db.query(Expense).order_by(Expense.date.desc()).offset(skip).limit(limit).all()
 
     @staticmethod
-    def get_expenses_filtered(
-        db: Session,
-        skip: int = 0,
-        limit: int = 100,
+    def _apply_filters(
+        query: Query,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         category: Optional[str] = None,
         expense_type: Optional[str] = None,
         search: Optional[str] = None,
-    ) -> List[Expense]:
-        query = db.query(Expense)
-
+    ) -> Query:
         if start_date:
             query = query.filter(Expense.date >= start_date)
         if end_date:
@@ -92,7 +107,20 @@ class ExpenseService:
                     Expense.category.ilike(search_like),
                 )
             )
+        return query
 
+    @staticmethod
+    def get_expenses_filtered(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        category: Optional[str] = None,
+        expense_type: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> List[Expense]:
+        query = ExpenseService._apply_filters(db.query(Expense), start_date, end_date, category, expense_type, search)
         return query.order_by(Expense.date.desc()).offset(skip).limit(limit).all()
 
     @staticmethod
@@ -104,26 +132,105 @@ class ExpenseService:
         expense_type: Optional[str] = None,
         search: Optional[str] = None,
     ) -> int:
-        query = db.query(func.count(Expense.id))
+        query = ExpenseService._apply_filters(
+            db.query(func.count(Expense.id)), start_date, end_date, category, expense_type, search
+        )
+        return int(query.scalar() or 0)
 
-        if start_date:
-            query = query.filter(Expense.date >= start_date)
-        if end_date:
-            query = query.filter(Expense.date <= end_date)
-        if category:
-            query = query.filter(Expense.category == category)
-        if expense_type:
-            query = query.filter(Expense.type == expense_type)
-        if search:
-            search_like = f"%{search.strip()}%"
-            query = query.filter(
-                or_(
-                    Expense.description.ilike(search_like),
-                    Expense.category.ilike(search_like),
-                )
-            )
+    @staticmethod
+    def _column_filter(column, model: Dict[str, Any]):
+        """SQL condition for one AG Grid column filter model (text, number or date), or None."""
+        if 'conditions' in model:
+            clauses = [c for c in (ExpenseService._column_filter(column, m) for m in model['conditions']) if c is not None]
+            if not clauses:
+                return None
+            return or_(*clauses) if model.get('operator') == 'OR' else and_(*clauses)
 
-        return int(query.scalar() or 0)
+        kind, op = model.get('filterType'), model.get('type')
+        if op == 'blank':
+            return or_(column.is_(None), column == '') if kind == 'text' else column.is_(None)
+        if op == 'notBlank':
+            return and_(column.isnot(None), column != '') if kind == 'text' else column.isnot(None)
+
+        if kind == 'text':
+            value = str(model.get('filter') or '')
+            if op == 'contains':
+                return column.ilike(f"%{value}%")
+            if op == 'notContains':
+                return or_(column.is_(None), ~column.ilike(f"%{value}%"))
+            if op == 'startsWith':
+                return column.ilike(f"{value}%")
+            if op == 'endsWith':
+                return column.ilike(f"%{value}")
+            low, high = value, None
+        elif kind == 'number':
+            low, high = model.get('filter'), model.get('filterTo')
+        elif kind == 'date':
+            # AG Grid sends 'YYYY-MM-DD hh:mm:ss'
+            low, high = (date.fromisoformat(v[:10]) if v else None for v in (model.get('dateFrom'), model.get('dateTo')))
+        else:
+            return None
+
+        if low is None:
+            return None
+        if op == 'equals':
+            return column == low
+        if op == 'notEqual':
+            return column != low
+        if op == 'greaterThan':
+            return column > low
+        if op == 'greaterThanOrEqual':
+            return column >= low
+        if op == 'lessThan':
+            return column < low
+        if op == 'lessThanOrEqual':
+            return column <= low
+        if op == 'inRange' and high is not None:
+            return column.between(low, high)
+        return None
+
+    @staticmethod
+    def get_expense_block(
+        db: Session,
+        start_row: int,
+        end_row: int,
+        sort_model: Optional[List[Dict[str, Any]]] = None,
+        filter_model: Optional[Dict[str, Dict[str, Any]]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        category: Optional[str] = None,
+        expense_type: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[List[Expense], int]:
+        """
+        One block of rows [start_row, end_row) for the History grid's infinite row model, with the
+        grid's sort and column filter models applied in SQL on top of the page filters.
+
+        Returns (rows, last_row): last_row is the total row count once known (the first block
+        counts it, a block reaching the end implies it) and -1 otherwise, as AG Grid expects.
+        """
+        query = ExpenseService._apply_filters(db.query(Expense), start_date, end_date, category, expense_type, search)
+        for col_id, model in (filter_model or {}).items():
+            column = ExpenseService.GRID_COLUMNS.get(col_id)
+            clause = ExpenseService._column_filter(column, model) if column is not None else None
+            if clause is not None:
+                query = query.filter(clause)
+
+        order = []
+        for sort in sort_model or []:
+            column = ExpenseService.GRID_COLUMNS.get(sort.get('colId'))
+            if column is not None:
+                order.append(column.asc() if sort.get('sort') == 'asc' else column.desc())
+        # id breaks ties so rows never move between blocks
+        order = (order or [Expense.date.desc()]) + [Expense.id.desc()]
+
+        limit = max(0, end_row - start_row)
+        rows = query.order_by(*order).offset(start_row).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, start_row + len(rows)
+        if start_row == 0:
+            return rows[:limit], int(query.with_entities(func.count(Expense.id)).scalar() or 0)
+        return rows[:limit], -1
 
     @staticmethod
     def get_summary(db: Session, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, Any]:
@@ -0,0 +1,215 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
+
+from app.core.config import settings
+from app.utils.image_processing import configure_heif_decoder
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImageQueueFullError(Exception):
+    """Raised when more image jobs are waiting than IMAGE_QUEUE_MAX_DEPTH allows."""
+
+
+class MemoryBudget:
+    """
+    Process-wide budget for the memory that running image jobs need (decoded bitmaps plus
+    working copies), so a burst of large photos cannot exhaust RAM on the Pi.
+
+    Jobs whose cost does not fit wait until running jobs release theirs; after
+    UPLOAD_BUDGET_WAIT_SECONDS they are rejected with ImageQueueFullError.
+    A single job larger than the whole budget (e.g. a 48 MP PNG) waits until it can hold
+    all of it, so it runs alone instead of being rejected.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._condition: Optional[asyncio.Condition] = None
+        self.in_use = 0
+
+    @property
+    def capacity(self) -> int:
+        return settings.UPLOAD_MEMORY_BUDGET_MB * 1024 * 1024
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self.in_use = 0
+        return self._condition
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[None]:
+        nbytes = min(nbytes, self.capacity)
+        condition = self._get_condition()
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self.in_use + nbytes <= self.capacity),
+                    timeout=settings.UPLOAD_BUDGET_WAIT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                raise ImageQueueFullError("Too many large images are being processed, please try again shortly")
+            self.in_use += nbytes
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_use -= nbytes
+                condition.notify_all()
+
+
+class ImageWorkerPool:
+    """
+    Runs CPU-heavy image work (decode, resize, encode) in a bounded process pool so uploads
+    use all cores without blocking the event loop.
+
+    At most IMAGE_WORKER_PROCESSES jobs run at once; up to IMAGE_QUEUE_MAX_DEPTH more wait in
+    FIFO order and are told their queue position. Beyond that, submissions are rejected.
+    IMAGE_WORKER_PROCESSES = 0 runs jobs in a thread instead (no process pool).
+    Running jobs additionally share the process-wide memory budget.
+    """
+
+    def __init__(self, memory_budget: Optional[MemoryBudget] = None):
+        self.memory_budget = memory_budget or MemoryBudget()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting: List[list] = []  # [ticket, on_position] in arrival order
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs queued behind the running ones."""
+        return len(self._waiting)
+
+    @staticmethod
+    def heif_decode_threads() -> int:
+        """libheif threads per worker: the CPU cores split between the worker processes by default."""
+        if settings.HEIF_DECODE_THREADS > 0:
+            return settings.HEIF_DECODE_THREADS
+        return max(1, (os.cpu_count() or 1) // max(1, settings.IMAGE_WORKER_PROCESSES))
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        # The semaphore is bound to the loop it is first used on, so rebuild it per loop
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(max(1, settings.IMAGE_WORKER_PROCESSES))
+            self._waiting = []
+        if self._executor is None and settings.IMAGE_WORKER_PROCESSES > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKER_PROCESSES,
+                mp_context=self._mp_context(),
+                initializer=configure_heif_decoder,
+                initargs=(self.heif_decode_threads(),),
+            )
+            logger.info(f"Started image worker pool with {settings.IMAGE_WORKER_PROCESSES} processes")
+
+    @staticmethod
+    def _mp_context():
+        # Never fork the app process: its threads (event loop, DB pool, monitors) may hold locks
+        # that would stay locked in the child. The fork server starts from a clean interpreter
+        # with the imaging libraries preloaded, and forks the workers from there.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['app.utils.image_processing'])
+            return context
+        return multiprocessing.get_context('spawn')
+
+    @staticmethod
+    def _terminate(executor: ProcessPoolExecutor) -> None:
+        """Kill the pool's worker processes and wait until they are gone (and their memory freed)."""
+        terminate_workers = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+        if terminate_workers is not None:
+            terminate_workers()
+            return
+        processes = list((executor._processes or {}).values())
+        for process in processes:
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    async def start(self) -> None:
+        """Create the worker processes up front (at app startup) instead of on the first upload."""
+        self._ensure_started()
+        if self._executor is not None:
+            await self._loop.run_in_executor(self._executor, abs, 0)
+
+    def _notify_positions(self) -> None:
+        for position, (_, on_position) in enumerate(self._waiting, start=1):
+            if on_position:
+                try:
+                    on_position(position)
+                except Exception:
+                    logger.debug("Queue position callback failed", exc_info=True)
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        on_position: Optional[Callable[[int], None]] = None,
+        memory_cost: int = 0,
+    ):
+        """
+        Run func(*args) in the pool and return its result.
+        func and args must be picklable (module level function, plain data); pass file paths
+        rather than image bytes. memory_cost is the job's estimated peak memory in bytes.
+        Raises ImageQueueFullError on backpressure and asyncio.TimeoutError after IMAGE_JOB_TIMEOUT_SECONDS.
+        """
+        self._ensure_started()
+        if self._slots.locked() and len(self._waiting) >= settings.IMAGE_QUEUE_MAX_DEPTH:
+            raise ImageQueueFullError("Too many images are being processed, please try again shortly")
+
+        ticket = [object(), on_position]
+        self._waiting.append(ticket)
+        self._notify_positions()
+        try:
+            async with self._slots:
+                self._waiting.remove(ticket)
+                self._notify_positions()
+                async with self.memory_budget.reserve(memory_cost):
+                    if on_position:
+                        on_position(0)
+                    return await self._execute(func, *args)
+        finally:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                self._notify_positions()
+
+    async def _execute(self, func: Callable, *args):
+        timeout = settings.IMAGE_JOB_TIMEOUT_SECONDS
+        if self._executor is None:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+
+        executor = self._executor
+        future = self._loop.run_in_executor(executor, func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # A worker process cannot be interrupted; kill the pool's processes and start fresh
+            # ones for new jobs. The caller's memory reservation is released only after this
+            # returns, once the stuck job's memory is actually freed. Jobs running next to it
+            # in the same pool fail with BrokenProcessPool.
+            logger.error(f"Image job exceeded {timeout}s, recycling image worker pool")
+            if self._executor is executor:
+                self._executor = None
+            await asyncio.to_thread(self._terminate, executor)
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_worker_pool = ImageWorkerPool()
@@ -1,21 +1,54 @@
 from app.interfaces.scanner import ReceiptScanner
+from app.adapters.cassette_scanner import CassetteScanner
+from app.adapters.fallback_scanner import FallbackScanner
 from app.adapters.gemini_scanner import GeminiScanner
+from app.adapters.hedged_scanner import HedgedScanner
 from app.adapters.openai_scanner import OpenAIScanner
 from app.adapters.testing_scanner import TestingScanner
 from app.core.config import settings
 
 class LLMFactory:
+    PROVIDERS = {
+        "gemini": GeminiScanner,
+        "openai": OpenAIScanner,
+        "testing": TestingScanner,
+    }
+
     @staticmethod
     def get_scanner() -> ReceiptScanner:
+        """The configured scanner; every provider call goes through its circuit breaker."""
         provider = settings.AI_PROVIDER.lower()
-        
-        if provider == "openai":
-            return OpenAIScanner()
-        elif provider == "gemini":
-            return GeminiScanner()
-        elif provider == "testing":
-            return TestingScanner()
-        else:
-            # Default fallback
-            return GeminiScanner()
 
+        if provider == "hedged":
+            primary = settings.SCAN_HEDGE_PRIMARY.lower()
+            return HedgedScanner(
+                LLMFactory.get_guarded_scanner([primary]),
+                LLMFactory.get_guarded_scanner([settings.SCAN_HEDGE_SECONDARY.lower()]),
+                primary_name=primary,
+            )
+        # Never fall back to the testing stub: an outage would silently turn into its fake receipt
+        fallbacks = [name.lower() for name in settings.SCAN_FALLBACK_PROVIDERS]
+        return LLMFactory.get_guarded_scanner([provider] + [name for name in fallbacks if name not in (provider, 'testing')])
+
+    @staticmethod
+    def get_guarded_scanner(providers: list) -> ReceiptScanner:
+        """Providers tried in order, each behind its circuit breaker."""
+        return FallbackScanner(providers, LLMFactory.get_provider_scanner)
+
+    @staticmethod
+    def get_provider_scanner(provider: str) -> ReceiptScanner:
+        if provider == "cassette":
+            return LLMFactory.get_cassette_scanner()
+        # Unknown providers fall back to Gemini
+        return LLMFactory.PROVIDERS.get(provider, GeminiScanner)()
+
+    @staticmethod
+    def get_cassette_scanner() -> ReceiptScanner:
+        recorded = settings.SCAN_CASSETTE_PROVIDER.lower()
+        return CassetteScanner(
+            settings.SCAN_CASSETTE_PATH,
+            mode=settings.SCAN_CASSETTE_MODE.lower(),
+            inner=lambda: LLMFactory.get_provider_scanner(recorded),
+            scan_profile=LLMFactory.PROVIDERS.get(recorded, GeminiScanner).scan_profile,
+            time_scale=settings.SCAN_CASSETTE_TIME_SCALE,
+        )
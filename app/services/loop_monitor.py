@@ -0,0 +1,139 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.utils.latency_window import LatencyWindow
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LoopMonitor:
+    """
+    Watches the asyncio event loop the UI runs on.
+
+    - A heartbeat task sleeps LOOP_MONITOR_INTERVAL_SECONDS at a time; how late it wakes up is
+      the loop lag, kept in a rolling window for percentiles.
+    - A watchdog thread checks the heartbeat. Once the loop has not come back for
+      LOOP_BLOCKING_THRESHOLD_SECONDS, it captures the loop thread's stack, i.e. the code of the
+      callback that is blocking right now, and logs it.
+
+    Stalls are counted and the most recent ones kept with their stacks for /metrics and logs.
+    """
+
+    STACK_LIMIT = 25  # innermost frames kept per captured stack
+
+    def __init__(self):
+        self.lag = LatencyWindow(settings.LOOP_MONITOR_WINDOW_SIZE)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.recent_stalls: deque = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._current_stall: Optional[Dict[str, Any]] = None
+        self._heartbeat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        if not settings.LOOP_MONITOR_ENABLED:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _sample(self) -> None:
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self._record_lag(max(0.0, now - start - interval))
+
+    def _record_lag(self, lag: float) -> None:
+        self.lag.add(lag)
+        self.max_lag = max(self.max_lag, lag)
+        with self._lock:
+            stall, self._current_stall = self._current_stall, None
+        if stall is not None:
+            stall['seconds'] = lag
+            self.stalled_seconds += lag
+            logger.warning(f"Event loop was blocked for {lag:.2f}s")
+
+    def _watch(self) -> None:
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        threshold = settings.LOOP_BLOCKING_THRESHOLD_SECONDS
+        while not self._stopped.wait(max(0.01, threshold / 4)):
+            blocked = time.monotonic() - self._heartbeat - interval
+            if blocked > threshold and self._current_stall is None:
+                self._capture(blocked)
+
+    def _capture(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = ''.join(traceback.format_list(traceback.extract_stack(frame, limit=self.STACK_LIMIT)))
+        stall = {'at': datetime.now(), 'seconds': blocked, 'stack': stack}
+        with self._lock:
+            self._current_stall = stall
+        self.stalls += 1
+        self.recent_stalls.append(stall)
+        logger.warning(f"Event loop blocked for more than {blocked:.2f}s in:\n{stack}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'lag_p50': self.lag.percentile(50),
+            'lag_p95': self.lag.percentile(95),
+            'lag_p99': self.lag.percentile(99),
+            'lag_max': self.max_lag,
+            'stalls': self.stalls,
+            'stalled_seconds': self.stalled_seconds,
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus text exposition of the loop metrics."""
+        lines = [
+            '# HELP xpense_event_loop_lag_seconds Event loop lag over the recent sample window.',
+            '# TYPE xpense_event_loop_lag_seconds summary',
+        ]
+        for quantile in (50, 95, 99):
+            value = self.lag.percentile(quantile)
+            if value is not None:
+                lines.append(f'xpense_event_loop_lag_seconds{{quantile="{quantile / 100}"}} {value:.6f}')
+        lines += [
+            '# HELP xpense_event_loop_lag_max_seconds Highest event loop lag since startup.',
+            '# TYPE xpense_event_loop_lag_max_seconds gauge',
+            f'xpense_event_loop_lag_max_seconds {self.max_lag:.6f}',
+            '# HELP xpense_event_loop_blocked_total Callbacks that blocked the event loop longer than the threshold.',
+            '# TYPE xpense_event_loop_blocked_total counter',
+            f'xpense_event_loop_blocked_total {self.stalls}',
+            '# HELP xpense_event_loop_blocked_seconds_total Time the event loop spent blocked in those callbacks.',
+            '# TYPE xpense_event_loop_blocked_seconds_total counter',
+            f'xpense_event_loop_blocked_seconds_total {self.stalled_seconds:.6f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from PIL import features
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.db.models import ReceiptBlob
+from app.services.image_worker import ImageQueueFullError, image_worker_pool
+from app.services.receipt_service import ReceiptService
+from app.services.receipt_storage_service import ReceiptStorageService
+from app.utils.image_processing import estimate_decode_cost, normalize_receipt_image
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReceiptArchiver:
+    """
+    Background job moving receipts of saved expenses older than RECEIPT_ARCHIVE_AFTER_DAYS to the
+    archive tier: the original is recompressed to RECEIPT_ARCHIVE_FORMAT at a lower resolution and
+    quality, then the original and its full-size WebP are deleted (the preview thumbnail stays).
+    Expenses keep their receipt_image_path; get_public_url and scanning resolve the archived copy.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[Dict[str, int]] = None
+
+    async def start(self) -> None:
+        if settings.RECEIPT_ARCHIVE_AFTER_DAYS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.archive()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Receipt archiving failed", exc_info=True)
+            await asyncio.sleep(settings.RECEIPT_ARCHIVE_INTERVAL_HOURS * 3600)
+
+    @staticmethod
+    def archive_format() -> str:
+        output_format = settings.RECEIPT_ARCHIVE_FORMAT.upper()
+        if output_format not in ReceiptService.ARCHIVE_SUFFIXES:
+            logger.warning(f"Unsupported RECEIPT_ARCHIVE_FORMAT {settings.RECEIPT_ARCHIVE_FORMAT}, using WEBP")
+            return 'WEBP'
+        if output_format == 'AVIF' and not features.check('avif'):
+            logger.warning("This Pillow build cannot encode AVIF, archiving as WEBP")
+            return 'WEBP'
+        return output_format
+
+    @staticmethod
+    def _stored_bytes(file_path: str) -> int:
+        return sum(os.path.getsize(path) for path in set(ReceiptService.stored_files(file_path)) if os.path.exists(path))
+
+    async def archive(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive one batch of aged receipts and return {'receipts', 'bytes_saved'}."""
+        cutoff = (now or datetime.now()) - timedelta(days=settings.RECEIPT_ARCHIVE_AFTER_DAYS)
+        output_format = self.archive_format()
+        report = {'receipts': 0, 'bytes_saved': 0}
+
+        db = self.session_factory()
+        try:
+            for blob in ReceiptStorageService.get_archivable(db, cutoff, max(1, settings.RECEIPT_ARCHIVE_BATCH_SIZE)):
+                try:
+                    report['bytes_saved'] += await self._archive_blob(db, blob, output_format)
+                    report['receipts'] += 1
+                except ImageQueueFullError:
+                    # Uploads have priority over archiving; continue on the next run
+                    logger.info("Image workers are busy, postponing receipt archiving")
+                    break
+                except Exception:
+                    logger.error(f"Failed to archive {blob.file_path}", exc_info=True)
+        finally:
+            db.close()
+
+        self.last_report = report
+        if report['receipts']:
+            logger.info(
+                f"Archived {report['receipts']} receipts as {output_format}, "
+                f"saved {report['bytes_saved'] / (1024 * 1024):.1f} MB"
+            )
+        return report
+
+    async def _archive_blob(self, db, blob: ReceiptBlob, output_format: str) -> int:
+        original = blob.file_path
+        before = self._stored_bytes(original)
+        if not os.path.exists(original):
+            # Already archived by an interrupted run, or the files are gone
+            ReceiptStorageService.mark_archived(db, blob, before)
+            return 0
+
+        memory_cost = await asyncio.to_thread(estimate_decode_cost, original, settings.RECEIPT_ARCHIVE_MAX_SIZE_PX)
+        data = await image_worker_pool.run(
+            normalize_receipt_image,
+            original,
+            settings.RECEIPT_ARCHIVE_MAX_SIZE_PX,
+            settings.RECEIPT_ARCHIVE_QUALITY,
+            output_format,
+            memory_cost=memory_cost,
+        )
+
+        replaced = {original, ReceiptService.variant_filename(original, 'full')}
+        replaced_bytes = sum(os.path.getsize(path) for path in replaced if os.path.exists(path))
+        # Receipts that do not get smaller stay as they are, but are not retried
+        if len(data) < replaced_bytes:
+            ReceiptService.write_file_atomic(ReceiptService.archive_filename(original, output_format), data)
+            for path in replaced:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        after = self._stored_bytes(original)
+        ReceiptStorageService.mark_archived(db, blob, after)
+        return before - after
+
+
+receipt_archiver = ReceiptArchiver()
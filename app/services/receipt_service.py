@@ -1,168 +1,570 @@
 import os
-from datetime import datetime
+from typing import Callable, List, Optional, Tuple
 from PIL import Image
-import pillow_heif
+from app.interfaces.scanner import ReceiptImage, ScanImageProfile
+from app.services.image_worker import image_worker_pool
 from app.services.llm_factory import LLMFactory
+from app.services.receipt_storage_service import ReceiptStorageService
+from app.services.scan_cache_service import ScanCacheService
+from app.services.scan_telemetry_service import ScanTelemetryService
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.utils.image_hashing import compute_dhash, sha256_file, sha256_hex
+from app.utils.image_processing import OUTPUT_FORMATS, estimate_decode_cost, prepare_scan_image, render_receipt_variants
+from app.utils.ai_parsing import AIResponseParseError
 from app.utils.logger import get_logger
+from app.utils.scan_usage import ScanUsage, collect_scan_usage
 import io
+import shutil
+import tempfile
 import uuid
+import random
 import asyncio
-
-# Register HEIF opener
-pillow_heif.register_heif_opener()
+import inspect
+import time
 
 logger = get_logger(__name__)
 
 class ReceiptService:
     UPLOAD_DIR = "app/data/uploads"
+    SPOOL_DIR = "app/data/spool"  # Raw uploads while they are being processed
     ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.webp'}
+    # Display variants stored next to the original: size -> filename suffix replacing the extension
+    VARIANT_SUFFIXES = {'thumb': '.thumb.webp', 'full': '.webp'}
+    # Archive tier: aged receipts recompressed in place of the original and its full variant
+    ARCHIVE_SUFFIXES = {'WEBP': '.archive.webp', 'AVIF': '.archive.avif'}
+
+    @staticmethod
+    def _content_path(content_hash: str, ext: str) -> str:
+        """Sharded, content-addressed location of a stored receipt: <UPLOAD_DIR>/ab/cd/<sha256><ext>."""
+        return os.path.join(ReceiptService.UPLOAD_DIR, content_hash[:2], content_hash[2:4], f"{content_hash}{ext}")
 
     @staticmethod
-    def _safe_filename(original_name: str, ext: str) -> str:
-        """Generate a safe filename using a timestamp and uuid; keep provided extension."""
-        base = os.path.basename(original_name or '')
-        # Remove dangerous characters
-        safe_base = ''.join(c for c in base if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
-        unique = f"{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
-        return f"receipt_{unique}{ext}"
+    def write_file_atomic(path: str, data: bytes) -> None:
+        # Concurrent uploads of the same receipt write the same path; never expose a partial file
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
 
     @staticmethod
     def _is_allowed_extension(ext: str) -> bool:
         return ext.lower() in ReceiptService.ALLOWED_EXTENSIONS
 
     @staticmethod
-    def get_public_url(filename: str) -> str:
-        """Return the public URL for a given uploaded file name."""
-        return f"/uploads/{filename}"
+    def variant_filename(filename: str, size: str) -> str:
+        """File name of a display variant ('thumb' or 'full') of an uploaded receipt."""
+        stem, _ = os.path.splitext(filename)
+        return stem + ReceiptService.VARIANT_SUFFIXES[size]
 
     @staticmethod
-    def cleanup_old_uploads():
-        """Deletes files in UPLOAD_DIR older than the configured retention period."""
-        try:
-            if not os.path.exists(ReceiptService.UPLOAD_DIR):
-                return
+    def archive_filename(file_path: str, output_format: str) -> str:
+        stem, _ = os.path.splitext(file_path)
+        return stem + ReceiptService.ARCHIVE_SUFFIXES[output_format]
 
-            retention_minutes = settings.UPLOAD_RETENTION_MINUTES
-            now = datetime.now().timestamp()
+    @staticmethod
+    def resolve_file(file_path: str) -> str:
+        """The file currently holding a stored receipt: the original, or its archived copy."""
+        if not os.path.exists(file_path):
+            for output_format in ReceiptService.ARCHIVE_SUFFIXES:
+                archived = ReceiptService.archive_filename(file_path, output_format)
+                if os.path.exists(archived):
+                    return archived
+        return file_path
 
-            count = 0
-            for filename in os.listdir(ReceiptService.UPLOAD_DIR):
-                file_path = os.path.join(ReceiptService.UPLOAD_DIR, filename)
-                if not os.path.isfile(file_path):
-                    continue
+    @staticmethod
+    def _relative_upload_path(file_path: str) -> str:
+        upload_dir = os.path.abspath(ReceiptService.UPLOAD_DIR)
+        full_path = os.path.abspath(file_path)
+        if full_path.startswith(upload_dir + os.sep):
+            return os.path.relpath(full_path, upload_dir)
+        return file_path  # Already relative to UPLOAD_DIR (e.g. a legacy flat file name)
+
+    @staticmethod
+    def get_public_url(file_path: str, size: str = 'original') -> str:
+        """
+        Return the public URL for an uploaded receipt, given the path returned by save_receipt
+        or a path relative to UPLOAD_DIR.
+        size: 'original' (stored image), 'full' (full resolution WebP) or 'thumb' (small WebP preview).
+        Falls back to the original when the variant does not exist (e.g. uploads from older versions),
+        and to the archived copy once the receipt moved to the archive tier.
+        """
+        relative_path = ReceiptService._relative_upload_path(file_path)
+        if size in ReceiptService.VARIANT_SUFFIXES:
+            variant = ReceiptService.variant_filename(relative_path, size)
+            if os.path.exists(os.path.join(ReceiptService.UPLOAD_DIR, variant)):
+                return "/uploads/" + variant.replace(os.sep, '/')
+        stored = ReceiptService.resolve_file(os.path.join(ReceiptService.UPLOAD_DIR, relative_path))
+        relative_path = os.path.relpath(stored, ReceiptService.UPLOAD_DIR)
+        return "/uploads/" + relative_path.replace(os.sep, '/')
+
+    @staticmethod
+    def stored_files(file_path: str) -> List[str]:
+        """The original, every display variant and archived copy that may exist for a stored receipt."""
+        return (
+            [file_path]
+            + [ReceiptService.variant_filename(file_path, size) for size in ReceiptService.VARIANT_SUFFIXES]
+            + [ReceiptService.archive_filename(file_path, output_format) for output_format in ReceiptService.ARCHIVE_SUFFIXES]
+        )
 
-                file_mtime = os.path.getmtime(file_path)
-                age_minutes = (now - file_mtime) / 60
+    @staticmethod
+    def _find_stored_upload(source_hash: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            blob = ReceiptStorageService.find_by_source(db, source_hash)
+            if blob is not None and os.path.exists(blob.file_path):
+                ReceiptStorageService.touch(db, blob)
+                return blob.file_path
+        except Exception as err:
+            # Deduplication is an optimization only; fall back to encoding the upload
+            logger.warning(f"Receipt storage lookup failed: {err}")
+        finally:
+            db.close()
+        return None
 
-                if age_minutes > retention_minutes:
-                    try:
-                        os.remove(file_path)
-                        count += 1
-                        logger.debug(f"Deleted old file: {filename}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete {filename}: {e}")
+    @staticmethod
+    def _register_stored_upload(content_hash: str, source_hash: str, file_path: str, size_bytes: int) -> None:
+        db = SessionLocal()
+        try:
+            ReceiptStorageService.register(db, content_hash, source_hash, file_path, size_bytes)
+        except Exception as err:
+            logger.warning(f"Failed to index stored receipt {file_path}: {err}")
+        finally:
+            db.close()
 
-            if count > 0:
-                logger.info(f"Cleanup complete. Deleted {count} files.")
+    @staticmethod
+    async def spool_upload(file_obj) -> str:
+        """
+        Write an upload to a temporary file in SPOOL_DIR and return its path, without holding
+        the whole file in memory. Accepts NiceGUI file uploads, file-like objects and bytes.
+        """
+        if file_obj is None:
+            logger.error("Upload content missing")
+            raise ValueError("Upload content missing")
 
-        except Exception as e:
-            logger.error(f"Error during upload cleanup: {e}")
+        os.makedirs(ReceiptService.SPOOL_DIR, exist_ok=True)
+        fd, spool_path = tempfile.mkstemp(dir=ReceiptService.SPOOL_DIR, suffix='.upload')
+        try:
+            if inspect.iscoroutinefunction(getattr(file_obj, 'save', None)):
+                # NiceGUI FileUpload: streamed from its own buffer or temp file
+                os.close(fd)
+                await file_obj.save(spool_path)
+            else:
+                with os.fdopen(fd, 'wb') as f:
+                    if hasattr(file_obj, 'read'):
+                        if hasattr(file_obj, 'seek'):
+                            file_obj.seek(0)
+                        await asyncio.to_thread(shutil.copyfileobj, file_obj, f)
+                    else:
+                        f.write(file_obj)
+        except Exception:
+            ReceiptService._discard_spool(spool_path)
+            raise
+        return spool_path
 
     @staticmethod
-    async def save_receipt(file_obj, original_filename: str = None) -> str:
-        """Save a receipt image with validation/normalization and return the file path."""
+    def _discard_spool(spool_path: str) -> None:
+        try:
+            os.remove(spool_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    async def save_receipt(
+        file_obj,
+        original_filename: str = None,
+        on_queue_position: Optional[Callable[[int], None]] = None,
+    ) -> str:
+        """Save a receipt image (see save_receipt_image) and return the file path."""
+        image = await ReceiptService.save_receipt_image(file_obj, original_filename, on_queue_position)
+        return image.path
+
+    @staticmethod
+    async def save_receipt_image(
+        file_obj,
+        original_filename: str = None,
+        on_queue_position: Optional[Callable[[int], None]] = None,
+    ) -> ReceiptImage:
+        """
+        Save a receipt image with validation/normalization and return it as a ReceiptImage
+        carrying the stored bytes, so it can be scanned without reading the file back.
+        file_obj is a path to the raw upload, or anything spool_upload accepts; uploads are
+        spooled to disk so image workers read them from a file instead of memory.
+        Receipts are stored content-addressed, so uploading the same receipt again returns the
+        existing path without re-encoding or using more disk space.
+        Image processing runs in the image worker pool; on_queue_position(n) is called while
+        the upload waits behind n-1 others (0 once processing starts).
+        """
+        spool_path = None
         try:
             # Ensure uploads dir exists
             os.makedirs(ReceiptService.UPLOAD_DIR, exist_ok=True)
 
-            # Cleanup old files in background to not block the request
-            asyncio.create_task(asyncio.to_thread(ReceiptService.cleanup_old_uploads))
-
-            # Extract content bytes
-            content = None
-            if hasattr(file_obj, 'read'):
-                if hasattr(file_obj, 'seek'):
-                    file_obj.seek(0)
-                raw = file_obj.read()
-                if hasattr(raw, '__await__'):
-                    raw = await raw
-                content = raw
+            if isinstance(file_obj, (str, os.PathLike)):
+                source_path = os.fspath(file_obj)
             else:
-                content = file_obj
-
-            if content is None:
-                logger.error("Upload content missing")
-                raise ValueError("Upload content missing")
-
-            # Validate image using PIL (this protects against non-image uploads)
-            try:
-                img = Image.open(io.BytesIO(content))
-                img.verify()  # verify checks integrity
-            except Exception as img_err:
-                logger.error("Uploaded file is not a valid image", exc_info=True)
-                raise ValueError("Uploaded file is not a valid image")
+                source_path = spool_path = await ReceiptService.spool_upload(file_obj)
 
             # Decide on extension
-            timestamp = int(datetime.now().timestamp())
             name_part = original_filename or 'unknown'
             _, ext = os.path.splitext(name_part)
             if not ext or not ReceiptService._is_allowed_extension(ext):
                 # Default to .jpg
                 ext = '.jpg'
 
-            # Use safe filename
-            filename = ReceiptService._safe_filename(name_part, ext)
-            file_path = os.path.join(ReceiptService.UPLOAD_DIR, filename)
-            logger.info(f"Saving receipt to {file_path} (original: {original_filename})")
-
-            # Re-open image properly (note: verify() leaves file in an unusable state)
-            image = Image.open(io.BytesIO(content)).convert('RGB')
-
-            # Resize image to save RAM during processing
-            try:
-                max_size = settings.RECEIPT_MAX_SIZE_PX
-                if image.width > max_size or image.height > max_size:
-                    logger.info(f"Resizing image from {image.size} to max {max_size}px...")
-                    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            except Exception as resize_err:
-                logger.warning(f"Image resizing failed: {resize_err}")
-
             # Normalize HEIC/HEIF or other formats to JPEG for consistent handling
             out_ext = ext.lower()
-            if out_ext in ('.heic', '.heif'):
+            if out_ext not in OUTPUT_FORMATS:
                 out_ext = '.jpg'
-                filename = os.path.splitext(filename)[0] + out_ext
-                file_path = os.path.join(ReceiptService.UPLOAD_DIR, filename)
 
-            # Save processed image (JPEG by default)
+            # Identical upload bytes were already encoded: reuse the stored receipt as is
+            source_hash = await asyncio.to_thread(sha256_file, source_path)
+            existing = await asyncio.to_thread(ReceiptService._find_stored_upload, source_hash)
+            if existing:
+                logger.info(f"Duplicate upload {original_filename}, reusing {existing}")
+                return ReceiptImage(existing)
+
+            # Validate, decode (reduced on load), orient and resize once, then encode the original
+            # and the display variants from it, off the event loop in the image worker pool.
+            # The header tells how much memory decoding needs, which is charged to the upload budget.
             try:
-                save_kwargs = {}
-                if out_ext in ('.jpg', '.jpeg'):
-                    save_kwargs.update({'format': 'JPEG', 'quality': settings.RECEIPT_JPEG_QUALITY, 'optimize': True})
-                image.save(file_path, **save_kwargs)
-            except Exception as save_err:
-                logger.error(f"Failed to save processed image: {save_err}", exc_info=True)
+                memory_cost = await asyncio.to_thread(estimate_decode_cost, source_path, settings.RECEIPT_MAX_SIZE_PX)
+                variants = await image_worker_pool.run(
+                    render_receipt_variants,
+                    source_path,
+                    settings.RECEIPT_MAX_SIZE_PX,
+                    settings.RECEIPT_JPEG_QUALITY,
+                    OUTPUT_FORMATS[out_ext],
+                    settings.RECEIPT_THUMB_SIZE_PX,
+                    settings.RECEIPT_WEBP_QUALITY,
+                    on_position=on_queue_position,
+                    memory_cost=memory_cost,
+                )
+            except ValueError:
+                logger.error("Uploaded file is not a valid image", exc_info=True)
                 raise
 
-            return file_path
+            # Store under the hash of the normalized image, so different uploads that encode
+            # to the same receipt share one file
+            content_hash = sha256_hex(variants['original'])
+            file_path = ReceiptService._content_path(content_hash, out_ext)
+            if os.path.exists(file_path):
+                logger.info(f"Receipt {original_filename} already stored as {file_path}")
+            else:
+                logger.info(f"Saving receipt to {file_path} (original: {original_filename})")
+                # Variants go first so the original never appears without them
+                try:
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    for size, data in variants.items():
+                        if size != 'original':
+                            ReceiptService.write_file_atomic(ReceiptService.variant_filename(file_path, size), data)
+                    ReceiptService.write_file_atomic(file_path, variants['original'])
+                except Exception as save_err:
+                    logger.error(f"Failed to save processed image: {save_err}", exc_info=True)
+                    raise
+
+            await asyncio.to_thread(
+                ReceiptService._register_stored_upload,
+                content_hash, source_hash, file_path, sum(len(data) for data in variants.values()),
+            )
+            return ReceiptImage(file_path, variants['original'])
 
         except Exception:
             logger.error("Error processing receipt", exc_info=True)
             raise
+        finally:
+            if spool_path:
+                ReceiptService._discard_spool(spool_path)
 
     @staticmethod
-    async def scan_receipt(file_path: str):
-        """Run AI scan for a given file path."""
-        logger.info("Starting AI scan...")
+    def _fingerprint(image: ReceiptImage) -> Optional[Tuple[str, str, int]]:
+        """
+        Return (sha256, dhash, size) of a stored receipt, or None if it cannot be read. The dHash
+        needs a full decode, so it is only computed for near-duplicate lookups ('' otherwise).
+        """
+        try:
+            # Reads the file at most once; the scanner reuses the same bytes
+            data = image.read()
+            perceptual_hash = ''
+            if settings.SCAN_CACHE_NEAR_DUPLICATE_DISTANCE > 0:
+                with Image.open(io.BytesIO(data)) as img:
+                    perceptual_hash = compute_dhash(img)
+        except Exception:
+            return None
+        return sha256_hex(data), perceptual_hash, len(data)
+
+    @staticmethod
+    def _cache_lookup(fingerprint: Tuple[str, str, int], provider: str):
+        db = SessionLocal()
+        try:
+            return ScanCacheService.lookup(db, fingerprint[0], fingerprint[1], provider)
+        except Exception as err:
+            # The cache is an optimization only; never fail a scan because of it
+            logger.warning(f"Scan cache lookup failed: {err}")
+            return None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _cache_store(fingerprint: Tuple[str, str, int], provider: str, result) -> None:
+        db = SessionLocal()
+        try:
+            ScanCacheService.store(db, fingerprint[0], fingerprint[1], provider, result, image_bytes=fingerprint[2])
+        except Exception as err:
+            logger.warning(f"Scan cache store failed: {err}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def invalidate_cached_scan(file_path: str) -> None:
+        """Forget the cached scan of a stored receipt, so scanning it again asks the provider."""
+        fingerprint = ReceiptService._fingerprint(ReceiptImage(ReceiptService.resolve_file(file_path)))
+        if fingerprint is None:
+            return
+        db = SessionLocal()
+        try:
+            removed = ScanCacheService.invalidate(db, fingerprint[0], fingerprint[1])
+            logger.info(f"Dropped {removed} cached scans for {file_path}")
+        except Exception as err:
+            logger.warning(f"Scan cache invalidation failed: {err}")
+        finally:
+            db.close()
+
+    @staticmethod
+    async def prepare_scan_image(image: ReceiptImage, profile: Optional[ScanImageProfile]) -> ReceiptImage:
+        """
+        Cropped, high-contrast grayscale copy of a receipt sized for the scanner's provider.
+        Only sent to the LLM, never stored. Falls back to the stored image if preprocessing fails.
+        """
+        if profile is None or not settings.SCAN_PREPROCESS_ENABLED:
+            return image
+        # Bytes already in memory (fresh uploads, cache fingerprinting) are not read from disk again
+        source = image.data if image.data is not None else image.path
+        try:
+            memory_cost = await asyncio.to_thread(estimate_decode_cost, source, profile.max_size)
+            data = await image_worker_pool.run(
+                prepare_scan_image, source, profile.max_size, profile.quality,
+                profile.tile_size, profile.grayscale, profile.crop,
+                memory_cost=memory_cost,
+            )
+        except Exception as err:
+            logger.warning(f"Scan preprocessing failed for {image.path}, sending the stored image: {err}")
+            return image
+        logger.debug(f"Prepared scan image for {image.path}: {len(data)} bytes")
+        return ReceiptImage(image.path, data=data, mime_type='image/jpeg')
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _record_telemetry(
+        provider: str,
+        usage: Optional[ScanUsage],
+        image_bytes: int,
+        start: float,
+        retries: int,
+        error: Optional[Exception] = None,
+    ) -> None:
+        db = SessionLocal()
+        try:
+            calls = usage.calls if usage else 0
+            ScanTelemetryService.record(
+                db,
+                provider=(usage and usage.provider) or provider,
+                model=usage and usage.model,
+                image_bytes=image_bytes,
+                latency_ms=int((time.monotonic() - start) * 1000),
+                input_tokens=usage.input_tokens if usage else 0,
+                output_tokens=usage.output_tokens if usage else 0,
+                parse_ok=not isinstance(error, AIResponseParseError),
+                retries=retries + max(0, calls - 1),
+                error=str(error)[:500] if error else None,
+            )
+        except Exception as err:
+            # Telemetry must never fail a scan
+            logger.warning(f"Scan telemetry failed: {err}")
+        finally:
+            db.close()
+
+    @staticmethod
+    async def scan_receipt(file_path: str, image: Optional[ReceiptImage] = None, retries: int = 0):
+        """
+        Run AI scan for a given file path. Pass image (e.g. from save_receipt_image) when the
+        encoded bytes are already in memory; otherwise the file is read once.
+        Every call is recorded in the scan telemetry; retries is the caller's retry count.
+        """
+        provider = settings.AI_PROVIDER.lower()
+        start = time.monotonic()
+        if image is None:
+            # Archived receipts are scanned from their recompressed copy
+            image = ReceiptImage(ReceiptService.resolve_file(file_path))
+
+        fingerprint = None
+        if settings.SCAN_CACHE_ENABLED:
+            fingerprint = await asyncio.to_thread(ReceiptService._fingerprint, image)
+            cached = await asyncio.to_thread(ReceiptService._cache_lookup, fingerprint, provider) if fingerprint else None
+            if cached is not None:
+                logger.info(f"Scan cache hit for {file_path}")
+                await asyncio.to_thread(ReceiptService._record_telemetry, 'cache', None, 0, start, retries)
+                return cached.model_copy(update={'receipt_image_path': file_path})
+
         scanner = LLMFactory.get_scanner()
-        result = await asyncio.to_thread(scanner.scan_receipt, file_path)
+        # The cache is keyed by the stored image above; only the request payload is preprocessed
+        image = await ReceiptService.prepare_scan_image(image, scanner.scan_profile)
+        image_bytes = len(image.data) if image.data is not None else ReceiptService._file_size(image.path)
+        with collect_scan_usage() as usage:
+            try:
+                logger.info(f"Starting AI scan ({provider})...")
+                result = await scanner.scan_image_async(image)
+            except Exception as err:
+                await asyncio.to_thread(ReceiptService._record_telemetry, provider, usage, image_bytes, start, retries, error=err)
+                raise
+        await asyncio.to_thread(ReceiptService._record_telemetry, provider, usage, image_bytes, start, retries)
         logger.debug(f"AI Scan result: {result}")
+        if image.path != file_path:
+            result = result.model_copy(update={'receipt_image_path': file_path})
+
+        if fingerprint:
+            await asyncio.to_thread(ReceiptService._cache_store, fingerprint, provider, result)
         return result
 
+    @staticmethod
+    def _is_rate_limit_error(err: Exception) -> bool:
+        """Detect provider rate-limit errors without importing the provider SDKs."""
+        status = getattr(err, 'status_code', None) or getattr(err, 'code', None)
+        if status == 429:
+            return True
+        message = str(err).lower()
+        return 'rate limit' in message or 'resource_exhausted' in message or 'too many requests' in message
+
+    @staticmethod
+    async def _retry_rate_limited(call: Callable, label: str, max_retries: Optional[int] = None):
+        """Await call(attempt), retrying with exponential backoff when the provider rate-limits."""
+        retries = settings.SCAN_MAX_RETRIES if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            try:
+                return await call(attempt)
+            except Exception as err:
+                if attempt >= retries or not ReceiptService._is_rate_limit_error(err):
+                    raise
+                # Full jitter keeps parallel retries from hitting the provider in lockstep
+                delay = settings.SCAN_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                attempt += 1
+                logger.warning(f"Rate limited while scanning {label}, retry {attempt}/{retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def scan_with_retry(file_path: str, max_retries: Optional[int] = None):
+        """Scan a receipt, retrying with exponential backoff when the provider rate-limits."""
+        return await ReceiptService._retry_rate_limited(
+            lambda attempt: ReceiptService.scan_receipt(file_path, retries=attempt), file_path, max_retries
+        )
+
+    @staticmethod
+    async def scan_receipts(
+        file_paths: List[str],
+        max_retries: Optional[int] = None,
+    ) -> List[Tuple[str, object, Optional[Exception]]]:
+        """
+        Scan several receipts with as few provider requests as possible: cache hits are answered
+        directly, the rest are packed into multi-image requests of up to SCAN_BATCH_MAX_IMAGES
+        (bounded by the scanner's max_batch_size). A batch whose answer does not match its images
+        is split in halves and rescanned. Returns (file_path, result, error) in input order.
+        """
+        provider = settings.AI_PROVIDER.lower()
+        outcomes = {}
+        pending = []
+        for file_path in file_paths:
+            start = time.monotonic()
+            image = ReceiptImage(ReceiptService.resolve_file(file_path))
+            fingerprint = None
+            if settings.SCAN_CACHE_ENABLED:
+                fingerprint = await asyncio.to_thread(ReceiptService._fingerprint, image)
+                cached = await asyncio.to_thread(ReceiptService._cache_lookup, fingerprint, provider) if fingerprint else None
+                if cached is not None:
+                    await asyncio.to_thread(ReceiptService._record_telemetry, 'cache', None, 0, start, 0)
+                    outcomes[file_path] = (file_path, cached.model_copy(update={'receipt_image_path': file_path}), None)
+                    continue
+            pending.append((file_path, image, fingerprint))
+
+        if pending:
+            scanner = LLMFactory.get_scanner()
+            size = max(1, min(settings.SCAN_BATCH_MAX_IMAGES, scanner.max_batch_size))
+            prepared = await asyncio.gather(*(
+                ReceiptService.prepare_scan_image(image, scanner.scan_profile) for _, image, _ in pending
+            ))
+            items = [(file_path, image, fingerprint) for (file_path, _, fingerprint), image in zip(pending, prepared)]
+            logger.info(f"Scanning {len(items)} receipts in requests of up to {size} ({provider})")
+            await asyncio.gather(*(
+                ReceiptService._scan_group(scanner, provider, items[i:i + size], outcomes, max_retries)
+                for i in range(0, len(items), size)
+            ))
+        return [outcomes[file_path] for file_path in file_paths]
+
+    @staticmethod
+    async def _scan_group(scanner, provider: str, group: list, outcomes: dict, max_retries: Optional[int]) -> None:
+        """Scan group ([(file_path, image, fingerprint)]) in one request and store the outcomes."""
+        images = [image for _, image, _ in group]
+        image_bytes = [len(image.data) if image.data is not None else ReceiptService._file_size(image.path) for image in images]
+        attempts = [0]
+
+        async def request(attempt: int):
+            attempts[0] = attempt
+            if len(images) == 1:
+                return [await scanner.scan_image_async(images[0])]
+            return await scanner.scan_images_async(images)
+
+        start = time.monotonic()
+        with collect_scan_usage() as usage:
+            try:
+                results = await ReceiptService._retry_rate_limited(request, f"{len(images)} receipts", max_retries)
+            except Exception as err:
+                # The failed request is recorded once, with everything it cost
+                await asyncio.to_thread(
+                    ReceiptService._record_telemetry, provider, usage, sum(image_bytes), start, attempts[0], error=err
+                )
+                if isinstance(err, AIResponseParseError) and len(group) > 1:
+                    middle = len(group) // 2
+                    logger.info(f"Batched answer did not match {len(group)} receipts, splitting into {middle} + {len(group) - middle}")
+                    await asyncio.gather(
+                        ReceiptService._scan_group(scanner, provider, group[:middle], outcomes, max_retries),
+                        ReceiptService._scan_group(scanner, provider, group[middle:], outcomes, max_retries),
+                    )
+                    return
+                logger.warning(f"Scan of {len(group)} receipts failed: {err}")
+                for file_path, _, _ in group:
+                    outcomes[file_path] = (file_path, None, err)
+                return
+
+        # Every receipt gets its share of the request's tokens; latency is the request's
+        share = ScanUsage(usage.provider, usage.model, usage.input_tokens // len(group),
+                          usage.output_tokens // len(group), usage.calls)
+        stored = []
+        for (file_path, image, fingerprint), result, size in zip(group, results, image_bytes):
+            if image.path != file_path:
+                result = result.model_copy(update={'receipt_image_path': file_path})
+            stored.append((fingerprint, result, size))
+            outcomes[file_path] = (file_path, result, None)
+
+        def record_group():
+            # One worker thread writes the telemetry and cache rows of the whole group
+            for fingerprint, result, size in stored:
+                ReceiptService._record_telemetry(provider, share, size, start, attempts[0])
+                if fingerprint:
+                    ReceiptService._cache_store(fingerprint, provider, result)
+
+        await asyncio.to_thread(record_group)
+
     @staticmethod
     async def process_receipt(file_obj, original_filename: str = None):
         """Backward-compatible wrapper: save + scan."""
-        file_path = await ReceiptService.save_receipt(file_obj, original_filename)
-        result = await ReceiptService.scan_receipt(file_path)
-        return result, file_path
+        # The normalized bytes go straight to the scanner instead of being read back from disk
+        image = await ReceiptService.save_receipt_image(file_obj, original_filename)
+        result = await ReceiptService.scan_receipt(image.path, image=image)
+        return result, image.path
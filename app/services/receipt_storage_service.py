@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, exists, func, not_, or_
+from sqlalchemy.orm import Session
+
+from app.db.models import Expense, ReceiptBlob, ScanJob
+from app.services.scan_job_service import OPEN_STATUSES
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReceiptStorageService:
+    """
+    Index of the content-addressed receipt files written by ReceiptService.save_receipt.
+    A blob is referenced by every expense whose receipt_image_path points at it, and by open
+    scan jobs (receipts still being reviewed on the Add page).
+    """
+
+    @staticmethod
+    def _is_referenced(path_column):
+        return or_(
+            exists().where(Expense.receipt_image_path == path_column),
+            exists().where(and_(ScanJob.file_path == path_column, ScanJob.status.in_(OPEN_STATUSES))),
+        )
+
+    @staticmethod
+    def get(db: Session, content_hash: str) -> Optional[ReceiptBlob]:
+        return db.query(ReceiptBlob).filter(ReceiptBlob.content_hash == content_hash).first()
+
+    @staticmethod
+    def find_by_source(db: Session, source_hash: str) -> Optional[ReceiptBlob]:
+        """Blob previously encoded from exactly these upload bytes, if any."""
+        return db.query(ReceiptBlob).filter(ReceiptBlob.source_hash == source_hash).first()
+
+    @staticmethod
+    def register(db: Session, content_hash: str, source_hash: str, file_path: str, size_bytes: int) -> ReceiptBlob:
+        blob = ReceiptStorageService.get(db, content_hash)
+        if blob is None:
+            blob = ReceiptBlob(content_hash=content_hash, source_hash=source_hash,
+                               file_path=file_path, size_bytes=size_bytes)
+            db.add(blob)
+        else:
+            blob.source_hash = blob.source_hash or source_hash
+            blob.created_at = datetime.now()  # Uploaded again: restart the retention period
+            blob.tier = 'original'  # The original was written again; it is archived again once aged
+        db.commit()
+        return blob
+
+    @staticmethod
+    def touch(db: Session, blob: ReceiptBlob) -> None:
+        blob.created_at = datetime.now()
+        db.commit()
+
+    @staticmethod
+    def referenced_paths(db: Session, file_paths: Iterable[str]) -> Set[str]:
+        """Subset of file_paths still referenced by an expense or an open scan job."""
+        paths = list(file_paths)
+        if not paths:
+            return set()
+        referenced = {row[0] for row in db.query(Expense.receipt_image_path).filter(
+            Expense.receipt_image_path.in_(paths)
+        ).distinct()}
+        referenced.update(row[0] for row in db.query(ScanJob.file_path).filter(
+            ScanJob.file_path.in_(paths), ScanJob.status.in_(OPEN_STATUSES)
+        ).distinct())
+        return referenced
+
+    @staticmethod
+    def get_expired(db: Session, cutoff: datetime, limit: int) -> List[ReceiptBlob]:
+        """Oldest unreferenced blobs created before cutoff (uses the created_at index)."""
+        return db.query(ReceiptBlob).filter(
+            ReceiptBlob.created_at < cutoff,
+            not_(ReceiptStorageService._is_referenced(ReceiptBlob.file_path)),
+        ).order_by(ReceiptBlob.created_at).limit(limit).all()
+
+    @staticmethod
+    def delete(db: Session, content_hashes: Iterable[str]) -> int:
+        hashes = list(content_hashes)
+        if not hashes:
+            return 0
+        removed = db.query(ReceiptBlob).filter(
+            ReceiptBlob.content_hash.in_(hashes)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return int(removed or 0)
+
+    @staticmethod
+    def get_archivable(db: Session, cutoff: datetime, limit: int) -> List[ReceiptBlob]:
+        """Oldest receipts still in the original tier that saved expenses keep long term."""
+        return db.query(ReceiptBlob).filter(
+            ReceiptBlob.tier == 'original',
+            ReceiptBlob.created_at < cutoff,
+            exists().where(Expense.receipt_image_path == ReceiptBlob.file_path),
+        ).order_by(ReceiptBlob.created_at).limit(limit).all()
+
+    @staticmethod
+    def mark_archived(db: Session, blob: ReceiptBlob, size_bytes: int) -> None:
+        blob.tier = 'archive'
+        blob.size_bytes = size_bytes
+        db.commit()
+
+    @staticmethod
+    def get_tier_stats(db: Session) -> Dict[str, Dict[str, int]]:
+        """Receipt count and stored bytes per tier."""
+        rows = db.query(ReceiptBlob.tier, func.count(ReceiptBlob.content_hash), func.sum(ReceiptBlob.size_bytes)).group_by(
+            ReceiptBlob.tier
+        ).all()
+        return {tier: {"receipts": int(count), "bytes": int(total or 0)} for tier, count, total in rows}
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import ScanCacheEntry
+from app.db.schemas import ExpenseCreate
+from app.utils.image_hashing import hamming_distance
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ScanCacheService:
+    """
+    Database-backed cache of scan results keyed by the SHA-256 of the normalized receipt image,
+    with an opt-in perceptual-hash fallback for near-duplicates (same photo re-encoded or resized).
+    """
+
+    # Process-wide counters since startup; persistent per-entry hit counts live in the table
+    _stats = {'hits': 0, 'near_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def lookup(db: Session, content_hash: str, perceptual_hash: str, provider: str) -> Optional[ExpenseCreate]:
+        entry = db.query(ScanCacheEntry).filter(
+            ScanCacheEntry.content_hash == content_hash,
+            ScanCacheEntry.provider == provider,
+        ).first()
+        stat = 'hits'
+
+        if entry is None:
+            near = ScanCacheService._near_duplicates(db, perceptual_hash, provider)
+            if near:
+                entry = db.query(ScanCacheEntry).filter(ScanCacheEntry.content_hash == near[0][1]).first()
+                stat = 'near_hits'
+
+        if entry is None:
+            ScanCacheService._stats['misses'] += 1
+            return None
+
+        ScanCacheService._stats[stat] += 1
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.now()
+        db.commit()
+        return ExpenseCreate.model_validate_json(entry.result_json)
+
+    @staticmethod
+    def store(
+        db: Session,
+        content_hash: str,
+        perceptual_hash: str,
+        provider: str,
+        result: ExpenseCreate,
+        image_bytes: int = 0,
+    ) -> None:
+        entry = db.query(ScanCacheEntry).filter(ScanCacheEntry.content_hash == content_hash).first()
+        if entry is None:
+            entry = ScanCacheEntry(content_hash=content_hash, hit_count=0)
+            db.add(entry)
+        entry.perceptual_hash = perceptual_hash
+        entry.provider = provider
+        entry.result_json = result.model_dump_json()
+        entry.image_bytes = image_bytes
+        entry.created_at = datetime.now()
+        db.commit()
+        ScanCacheService.evict(db)
+
+    @staticmethod
+    def _near_duplicates(db: Session, perceptual_hash: str, provider: Optional[str] = None) -> List[Tuple[int, str]]:
+        """(distance, content_hash) of the entries within SCAN_CACHE_NEAR_DUPLICATE_DISTANCE, closest first."""
+        max_distance = settings.SCAN_CACHE_NEAR_DUPLICATE_DISTANCE
+        if max_distance <= 0 or not perceptual_hash:
+            return []
+        # Entries stored while near-duplicate lookup was off have no dHash ('')
+        query = db.query(ScanCacheEntry.content_hash, ScanCacheEntry.perceptual_hash).filter(
+            ScanCacheEntry.perceptual_hash != ''
+        )
+        if provider is not None:
+            query = query.filter(ScanCacheEntry.provider == provider)
+        distances = ((hamming_distance(perceptual_hash, phash), chash) for chash, phash in query.all())
+        return sorted(match for match in distances if match[0] <= max_distance)
+
+    @staticmethod
+    def invalidate(db: Session, content_hash: str, perceptual_hash: str) -> int:
+        """Drop every entry a lookup of this image could be served from, so the next scan asks the provider."""
+        stale = {content_hash} | {chash for _, chash in ScanCacheService._near_duplicates(db, perceptual_hash)}
+        removed = db.query(ScanCacheEntry).filter(
+            ScanCacheEntry.content_hash.in_(stale)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return int(removed or 0)
+
+    @staticmethod
+    def evict(db: Session) -> int:
+        """Apply the age and size limits; least recently used entries are dropped first."""
+        cutoff = datetime.now() - timedelta(days=settings.SCAN_CACHE_MAX_AGE_DAYS)
+        removed = db.query(ScanCacheEntry).filter(
+            func.coalesce(ScanCacheEntry.last_hit_at, ScanCacheEntry.created_at) < cutoff
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(func.count(ScanCacheEntry.content_hash)).scalar() - settings.SCAN_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale = db.query(ScanCacheEntry.content_hash).order_by(
+                func.coalesce(ScanCacheEntry.last_hit_at, ScanCacheEntry.created_at)
+            ).limit(overflow).all()
+            removed += db.query(ScanCacheEntry).filter(
+                ScanCacheEntry.content_hash.in_([row[0] for row in stale])
+            ).delete(synchronize_session=False)
+
+        db.commit()
+        if removed:
+            logger.info(f"Scan cache evicted {removed} entries")
+        return int(removed or 0)
+
+    @staticmethod
+    def clear(db: Session) -> int:
+        removed = db.query(ScanCacheEntry).delete(synchronize_session=False)
+        db.commit()
+        return int(removed or 0)
+
+    @staticmethod
+    def get_stats(db: Session) -> Dict[str, Any]:
+        entries, total_hits, total_bytes = db.query(
+            func.count(ScanCacheEntry.content_hash),
+            func.sum(ScanCacheEntry.hit_count),
+            func.sum(ScanCacheEntry.image_bytes),
+        ).one()
+        stats = ScanCacheService._stats
+        lookups = stats['hits'] + stats['near_hits'] + stats['misses']
+        return {
+            "entries": int(entries or 0),
+            "image_bytes": int(total_bytes or 0),
+            "lifetime_hits": int(total_hits or 0),
+            "hits": stats['hits'],
+            "near_hits": stats['near_hits'],
+            "misses": stats['misses'],
+            "hit_rate": (stats['hits'] + stats['near_hits']) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.models import ScanJob
+from app.db.schemas import ExpenseCreate
+
+OPEN_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class ScanJobService:
+    @staticmethod
+    def enqueue(db: Session, file_path: str) -> ScanJob:
+        """Queue a scan for file_path, reusing an existing queued/running job for the same file."""
+        job = db.query(ScanJob).filter(
+            ScanJob.file_path == file_path,
+            ScanJob.status.in_(('queued', 'running')),
+        ).first()
+        if job:
+            return job
+
+        job = ScanJob(file_path=file_path, status='queued', attempts=0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def claim_next(db: Session) -> Optional[ScanJob]:
+        """Atomically move the oldest queued job to 'running' and return it."""
+        while True:
+            job = db.query(ScanJob).filter(ScanJob.status == 'queued').order_by(ScanJob.id).first()
+            if job is None:
+                return None
+
+            # Conditional update so two workers can never claim the same job
+            claimed = db.query(ScanJob).filter(ScanJob.id == job.id, ScanJob.status == 'queued').update(
+                {'status': 'running', 'attempts': ScanJob.attempts + 1},
+                synchronize_session=False,
+            )
+            db.commit()
+            if claimed:
+                db.refresh(job)
+                return job
+
+    @staticmethod
+    def claim_batch(db: Session, limit: int) -> List[ScanJob]:
+        """Claim up to limit queued jobs, oldest first (fewer if the queue is shorter)."""
+        jobs = []
+        while len(jobs) < limit:
+            job = ScanJobService.claim_next(db)
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    @staticmethod
+    def complete(db: Session, job_id: int, result: ExpenseCreate) -> None:
+        db.query(ScanJob).filter(ScanJob.id == job_id).update(
+            {'status': 'done', 'result_json': result.model_dump_json(), 'error': None},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def fail(db: Session, job_id: int, error: str, retry: bool) -> None:
+        db.query(ScanJob).filter(ScanJob.id == job_id).update(
+            {'status': 'queued' if retry else 'failed', 'error': error},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def requeue_stale(db: Session) -> int:
+        """Return jobs left 'running' by a previous process (restart/crash) to the queue."""
+        count = db.query(ScanJob).filter(ScanJob.status == 'running').update(
+            {'status': 'queued'}, synchronize_session=False
+        )
+        db.commit()
+        return int(count or 0)
+
+    @staticmethod
+    def dismiss(db: Session, job_id: int) -> None:
+        """Mark a job as handled by the user so the Add page no longer reattaches it."""
+        db.query(ScanJob).filter(ScanJob.id == job_id).update(
+            {'status': 'dismissed'}, synchronize_session=False
+        )
+        db.commit()
+
+    @staticmethod
+    def purge_finished(db: Session, older_than_days: int) -> int:
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        count = db.query(ScanJob).filter(
+            ScanJob.status.in_(('dismissed', 'failed')),
+            ScanJob.updated_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return int(count or 0)
+
+    @staticmethod
+    def get_jobs(db: Session, job_ids: List[int]) -> List[ScanJob]:
+        if not job_ids:
+            return []
+        return db.query(ScanJob).filter(ScanJob.id.in_(job_ids)).all()
+
+    @staticmethod
+    def get_open_jobs(db: Session) -> List[ScanJob]:
+        """Jobs the Add page should reattach to (anything not yet dismissed)."""
+        return db.query(ScanJob).filter(ScanJob.status.in_(OPEN_STATUSES)).order_by(ScanJob.id).all()
+
+    @staticmethod
+    def get_result(job: ScanJob) -> Optional[ExpenseCreate]:
+        if not job.result_json:
+            return None
+        return ExpenseCreate.model_validate_json(job.result_json)
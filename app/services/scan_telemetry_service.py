@@ -0,0 +1,99 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import ScanTelemetry
+from app.utils.latency_window import LatencyWindow
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ScanTelemetryService:
+    """One row per ReceiptService.scan_receipt call, and monthly latency/cost aggregates over them."""
+
+    @staticmethod
+    def record(
+        db: Session,
+        provider: str,
+        model: Optional[str],
+        image_bytes: int,
+        latency_ms: int,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        parse_ok: bool = True,
+        retries: int = 0,
+        error: Optional[str] = None,
+    ) -> ScanTelemetry:
+        row = ScanTelemetry(
+            provider=provider,
+            model=model,
+            image_bytes=image_bytes,
+            latency_ms=latency_ms,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            parse_ok=parse_ok,
+            retries=retries,
+            error=error,
+        )
+        db.add(row)
+        db.commit()
+        return row
+
+    @staticmethod
+    def cost_usd(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+        """Token cost from SCAN_TOKEN_PRICES_USD; 0 for models without a price."""
+        input_price, output_price = settings.SCAN_TOKEN_PRICES_USD.get(model or '', (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    @staticmethod
+    def get_monthly_stats(db: Session, months: int = 12) -> List[Dict[str, Any]]:
+        """
+        Per month and provider/model: scan count, p50/p95 latency, average image size, tokens,
+        cost, parse failures and retries. Newest month first.
+        """
+        since = (datetime.now().replace(day=1) - timedelta(days=31 * (months - 1))).replace(day=1)
+        rows = db.query(
+            ScanTelemetry.created_at, ScanTelemetry.provider, ScanTelemetry.model, ScanTelemetry.image_bytes,
+            ScanTelemetry.latency_ms, ScanTelemetry.input_tokens, ScanTelemetry.output_tokens,
+            ScanTelemetry.parse_ok, ScanTelemetry.retries,
+        ).filter(ScanTelemetry.created_at >= since).all()
+
+        groups = defaultdict(list)
+        for row in rows:
+            groups[(row.created_at.strftime('%Y-%m'), row.provider, row.model)].append(row)
+
+        stats = []
+        for (month, provider, model), group in groups.items():
+            # Percentiles in Python: neither SQLite nor a portable SQL query provides them
+            latencies = LatencyWindow(len(group))
+            for row in group:
+                latencies.add(row.latency_ms)
+            input_tokens = sum(row.input_tokens for row in group)
+            output_tokens = sum(row.output_tokens for row in group)
+            stats.append({
+                "month": month,
+                "provider": provider,
+                "model": model,
+                "scans": len(group),
+                "p50_ms": latencies.percentile(50),
+                "p95_ms": latencies.percentile(95),
+                "avg_image_kb": sum(row.image_bytes for row in group) / len(group) / 1024,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": ScanTelemetryService.cost_usd(model, input_tokens, output_tokens),
+                "parse_failures": sum(1 for row in group if not row.parse_ok),
+                "retries": sum(row.retries for row in group),
+            })
+        stats.sort(key=lambda item: (item["month"], item["scans"]), reverse=True)
+        return stats
+
+    @staticmethod
+    def purge(db: Session, retention_days: int) -> int:
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        removed = db.query(ScanTelemetry).filter(ScanTelemetry.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return int(removed or 0)
@@ -0,0 +1,127 @@
+import asyncio
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.receipt_service import ReceiptService
+from app.services.scan_job_service import ScanJobService
+from app.services.scan_telemetry_service import ScanTelemetryService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ScanWorkerPool:
+    """
+    In-process worker pool draining the persistent scan_jobs table.
+    Jobs outlive browser tabs and restarts: anything left 'running' is re-queued on start.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self, workers: Optional[int] = None) -> None:
+        count = max(1, workers or settings.SCAN_BATCH_CONCURRENCY)
+        db = self.session_factory()
+        try:
+            requeued = ScanJobService.requeue_stale(db)
+            purged = ScanJobService.purge_finished(db, settings.SCAN_JOB_RETENTION_DAYS)
+            ScanTelemetryService.purge(db, settings.SCAN_TELEMETRY_RETENTION_DAYS)
+        finally:
+            db.close()
+        if requeued or purged:
+            logger.info(f"Scan queue recovered {requeued} interrupted jobs, purged {purged} old jobs")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(count)]
+        logger.info(f"Started {count} scan workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after new jobs were queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def enqueue(self, file_path: str) -> int:
+        db = self.session_factory()
+        try:
+            job_id = ScanJobService.enqueue(db, file_path).id
+        finally:
+            db.close()
+        self.notify()
+        return job_id
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                if await self.process_next():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error(f"Scan worker {index} crashed while processing a job", exc_info=True)
+
+            # Idle: sleep until notified or the poll interval elapses
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.SCAN_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_next(self) -> bool:
+        """
+        Claim and run queued jobs: one, or up to SCAN_BATCH_MAX_IMAGES scanned with batched
+        provider requests when more are waiting. Returns False when the queue is empty.
+        """
+        db = self.session_factory()
+        try:
+            jobs = ScanJobService.claim_batch(db, max(1, settings.SCAN_BATCH_MAX_IMAGES))
+            if not jobs:
+                return False
+            claimed = [(job.id, job.file_path, job.attempts) for job in jobs]
+
+            try:
+                if len(claimed) == 1:
+                    outcomes = [await self._scan_one(claimed[0][1])]
+                else:
+                    outcomes = await ReceiptService.scan_receipts([file_path for _, file_path, _ in claimed])
+            except asyncio.CancelledError:
+                # Shutdown mid-scan: leave the jobs for the next process
+                for job_id, _, _ in claimed:
+                    ScanJobService.fail(db, job_id, 'interrupted', retry=True)
+                raise
+            except Exception as err:
+                # The whole batch failed before per-receipt outcomes (e.g. the scanner could not be created)
+                logger.warning(f"Scan batch of {len(claimed)} jobs failed: {err}")
+                outcomes = [(file_path, None, err) for _, file_path, _ in claimed]
+
+            for (job_id, _, attempts), (_, result, err) in zip(claimed, outcomes):
+                if err is not None:
+                    retry = attempts < settings.SCAN_JOB_MAX_ATTEMPTS
+                    logger.warning(f"Scan job {job_id} failed (attempt {attempts}): {err}")
+                    ScanJobService.fail(db, job_id, str(err), retry=retry)
+                else:
+                    ScanJobService.complete(db, job_id, result)
+                    logger.debug(f"Scan job {job_id} done")
+            return True
+        finally:
+            db.close()
+
+    @staticmethod
+    async def _scan_one(file_path: str):
+        try:
+            return file_path, await ReceiptService.scan_with_retry(file_path), None
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            return file_path, None, err
+
+
+scan_worker_pool = ScanWorkerPool()
@@ -0,0 +1,146 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.receipt_service import ReceiptService
+from app.services.receipt_storage_service import ReceiptStorageService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UploadSweeper:
+    """
+    Periodically removes uploaded receipts that outlived UPLOAD_RETENTION_MINUTES and are not
+    referenced by an expense or an open scan job.
+
+    Content-addressed receipts are found through the receipt_blobs created_at index, so a sweep
+    never lists the upload directory. Flat files from older versions are only looked for in the
+    top level of UPLOAD_DIR, which empties out as they expire.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[Dict[str, int]] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Upload sweep failed", exc_info=True)
+            await asyncio.sleep(settings.UPLOAD_SWEEP_INTERVAL_MINUTES * 60)
+
+    @staticmethod
+    def _remove_files(paths: List[str]) -> tuple:
+        """Delete files, returning (files removed, bytes reclaimed, all gone)."""
+        files, reclaimed, complete = 0, 0, True
+        for path in paths:
+            try:
+                size = os.stat(path).st_size
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as err:
+                logger.warning(f"Failed to delete {path}: {err}")
+                complete = False
+                continue
+            files += 1
+            reclaimed += size
+        return files, reclaimed, complete
+
+    def sweep(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Run one sweep and return {'receipts', 'files', 'bytes'} removed."""
+        cutoff = (now or datetime.now()) - timedelta(minutes=settings.UPLOAD_RETENTION_MINUTES)
+        batch_size = max(1, settings.UPLOAD_SWEEP_BATCH_SIZE)
+        report = {'receipts': 0, 'files': 0, 'bytes': 0}
+
+        db = self.session_factory()
+        try:
+            while True:
+                blobs = ReceiptStorageService.get_expired(db, cutoff, batch_size)
+                deleted = []
+                for blob in blobs:
+                    files, reclaimed, complete = self._remove_files(ReceiptService.stored_files(blob.file_path))
+                    report['files'] += files
+                    report['bytes'] += reclaimed
+                    if complete:
+                        deleted.append(blob.content_hash)
+                report['receipts'] += ReceiptStorageService.delete(db, deleted)
+                # A short batch is the last one; stop early if nothing could be deleted
+                if len(blobs) < batch_size or not deleted:
+                    break
+
+            self._sweep_legacy(db, cutoff, batch_size, report)
+        finally:
+            db.close()
+        self._sweep_spool(cutoff, report)
+
+        self.last_report = report
+        if report['files']:
+            logger.info(
+                f"Upload sweep removed {report['receipts']} receipts ({report['files']} files), "
+                f"reclaimed {report['bytes'] / (1024 * 1024):.1f} MB"
+            )
+        return report
+
+    def _sweep_spool(self, cutoff: datetime, report: Dict[str, int]) -> None:
+        """Remove raw upload spool files left behind by a crash mid-upload."""
+        if not os.path.isdir(ReceiptService.SPOOL_DIR):
+            return
+        cutoff_ts = cutoff.timestamp()
+        with os.scandir(ReceiptService.SPOOL_DIR) as entries:
+            stale = [entry.path for entry in entries if entry.is_file() and entry.stat().st_mtime < cutoff_ts]
+        files, reclaimed, _ = self._remove_files(stale)
+        report['files'] += files
+        report['bytes'] += reclaimed
+
+    @staticmethod
+    def _receipt_stem(path: str) -> str:
+        for suffix in ReceiptService.VARIANT_SUFFIXES.values():
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return os.path.splitext(path)[0]
+
+    def _sweep_legacy(self, db, cutoff: datetime, batch_size: int, report: Dict[str, int]) -> None:
+        """Expire flat receipt_<timestamp>_<uuid>.<ext> files written before content-addressed storage."""
+        upload_dir = ReceiptService.UPLOAD_DIR
+        if not os.path.isdir(upload_dir):
+            return
+
+        cutoff_ts = cutoff.timestamp()
+        with os.scandir(upload_dir) as entries:
+            expired = [
+                entry.path for entry in entries
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff_ts
+            ]
+
+        # Keep a receipt's display variants together with it, so a referenced receipt keeps its previews
+        groups: Dict[str, List[str]] = {}
+        for path in expired:
+            groups.setdefault(self._receipt_stem(path), []).append(path)
+
+        stems = list(groups)
+        for start in range(0, len(stems), batch_size):
+            paths = [path for stem in stems[start:start + batch_size] for path in groups[stem]]
+            referenced = {self._receipt_stem(path) for path in ReceiptStorageService.referenced_paths(db, paths)}
+            files, reclaimed, _ = self._remove_files([path for path in paths if self._receipt_stem(path) not in referenced])
+            report['files'] += files
+            report['bytes'] += reclaimed
+
+upload_sweeper = UploadSweeper()
@@ -3,13 +3,15 @@ from datetime import date, datetime
 from app.core.database import get_db
 from app.services.expense_service import ExpenseService
 from app.services.receipt_service import ReceiptService
+from app.services.scan_job_service import ScanJobService
+from app.services.scan_worker import scan_worker_pool
+from app.services.image_worker import ImageQueueFullError
 from app.db.schemas import ExpenseCreate
 from app.core.config import settings
 from app.ui.layout import theme, BREAKPOINT
 from app.utils.logger import get_logger
-import io
-import os
 import asyncio
+import os
 
 # Configure logging
 logger = get_logger(__name__)
@@ -145,9 +147,12 @@ def add_expense_page():
                     def remove_receipt(entry):
                         if entry in active_receipts:
                             active_receipts.remove(entry)
+                        if entry.get('job_id'):
+                            forget_job(entry['job_id'])
                         entry['card'].delete()
                         if not active_receipts:
-                            save_all_btn.classes(add='hidden')
+                            bulk_actions.classes(add='hidden')
+                        update_progress()
 
                     async def save_all():
                         saved_count = 0
@@ -164,7 +169,8 @@ def add_expense_page():
                                     category=inputs['category'].value,
                                     description=inputs['description'].value,
                                     amount=amount_val,
-                                    currency=inputs['currency'].value
+                                    currency=inputs['currency'].value,
+                                    receipt_image_path=entry['file_path']
                                 )
                                 db = next(get_db())
                                 ExpenseService.create_expense(db, expense_data)
@@ -177,10 +183,217 @@ def add_expense_page():
                         if saved_count > 0:
                             ui.notify(f'Saved {saved_count} expenses successfully!', type='positive')
                         if errors == 0 and saved_count > 0:
-                            save_all_btn.classes(add='hidden')
+                            bulk_actions.classes(add='hidden')
+
+                    def set_scanning(entry_ref, scanning: bool):
+                        entry_ref['scanning'] = scanning
+                        if scanning:
+                            entry_ref['scan_btn'].disable()
+                            entry_ref['scan_btn'].props('loading')
+                        else:
+                            entry_ref['scan_btn'].enable()
+                            entry_ref['scan_btn'].props(remove='loading')
+
+                    def show_scan_error(entry_ref, error):
+                        # A failed scan keeps its card: the error stays visible and Scan becomes Retry
+                        entry_ref['error_label'].set_text(f'Scan failed: {error}' if error else '')
+                        entry_ref['error_label'].set_visibility(bool(error))
+                        entry_ref['scan_btn'].set_text('Retry' if error else 'Scan')
+
+                    def apply_scan_result(entry_ref, result):
+                        entry_ref['inputs']['date'].set_value(result.date.strftime('%Y-%m-%d'))
+                        entry_ref['inputs']['category'].set_value(result.category)
+                        entry_ref['inputs']['description'].set_value(result.description)
+                        entry_ref['inputs']['amount'].set_value(f"{float(result.amount):.2f}")
+                        entry_ref['inputs']['currency'].set_value(result.currency)
+                        entry_ref['scanned'] = True
+
+                    # --- Scan jobs ---
+                    # Scans run as persisted jobs in the background worker pool, so they keep going
+                    # when this tab closes or the app restarts; the page only polls for results.
+                    batch = {'job_ids': set(), 'finished': set(), 'failed': 0}
+
+                    def forget_job(job_id):
+                        # The same receipt uploaded twice shares one stored file and scan job
+                        if any(entry.get('job_id') == job_id for entry in active_receipts):
+                            return
+                        batch['job_ids'].discard(job_id)
+                        batch['finished'].discard(job_id)
+                        db = next(get_db())
+                        try:
+                            ScanJobService.dismiss(db, job_id)
+                        finally:
+                            db.close()
+
+                    def update_progress():
+                        total = len(batch['job_ids'])
+                        finished = len(batch['finished'])
+                        if total == 0 or finished >= total:
+                            scan_progress_row.classes(add='hidden')
+                            return
+                        scan_progress.set_value(finished / total)
+                        scan_progress_label.set_text(f'Scanned {finished} / {total}')
+                        scan_progress_row.classes(remove='hidden')
+
+                    def finish_batch_if_done():
+                        total = len(batch['job_ids'])
+                        if total == 0 or len(batch['finished']) < total:
+                            return
+                        failed = batch['failed']
+                        done = total - failed
+                        if failed:
+                            ui.notify(f"Scanned {done} receipts, {failed} failed.", type='warning', timeout=5000)
+                        elif done == 1:
+                            ui.notify('Receipt scanned! Review and save.', type='positive', timeout=5000)
+                        else:
+                            ui.notify(f"Scanned {done} receipts! Review and save.", type='positive', timeout=5000)
+                        batch.update({'job_ids': set(), 'finished': set(), 'failed': 0})
+
+                    def queue_scans(entries):
+                        for entry_ref in entries:
+                            previous_job = entry_ref.pop('job_id', None)
+                            if previous_job:
+                                forget_job(previous_job)
+                            entry_ref['job_id'] = scan_worker_pool.enqueue(entry_ref['file_path'])
+                            entry_ref['scanned'] = False
+                            show_scan_error(entry_ref, None)
+                            set_scanning(entry_ref, True)
+                            batch['job_ids'].add(entry_ref['job_id'])
+                        update_progress()
+
+                    async def run_scan(entry_ref):
+                        if entry_ref.get('scanned') and settings.SCAN_CACHE_ENABLED:
+                            # Scanning a scanned receipt again asks the provider instead of the cache
+                            await asyncio.to_thread(ReceiptService.invalidate_cached_scan, entry_ref['file_path'])
+                        queue_scans([entry_ref])
+
+                    def scan_all():
+                        pending = [entry for entry in active_receipts if not entry.get('scanned') and not entry.get('scanning')]
+                        if not pending:
+                            ui.notify('All receipts are already scanned.', type='info')
+                            return
+                        queue_scans(pending)
+
+                    def poll_jobs():
+                        waiting = {}
+                        for entry in active_receipts:
+                            if entry.get('scanning') and entry.get('job_id'):
+                                waiting.setdefault(entry['job_id'], []).append(entry)
+                        if not waiting:
+                            return
+
+                        db = next(get_db())
+                        try:
+                            jobs = ScanJobService.get_jobs(db, list(waiting))
+                        finally:
+                            db.close()
+
+                        for job in jobs:
+                            if job.status == 'done':
+                                result = ScanJobService.get_result(job)
+                                for entry_ref in waiting[job.id]:
+                                    set_scanning(entry_ref, False)
+                                    apply_scan_result(entry_ref, result)
+                                batch['finished'].add(job.id)
+                            elif job.status == 'failed':
+                                for entry_ref in waiting[job.id]:
+                                    set_scanning(entry_ref, False)
+                                    show_scan_error(entry_ref, job.error or 'unknown error')
+                                batch['finished'].add(job.id)
+                                batch['failed'] += 1
+                                ui.notify(f'Scan failed: {job.error}', type='negative', timeout=5000)
+
+                        update_progress()
+                        finish_batch_if_done()
+
+                    ui.timer(1.0, poll_jobs)
+
+                    with ui.row().classes('w-full items-center gap-3 hidden') as scan_progress_row:
+                        scan_progress = ui.linear_progress(value=0, show_value=False).classes('flex-1')
+                        scan_progress_label = ui.label('').classes('text-sm text-gray-600')
 
-                    save_all_btn = ui.button('Save All', on_click=save_all, icon='save') \
-                        .classes('w-full bg-green-600 text-white mt-4 hidden')
+                    with ui.row().classes('w-full gap-2 mt-4 hidden') as bulk_actions:
+                        ui.button('Scan All', on_click=scan_all, icon='auto_fix_high') \
+                            .props('outline color=blue').classes('flex-1')
+                        ui.button('Save All', on_click=save_all, icon='save') \
+                            .classes('flex-1 bg-green-600 text-white')
+
+                    def create_receipt_card(file_path):
+                        # Create UI Card for this receipt
+                        with receipts_container:
+                            with ui.card().classes('w-full p-4 shadow-sm border border-gray-200 relative receipt-card') as card:
+                                entry = {'card': card}
+                                
+                                # Close Button
+                                ui.button(icon='close', on_click=lambda: remove_receipt(entry)) \
+                                    .props('flat round dense color=red aria-label="Remove receipt" title="Remove receipt"').classes('absolute top-2 right-2 z-10')
+                                
+                                with ui.row().classes('w-full gap-4 responsive-row items-center sm:items-start'):
+                                    # Image Preview
+                                    with ui.element('div').classes('w-full preview-container'):
+                                        # Construct the web path through the helper (serves as single source of truth)
+                                        thumb_path = ReceiptService.get_public_url(file_path, size='thumb')
+                                        full_path = ReceiptService.get_public_url(file_path, size='full')
+                                        # Use page-scoped classes to control size via CSS
+                                        ui.image(thumb_path).props('alt="Receipt preview"').classes('preview-image bg-gray-50 rounded cursor-pointer border border-gray-100') \
+                                            .on('click', lambda src=full_path: show_full_image(src))
+                                    
+                                    # Form Fields
+                                    with ui.column().classes('flex-grow gap-2 w-full'):
+                                        # Mobile: Stack fields vertically, Desktop: Use grid
+                                        with ui.grid().classes('w-full gap-2 responsive-grid-2'):
+                                            date_input = ui.input(label='Date', value=date.today().strftime('%Y-%m-%d')).props('type=date').classes('w-full')
+                                            cat_input = ui.select(options=settings.EXPENSE_CATEGORIES, label="Category", value=settings.EXPENSE_CATEGORIES[0]).classes('w-full')
+                                            desc_input = ui.input(label="Description", value='').classes('w-full sm:col-span-2')
+                                            with ui.row().classes('w-full gap-2 sm:col-span-2'):
+                                                amount_input = ui.input(label="Amount", value=None).classes('flex-1') \
+                                                    .on('input', sanitize_amount) \
+                                                    .on('blur', format_on_blur)
+                                                curr_input = ui.select(options=settings.CURRENCIES, label="Currency", value=settings.DEFAULT_CURRENCY).classes('w-24')
+
+                                        error_label = ui.label('').classes('w-full text-sm text-red-600')
+                                        error_label.set_visibility(False)
+                                        with ui.row().classes('w-full justify-center'):
+                                            scan_btn = ui.button('Scan', icon='auto_fix_high', on_click=lambda: run_scan(entry)) \
+                                                .props('outline color=blue').classes('mt-2 w-full sm:w-40')
+                                
+                                entry['inputs'] = {
+                                    'date': date_input,
+                                    'category': cat_input,
+                                    'description': desc_input,
+                                    'amount': amount_input,
+                                    'currency': curr_input
+                                }
+                                entry['file_path'] = file_path
+                                entry['scan_btn'] = scan_btn
+                                entry['error_label'] = error_label
+                                active_receipts.append(entry)
+                        
+                        # Show Scan All / Save All buttons
+                        bulk_actions.classes(remove='hidden')
+                        return entry
+
+                    def reattach_jobs():
+                        """Restore cards for scan jobs started earlier (other tab, before a restart, ...)."""
+                        db = next(get_db())
+                        try:
+                            jobs = ScanJobService.get_open_jobs(db)
+                            for job in jobs:
+                                if not os.path.exists(job.file_path):
+                                    ScanJobService.dismiss(db, job.id)
+                                    continue
+                                entry = create_receipt_card(job.file_path)
+                                entry['job_id'] = job.id
+                                if job.status == 'done':
+                                    apply_scan_result(entry, ScanJobService.get_result(job))
+                                elif job.status in ('queued', 'running'):
+                                    set_scanning(entry, True)
+                                    batch['job_ids'].add(job.id)
+                                elif job.status == 'failed':
+                                    show_scan_error(entry, job.error or 'unknown error')
+                        finally:
+                            db.close()
+                        update_progress()
 
                     async def handle_upload(e):
                         logger.info(f"File Upload triggered.")
@@ -190,101 +403,28 @@ def add_expense_page():
                             upload_state['notification'] = ui.notification('Processing receipts...', type='info', spinner=True, timeout=None)
                         
                         try:
-                            # Extract content and filename
-                            content = getattr(e, 'content', None)
-                            filename = getattr(e, 'name', None)
-                            
-                            # Handle SmallFileUpload structure
-                            if hasattr(e, 'file'):
-                                if not filename and hasattr(e.file, 'name'):
-                                    filename = e.file.name
-                                
-                                if content is None:
-                                    if hasattr(e.file, '_data'):
-                                        content = io.BytesIO(e.file._data)
-                                    elif hasattr(e.file, 'read'):
-                                        file_data = await e.file.read()
-                                        content = io.BytesIO(file_data)
-                            
+                            # Uploads are streamed to a spool file by save_receipt, never read into memory here
+                            content = getattr(e, 'file', None) or getattr(e, 'content', None)
+                            filename = getattr(e, 'name', None) or getattr(content, 'name', None)
+
                             if content is None:
                                 logger.error("Upload content missing")
                                 ui.notify("Error: Upload content missing.", type='negative', timeout=5000)
                                 return
 
+                            def show_queue_position(position):
+                                notification = upload_state['notification']
+                                if notification is None:
+                                    return
+                                # 0 once this upload's image job runs, else its place in the queue
+                                notification.message = f'Processing receipts... (#{position} in queue)' if position else 'Processing receipts...'
+
                             # Save receipt only (scan on demand for performance)
-                            file_path = await ReceiptService.save_receipt(content, filename)
-                            
-                            # Create UI Card for this receipt
-                            with receipts_container:
-                                with ui.card().classes('w-full p-4 shadow-sm border border-gray-200 relative receipt-card') as card:
-                                    entry = {'card': card}
-                                    
-                                    # Close Button
-                                    ui.button(icon='close', on_click=lambda: remove_receipt(entry)) \
-                                        .props('flat round dense color=red aria-label="Remove receipt" title="Remove receipt"').classes('absolute top-2 right-2 z-10')
-                                    
-                                    with ui.row().classes('w-full gap-4 responsive-row items-center sm:items-start'):
-                                        # Image Preview
-                                        with ui.element('div').classes('w-full preview-container'):
-                                            # Construct the web path through the helper (serves as single source of truth)
-                                            filename = os.path.basename(file_path)
-                                            web_path = ReceiptService.get_public_url(filename)
-                                            # Use page-scoped classes to control size via CSS
-                                            ui.image(web_path).props('alt="Receipt preview"').classes('preview-image bg-gray-50 rounded cursor-pointer border border-gray-100') \
-                                                .on('click', lambda src=web_path: show_full_image(src))
-                                        
-                                        # Form Fields
-                                        with ui.column().classes('flex-grow gap-2 w-full'):
-                                            # Mobile: Stack fields vertically, Desktop: Use grid
-                                            with ui.grid().classes('w-full gap-2 responsive-grid-2'):
-                                                date_input = ui.input(label='Date', value=date.today().strftime('%Y-%m-%d')).props('type=date').classes('w-full')
-                                                cat_input = ui.select(options=settings.EXPENSE_CATEGORIES, label="Category", value=settings.EXPENSE_CATEGORIES[0]).classes('w-full')
-                                                desc_input = ui.input(label="Description", value='').classes('w-full sm:col-span-2')
-                                                with ui.row().classes('w-full gap-2 sm:col-span-2'):
-                                                    amount_input = ui.input(label="Amount", value=None).classes('flex-1') \
-                                                        .on('input', sanitize_amount) \
-                                                        .on('blur', format_on_blur)
-                                                    curr_input = ui.select(options=settings.CURRENCIES, label="Currency", value=settings.DEFAULT_CURRENCY).classes('w-24')
-
-                                            with ui.row().classes('w-full justify-center'):
-                                                scan_btn = ui.button('Scan', icon='auto_fix_high', on_click=lambda: None) \
-                                                    .props('outline color=blue').classes('mt-2 w-full sm:w-40')
-                                    
-                                    entry['inputs'] = {
-                                        'date': date_input,
-                                        'category': cat_input,
-                                        'description': desc_input,
-                                        'amount': amount_input,
-                                        'currency': curr_input
-                                    }
-                                    entry['file_path'] = file_path
-                                    entry['scan_btn'] = scan_btn
-                                    active_receipts.append(entry)
-                            
-                            # Show Save All button
-                            save_all_btn.classes(remove='hidden')
-                            
-                            async def run_scan(entry_ref):
-                                entry_ref['scan_btn'].disable()
-                                entry_ref['scan_btn'].props('loading')
-
-                                try:
-                                    result = await ReceiptService.scan_receipt(entry_ref['file_path'])
-
-                                    entry_ref['inputs']['date'].set_value(result.date.strftime('%Y-%m-%d'))
-                                    entry_ref['inputs']['category'].set_value(result.category)
-                                    entry_ref['inputs']['description'].set_value(result.description)
-                                    entry_ref['inputs']['amount'].set_value(f"{float(result.amount):.2f}")
-                                    entry_ref['inputs']['currency'].set_value(result.currency)
-                                    ui.notify('Receipt scanned! Review and save.', type='positive', timeout=5000)
-                                except Exception as scan_err:
-                                    ui.notify(f'Scan failed: {scan_err}', type='negative', timeout=5000)
-                                finally:
-                                    entry_ref['scan_btn'].enable()
-                                    entry_ref['scan_btn'].props(remove='loading')
-
-                            scan_btn.on('click', lambda e, entry_ref=entry: asyncio.create_task(run_scan(entry_ref)))
+                            file_path = await ReceiptService.save_receipt(content, filename, on_queue_position=show_queue_position)
+                            create_receipt_card(file_path)
                             
+                        except ImageQueueFullError as err:
+                            ui.notify(str(err), type='warning', timeout=5000)
                         except Exception as err:
                             ui.notify(f'Error scanning receipt: {str(err)}', type='negative', timeout=5000)
                             logger.error(f"Error in handle_upload: {err}", exc_info=True)
@@ -300,6 +440,8 @@ def add_expense_page():
                         .props('color=bg-blue-600 accept=".jpg, .jpeg, .png, .heic" no-thumbnails') \
                         .classes('w-full mb-6 receipt-uploader')
 
+                    reattach_jobs()
+
 
             # --- MANUAL TAB ---
             with ui.tab_panel(manual_tab).classes('p-0'):
@@ -1,6 +1,6 @@
 from nicegui import ui
 from datetime import date, datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, List, Mapping, Optional
 from app.core.database import get_db
 from app.services.expense_service import ExpenseService
 from app.utils.formatting import format_currency
@@ -8,42 +8,215 @@ from app.core.config import settings
 from app.ui.layout import theme
 import json
 
+# Block endpoint of the grid's infinite row model (relative, so it also works behind a path prefix)
+HISTORY_ROWS_URL = 'api/history/rows'
+GRID_BLOCK_SIZE = 100
+GRID_MAX_BLOCK_SIZE = 500
+# Rows the mobile list appends whenever it is scrolled close to its end
+MOBILE_BLOCK_SIZE = 30
+
+# One mobile transaction card, rendered client-side by q-virtual-scroll for the visible items only
+MOBILE_CARD_TEMPLATE = '''
+<div class="w-full pb-4">
+  <q-card class="w-full p-0 shadow-sm border border-gray-200 hover:shadow-md transition-shadow overflow-hidden cursor-pointer"
+          @click="() => $parent.$emit('edit', props.item.id)">
+    <div :class="['w-full h-1', props.item.type === 'income' ? 'bg-green-500' : 'bg-red-500']"></div>
+    <div class="w-full px-2 pb-2 pt-0 flex flex-col gap-1">
+      <div class="w-full flex items-center justify-between">
+        <span class="text-s font-bold text-gray-500 uppercase tracking-wider">{{ props.item.date }}</span>
+        <div class="flex">
+          <q-btn flat round dense icon="edit" aria-label="Edit transaction" title="Edit" class="text-blue-600 scale-90"
+                 @click.stop="() => $parent.$emit('edit', props.item.id)" />
+          <q-btn flat round dense icon="delete" aria-label="Delete transaction" title="Delete" class="text-red-600 scale-90"
+                 @click.stop="() => $parent.$emit('delete', props.item)" />
+        </div>
+      </div>
+      <div class="w-full flex items-center justify-between">
+        <span class="text-base font-bold text-gray-900 leading-tight">{{ props.item.category }}</span>
+        <span :class="['text-base font-black', props.item.type === 'income' ? 'text-green-600' : 'text-red-600']">{{ props.item.amount_text }}</span>
+      </div>
+      <div v-if="props.item.description || props.item.foreign_amount" class="w-full flex items-center justify-between">
+        <span class="text-sm text-gray-600 italic truncate max-w-[60%]">{{ props.item.description }}</span>
+        <span v-if="props.item.foreign_amount" class="text-s text-gray-500">{{ props.item.foreign_amount }}</span>
+      </div>
+    </div>
+  </q-card>
+</div>
+'''
+
+
+def to_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def expense_row(expense) -> Dict[str, Any]:
+    return {
+        'id': expense.id,
+        'date': expense.date.strftime('%d.%m.%Y'),
+        'type': expense.type,
+        'category': expense.category,
+        'description': expense.description,
+        'amount': float(expense.amount),
+        'currency': expense.currency,
+        'amount_eur': float(expense.amount_eur),
+        'actions': '<span style="cursor: pointer; font-size: 1.2em;">❌</span>'
+    }
+
+
+def mobile_item(expense) -> Dict[str, Any]:
+    """Display-ready fields of one card of the mobile list (see MOBILE_CARD_TEMPLATE)."""
+    return {
+        'id': expense.id,
+        'date': expense.date.strftime('%d.%m.%Y'),
+        'type': expense.type,
+        'category': expense.category,
+        'description': expense.description or '',
+        'amount_eur': float(expense.amount_eur),
+        'amount_text': f"{'+' if expense.type == 'income' else '-'}{format_currency(expense.amount_eur)}",
+        'foreign_amount': f"{float(expense.amount):.2f} {expense.currency}" if expense.currency != 'EUR' else '',
+    }
+
+
+def page_filter_args(filters: Mapping[str, str]) -> Dict[str, Any]:
+    """ExpenseService filter arguments from the page filters (search, type, category, from, to)."""
+    return {
+        'start_date': to_date(filters.get('from')),
+        'end_date': to_date(filters.get('to')),
+        'category': filters.get('category') or None,
+        'expense_type': filters.get('type') or None,
+        'search': (filters.get('search') or '').strip() or None,
+    }
+
+
+def history_rows(params: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    One block of grid rows for the datasource built by history_datasource: rows start..end of
+    the page filters plus the grid's sort and column filter models (JSON), all applied in SQL.
+    Raises ValueError for malformed parameters.
+    """
+    start_row = max(0, int(params.get('start', 0)))
+    end_row = min(start_row + GRID_MAX_BLOCK_SIZE, max(start_row, int(params.get('end', start_row + GRID_BLOCK_SIZE))))
+    db = next(get_db())
+    try:
+        expenses, last_row = ExpenseService.get_expense_block(
+            db,
+            start_row,
+            end_row,
+            sort_model=json.loads(params.get('sort') or '[]'),
+            filter_model=json.loads(params.get('filter') or '{}'),
+            **page_filter_args(params),
+        )
+    finally:
+        db.close()
+    return {'rows': [expense_row(e) for e in expenses], 'last_row': last_row}
+
+
+class MobileRows:
+    """
+    Server side of the mobile list: the ids of the rows the browser holds, in list order, and the
+    row count of the page filters. The cards themselves live only in the browser (MobileList).
+    """
+
+    def __init__(self, block_size: int = MOBILE_BLOCK_SIZE):
+        self.block_size = block_size
+        self.ids: List[int] = []
+        self.last_row = -1
+
+    @property
+    def has_more(self) -> bool:
+        return self.last_row < 0 or len(self.ids) < self.last_row
+
+    def wants_block(self, visible_to: int) -> bool:
+        """Whether the list, scrolled to item visible_to, should append the next block."""
+        return self.has_more and visible_to >= len(self.ids) - self.block_size // 2
+
+    def next_block(self, db, filters: Mapping[str, str]) -> List[Dict[str, Any]]:
+        """Fetches the block after the loaded rows and returns its cards (see mobile_item)."""
+        start = len(self.ids)
+        expenses, last_row = ExpenseService.get_expense_block(
+            db, start, start + self.block_size, **page_filter_args(filters)
+        )
+        # The first block always knows the count, later blocks report -1 until the end
+        if last_row >= 0:
+            self.last_row = last_row
+        self.ids.extend(e.id for e in expenses)
+        return [mobile_item(e) for e in expenses]
+
+    def reset(self) -> None:
+        self.ids = []
+        self.last_row = -1
+
+    def index(self, expense_id: int) -> Optional[int]:
+        return next((i for i, row_id in enumerate(self.ids) if row_id == expense_id), None)
+
+    def remove(self, expense_id: int) -> Optional[int]:
+        """Forgets a deleted row and returns its index in the list, or None if it is not loaded."""
+        index = self.index(expense_id)
+        if index is not None:
+            del self.ids[index]
+            if self.last_row > 0:
+                self.last_row -= 1
+        return index
+
+
+class MobileList(ui.element, component='mobile_list.js'):
+    """q-virtual-scroll with browser-side items: blocks are appended and single cards patched by index."""
+
+
+def history_datasource(filters: Dict[str, str]) -> Dict[str, str]:
+    """AG Grid infinite-model datasource that fetches blocks from HISTORY_ROWS_URL with the page filters."""
+    return {':getRows': f"""(params) => {{
+        const query = new URLSearchParams({{
+            ...{json.dumps(filters)},
+            start: params.startRow,
+            end: params.endRow,
+            sort: JSON.stringify(params.sortModel),
+            filter: JSON.stringify(params.filterModel),
+        }});
+        fetch('{HISTORY_ROWS_URL}?' + query)
+            .then((response) => response.ok ? response.json() : Promise.reject(response.status))
+            .then((block) => params.successCallback(block.rows, block.last_row))
+            .catch(() => params.failCallback());
+    }}"""}
+
+
 def history_page():
     theme('history')
     
     with ui.column().classes('w-full p-4 max-w-7xl mx-auto gap-6 history-container'):
         ui.label('📜 Transaction History').classes('text-2xl font-bold text-gray-800')
-        
-        page_size = 25
-        current_page = 1
-        total_count = 0
 
         today = date.today()
         default_start_date = today - timedelta(days=30)
 
-        def to_date(value: Optional[str]) -> Optional[date]:
-            if not value:
-                return None
-            try:
-                return datetime.strptime(value, '%Y-%m-%d').date()
-            except ValueError:
-                return None
-
-        def build_rows(expenses_list):
-            return [
-                {
-                    'id': e.id,
-                    'date': e.date.strftime('%d.%m.%Y'),
-                    'type': e.type,
-                    'category': e.category,
-                    'description': e.description,
-                    'amount': float(e.amount),
-                    'currency': e.currency,
-                    'amount_eur': float(e.amount_eur),
-                    'actions': '<span style="cursor: pointer; font-size: 1.2em;">❌</span>'
-                } for e in expenses_list
-            ]
-        
+        def patch_rows(expense_id: int, expense=None):
+            """Replaces (expense) or removes (None) one transaction in the grid and the mobile list."""
+            if expense is not None:
+                # The infinite row model has no row transactions, but a loaded row node takes new data
+                ui.run_javascript(
+                    f'getElement({grid.id}).api.getRowNode("{expense_id}")?.setData({json.dumps(expense_row(expense))})'
+                )
+            else:
+                # Removing a row shifts all rows after it. The infinite row model cannot refresh a single
+                # block, so a delete refetches the cached blocks (at most maxBlocksInCache of them)
+                grid.run_grid_method('refreshInfiniteCache')
+
+            # The mobile list patches the one card by its index in the browser
+            if expense is not None:
+                index = mobile_rows.index(expense_id)
+                if index is not None:
+                    mobile_list.run_method('replace', index, mobile_item(expense))
+            else:
+                index = mobile_rows.remove(expense_id)
+                if index is not None:
+                    mobile_list.run_method('remove', index)
+                    mobile_empty.set_visibility(not mobile_rows.ids)
+
         async def handle_cell_value_change(e):
             row_id = int(e.args['data']['id'])
             field = e.args['colId']
@@ -75,6 +248,7 @@ def history_page():
                 updated = ExpenseService.update_expense(db, row_id, updates)
                 if updated:
                     ui.notify(f'Updated {field}', type='positive')
+                    patch_rows(row_id, updated)
                 else:
                     ui.notify('Failed to update', type='negative')
             except Exception as ex:
@@ -100,7 +274,7 @@ def history_page():
                 try:
                     if ExpenseService.delete_expense(db, expense_id):
                         ui.notify('Deleted successfully', type='positive')
-                        ui.navigate.to('/history')
+                        patch_rows(expense_id)
                     else:
                         ui.notify('Failed to delete', type='negative')
                 finally:
@@ -164,7 +338,7 @@ def history_page():
                             if updated:
                                 ui.notify('Updated successfully', type='positive')
                                 edit_dialog.close()
-                                ui.navigate.to('/history')
+                                patch_rows(expense.id, updated)
                             else:
                                 ui.notify('Failed to update', type='negative')
                         finally:
@@ -181,8 +355,19 @@ def history_page():
         # Filters & Search
         all_categories = sorted(set(settings.INCOME_CATEGORIES + settings.EXPENSE_CATEGORIES))
 
+        def page_filters() -> Dict[str, str]:
+            return {
+                'search': search_input.value or '',
+                'type': type_select.value if type_select.value != 'All' else '',
+                'category': category_select.value if category_select.value != 'All' else '',
+                'from': from_date.value or '',
+                'to': to_date_input.value or '',
+            }
+
         def apply_filters():
-            load_page(1)
+            # A new datasource drops the grid's cached blocks and fetches from the top
+            grid.run_grid_method('setGridOption', 'datasource', history_datasource(page_filters()))
+            load_mobile_items(reset=True)
 
         with ui.row().classes('w-full gap-3 items-end flex-wrap'):
             search_input = ui.input('Search description/category') \
@@ -209,9 +394,11 @@ def history_page():
         with ui.element('div').classes('w-full max-h-[60vh] overflow-y-auto'):
             # Desktop Table View
             with ui.element('div').classes('w-full desktop-only'):
+                # Infinite row model: the grid fetches blocks of GRID_BLOCK_SIZE rows while scrolling and
+                # keeps at most maxBlocksInCache of them; sorting and column filters run in SQL
                 grid = ui.aggrid({
                     'columnDefs': [
-                        {'headerName': 'Date', 'field': 'date', 'sortable': True, 'filter': True, 'editable': True, 'width': 100},
+                        {'headerName': 'Date', 'field': 'date', 'sortable': True, 'filter': 'agDateColumnFilter', 'editable': True, 'width': 100},
                         {'headerName': 'Type', 'field': 'type', 'sortable': True, 'filter': True, 'editable': True,
                          'cellEditor': 'agSelectCellEditor',
                          'cellEditorParams': {'values': ['expense', 'income']}, 'width': 80},
@@ -239,17 +426,21 @@ def history_page():
                         {'headerName': 'Currency', 'field': 'currency', 'sortable': True, 'filter': True, 'editable': True,
                          'cellEditor': 'agSelectCellEditor',
                          'cellEditorParams': {'values': settings.CURRENCIES}, 'width': 80},
-                        {'headerName': 'Actions', 'field': 'actions', 'width': 80, 'editable': False, 'pinned': 'right'}
+                        {'headerName': 'Actions', 'field': 'actions', 'width': 80, 'editable': False, 'pinned': 'right',
+                         'sortable': False, 'filter': False}
                     ],
-                    'rowData': [],
-                    'pagination': False,
-                    'domLayout': 'autoHeight',
+                    'rowModelType': 'infinite',
+                    'datasource': history_datasource(page_filters()),
+                    'cacheBlockSize': GRID_BLOCK_SIZE,
+                    'maxBlocksInCache': 10,
+                    ':getRowId': '(params) => String(params.data.id)',
                     'defaultColDef': {
                         'resizable': True,
                         'sortable': True,
                         'filter': True
                     }
-                }, html_columns=[6]).classes('w-full shadow-sm').on('cellValueChanged', handle_cell_value_change)
+                }, html_columns=[6]).classes('w-full shadow-sm').style('height: 60vh') \
+                    .on('cellValueChanged', handle_cell_value_change)
                 
                 async def handle_cell_clicked(e):
                     if e.args['colId'] == 'actions':
@@ -263,15 +454,13 @@ def history_page():
                         
                 grid.on('cellClicked', handle_cell_clicked)
 
-            # Mobile Card View
+            # Mobile Card View: only the visible cards are rendered, further rows are appended on scroll
             with ui.element('div').classes('w-full mobile-only'):
-                mobile_list = ui.column().classes('w-full gap-4')
-
-        # Pagination Controls
-        with ui.row().classes('w-full justify-center items-center gap-3 mt-2 flex-wrap'):
-            prev_btn = ui.button('Prev', on_click=lambda: load_page(current_page - 1)).props('outlined')
-            page_label = ui.label('Page 1').classes('text-gray-600 min-w-[140px] text-center')
-            next_btn = ui.button('Next', on_click=lambda: load_page(current_page + 1)).props('outlined')
+                mobile_list = MobileList() \
+                    .props(f'virtual-scroll-item-size=120 virtual-scroll-slice-size={MOBILE_BLOCK_SIZE}') \
+                    .classes('w-full').style('max-height: 65vh')
+                mobile_list.add_slot('default', MOBILE_CARD_TEMPLATE)
+                mobile_empty = ui.label('No transactions found.').classes('text-gray-500')
 
         def reset_filters():
             search_input.value = ''
@@ -279,98 +468,44 @@ def history_page():
             category_select.value = 'All'
             from_date.value = default_start_date.strftime('%Y-%m-%d')
             to_date_input.value = today.strftime('%Y-%m-%d')
-            load_page(1)
+            apply_filters()
 
-        def load_page(page: int):
-            nonlocal current_page, total_count
+        mobile_rows = MobileRows()
 
-            if page < 1:
-                page = 1
+        def load_mobile_items(reset: bool = False):
+            if reset:
+                mobile_rows.reset()
+            db = next(get_db())
+            try:
+                items = mobile_rows.next_block(db, page_filters())
+            finally:
+                db.close()
+            # Only the new cards go to the browser; the ids stay here for patching by index
+            mobile_list.run_method('reset' if reset else 'append', items)
+            mobile_empty.set_visibility(not mobile_rows.ids)
 
-            start_date = to_date(from_date.value)
-            end_date = to_date(to_date_input.value)
-            category = category_select.value if category_select.value != 'All' else None
-            expense_type = type_select.value if type_select.value != 'All' else None
-            search = search_input.value.strip() if search_input.value else None
+        def handle_mobile_scroll(e):
+            if mobile_rows.wants_block(e.args['to']):
+                load_mobile_items()
 
+        async def handle_mobile_edit(e):
             db = next(get_db())
             try:
-                total_count = ExpenseService.count_expenses_filtered(
-                    db,
-                    start_date=start_date,
-                    end_date=end_date,
-                    category=category,
-                    expense_type=expense_type,
-                    search=search,
-                )
-
-                max_page = max(1, (total_count + page_size - 1) // page_size)
-                if page > max_page:
-                    page = max_page
-
-                expenses_page = ExpenseService.get_expenses_filtered(
-                    db,
-                    skip=(page - 1) * page_size,
-                    limit=page_size,
-                    start_date=start_date,
-                    end_date=end_date,
-                    category=category,
-                    expense_type=expense_type,
-                    search=search,
-                )
+                expense = ExpenseService.get_expense(db, int(e.args))
             finally:
                 db.close()
+            if expense is None:
+                ui.notify('Transaction not found', type='negative')
+                return
+            await show_edit_dialog(expense)
 
-            current_page = page
-            grid.options['rowData'] = build_rows(expenses_page)
-            grid.update()
+        async def handle_mobile_delete(e):
+            item = e.args
+            await delete_handler(int(item['id']), item['type'], item['category'], item['amount_eur'])
 
-            page_label.text = f'Page {current_page} / {max(1, (total_count + page_size - 1) // page_size)}'
-            prev_btn.disable() if current_page <= 1 else prev_btn.enable()
-            next_btn.disable() if current_page >= max(1, (total_count + page_size - 1) // page_size) else next_btn.enable()
+        # 'ref' in the event details is the component itself and cannot be serialized
+        mobile_list.on('virtual-scroll', handle_mobile_scroll, ['to'], throttle=0.2)
+        mobile_list.on('edit', handle_mobile_edit)
+        mobile_list.on('delete', handle_mobile_delete)
 
-            mobile_list.clear()
-            if not expenses_page:
-                with mobile_list:
-                    ui.label('No transactions found.').classes('text-gray-500')
-                return
-
-            with mobile_list:
-                for expense in expenses_page:
-                    with ui.card().classes('w-full p-0 shadow-sm border border-gray-200 hover:shadow-md transition-shadow overflow-hidden cursor-pointer') \
-                        .on('click', lambda _, e=expense: show_edit_dialog(e)):
-                        # Color strip at the top based on type
-                        strip_color = 'bg-green-500' if expense.type == 'income' else 'bg-red-500'
-                        ui.element('div').classes(f'w-full h-1 {strip_color}')
-                        
-                        with ui.column().classes('w-full px-2 pb-2 pt-0 gap-1 m-0'):
-                            # Header: Date and Actions
-                            with ui.row().classes('w-full items-center justify-between'):
-                                ui.label(expense.date.strftime('%d.%m.%Y')).classes('text-s font-bold text-gray-500 uppercase tracking-wider')
-                                with ui.row().classes('gap-0'):
-                                    ui.button(icon='edit').props('flat round dense aria-label="Edit transaction" title="Edit"').classes('text-blue-600 scale-90') \
-                                        .on('click.stop', lambda _, e=expense: show_edit_dialog(e))
-                                    ui.button(icon='delete').props('flat round dense aria-label="Delete transaction" title="Delete"').classes('text-red-600 scale-90') \
-                                        .on('click.stop', lambda _, e=expense: delete_handler(e.id, e.type, e.category, e.amount_eur))
-                            
-                            # Category & Amount Row (Combined for slimness)
-                            with ui.row().classes('w-full items-center justify-between'):
-                                ui.label(expense.category).classes('text-base font-bold text-gray-900 leading-tight')
-                                
-                                amount_class = 'text-green-600' if expense.type == 'income' else 'text-red-600'
-                                ui.label(
-                                    f"{'+' if expense.type == 'income' else '-'}{format_currency(expense.amount_eur)}"
-                                ).classes(f'text-base font-black {amount_class}')
-                            
-                            # Description & Secondary Currency (if any)
-                            if expense.description or expense.currency != 'EUR':
-                                with ui.row().classes('w-full items-center justify-between'):
-                                    if expense.description:
-                                        ui.label(expense.description).classes('text-sm text-gray-600 italic truncate max-w-[60%]')
-                                    else:
-                                        ui.element('div')
-                                        
-                                    if expense.currency != 'EUR':
-                                        ui.label(f"{float(expense.amount):.2f} {expense.currency}").classes('text-s text-gray-500')
-
-        load_page(1)
+        load_mobile_items(reset=True)
@@ -0,0 +1,28 @@
+// Mobile transaction list: a q-virtual-scroll whose items live only in the browser. The server
+// sends every block once (append) and single cards by index, never the whole list.
+export default {
+  template: `
+    <q-virtual-scroll ref="qRef" :items="items">
+      <template v-for="(_, slot) in $slots" v-slot:[slot]="slotProps">
+        <slot :name="slot" v-bind="slotProps || {}" />
+      </template>
+    </q-virtual-scroll>
+  `,
+  data() {
+    return { items: [] };
+  },
+  methods: {
+    reset(items) {
+      this.items = items;
+    },
+    append(items) {
+      this.items.push(...items);
+    },
+    replace(index, item) {
+      this.items[index] = item;
+    },
+    remove(index) {
+      this.items.splice(index, 1);
+    },
+  },
+};
@@ -1,5 +1,10 @@
 from nicegui import ui
 from app.core.config import settings, USER_SETTINGS_PATH
+from app.adapters.fallback_scanner import FallbackScanner
+from app.adapters.hedged_scanner import HedgedScanner
+from app.core.database import get_db
+from app.services.scan_cache_service import ScanCacheService
+from app.services.scan_telemetry_service import ScanTelemetryService
 from app.ui.layout import theme
 import json
 import os
@@ -94,19 +99,20 @@ def settings_page():
             
             with ui.grid(columns=1).classes('w-full gap-4'):
                 ai_provider = ui.select(
-                    options=['gemini', 'openai', 'testing'],
+                    options=['gemini', 'openai', 'hedged', 'testing', 'cassette'],
                     label='AI Provider',
                     value=settings.AI_PROVIDER
                 ).classes('w-full')
                 with ai_provider:
-                    ui.tooltip('Choose the AI provider used to scan receipts.').props('anchor="bottom left" self="top left"')
+                    ui.tooltip('Choose the AI provider used to scan receipts. "hedged" asks the primary provider and, '
+                               'when it is slower than usual, the secondary one as well.').props('anchor="bottom left" self="top left"')
                 
                 google_key = ui.input(
                     label='Google API Key',
                     value=settings.GOOGLE_API_KEY,
                     password=True
                 ).props('reveal').classes('w-full') \
-                 .bind_visibility_from(ai_provider, 'value', backward=lambda v: v == 'gemini')
+                 .bind_visibility_from(ai_provider, 'value', backward=lambda v: v in ('gemini', 'hedged'))
                 with google_key:
                     ui.tooltip('API key for Google Generative AI / Gemini.').props('anchor="bottom left" self="top left"')
                 
@@ -115,10 +121,120 @@ def settings_page():
                     value=settings.OPENAI_API_KEY,
                     password=True
                 ).props('reveal').classes('w-full') \
-                 .bind_visibility_from(ai_provider, 'value', backward=lambda v: v == 'openai')
+                 .bind_visibility_from(ai_provider, 'value', backward=lambda v: v in ('openai', 'hedged'))
                 with openai_key:
                     ui.tooltip('API key for OpenAI.').props('anchor="bottom left" self="top left"')
 
+                fallback_providers = ui.select(
+                    # Not 'testing': an outage would silently be answered with its fake receipt
+                    options=['gemini', 'openai'],
+                    label='Fallback Providers',
+                    value=[name for name in settings.SCAN_FALLBACK_PROVIDERS if name != 'testing'],
+                    multiple=True
+                ).props('use-chips').classes('w-full') \
+                 .bind_visibility_from(ai_provider, 'value', backward=lambda v: v != 'hedged')
+                with fallback_providers:
+                    ui.tooltip('Tried in order when the AI provider fails or is temporarily disabled by its '
+                               'circuit breaker.').props('anchor="bottom left" self="top left"')
+
+            # Scan result cache statistics
+            with ui.row().classes('w-full items-center justify-between gap-2 pt-2 border-t'):
+                cache_stats_label = ui.label('').classes('text-sm text-gray-600')
+                ui.button('Clear Scan Cache', icon='delete_sweep', on_click=lambda: clear_scan_cache()) \
+                    .props('flat dense color=red')
+            hedge_stats_label = ui.label('').classes('text-sm text-gray-600 -mt-2') \
+                .bind_visibility_from(ai_provider, 'value', backward=lambda v: v == 'hedged')
+            breaker_row = ui.row().classes('w-full items-center gap-2 -mt-2')
+
+            breaker_colors = {'closed': 'green', 'half_open': 'orange', 'open': 'red'}
+
+            def refresh_breakers():
+                breaker_row.clear()
+                with breaker_row:
+                    ui.label('Providers:').classes('text-sm text-gray-600')
+                    breakers = FallbackScanner.get_breaker_states()
+                    if not breakers:
+                        ui.label('no scans yet').classes('text-sm text-gray-400 italic')
+                    for breaker in breakers:
+                        text = f"{breaker['name']}: {breaker['state'].replace('_', '-')}"
+                        if breaker['state'] == 'open':
+                            text += f" (retry in {breaker['retry_in_seconds']:.0f}s)"
+                        with ui.chip(text).props(f"dense outline color={breaker_colors[breaker['state']]}"):
+                            p95 = breaker['p95_seconds']
+                            ui.tooltip(
+                                f"{breaker['failure_rate']:.0%} of the last {breaker['calls']} calls failed or were slow"
+                                + (f", p95 latency {p95:.1f}s" if p95 is not None else '')
+                            )
+
+            refresh_breakers()
+            ui.timer(5.0, refresh_breakers)
+
+            def refresh_cache_stats():
+                db = next(get_db())
+                try:
+                    stats = ScanCacheService.get_stats(db)
+                finally:
+                    db.close()
+                cache_stats_label.set_text(
+                    f"Scan cache: {stats['entries']} receipts cached, "
+                    f"{stats['hits']} hits / {stats['near_hits']} near-duplicate hits / {stats['misses']} misses "
+                    f"since start ({stats['hit_rate']:.0%} hit rate)"
+                )
+                hedge = HedgedScanner.get_stats()
+                hedge_stats_label.set_text(
+                    f"Hedging: {hedge['hedged']} of {hedge['scans']} scans hedged ({hedge['hedge_rate']:.0%}), "
+                    f"secondary provider won {hedge['secondary_wins']} times, "
+                    f"~{hedge['avg_saved_seconds']:.1f}s saved each"
+                )
+
+            def clear_scan_cache():
+                db = next(get_db())
+                try:
+                    removed = ScanCacheService.clear(db)
+                finally:
+                    db.close()
+                ui.notify(f'Removed {removed} cached scan results', type='positive')
+                refresh_cache_stats()
+
+            refresh_cache_stats()
+
+            # Scan telemetry: latency and cost per month and provider
+            with ui.expansion('Scan Performance & Cost', icon='insights').classes('w-full border-t'):
+                db = next(get_db())
+                try:
+                    telemetry = ScanTelemetryService.get_monthly_stats(db)
+                finally:
+                    db.close()
+                if not telemetry:
+                    ui.label('No scans recorded yet.').classes('text-sm text-gray-400 italic')
+                else:
+                    ui.table(
+                        columns=[
+                            {'name': 'month', 'label': 'Month', 'field': 'month', 'align': 'left'},
+                            {'name': 'provider', 'label': 'Provider', 'field': 'provider', 'align': 'left'},
+                            {'name': 'scans', 'label': 'Scans', 'field': 'scans'},
+                            {'name': 'p50', 'label': 'p50 (s)', 'field': 'p50'},
+                            {'name': 'p95', 'label': 'p95 (s)', 'field': 'p95'},
+                            {'name': 'image', 'label': 'Image (KB)', 'field': 'image'},
+                            {'name': 'tokens', 'label': 'Tokens in/out', 'field': 'tokens'},
+                            {'name': 'cost', 'label': 'Cost (USD)', 'field': 'cost'},
+                            {'name': 'failures', 'label': 'Parse failures', 'field': 'failures'},
+                            {'name': 'retries', 'label': 'Retries', 'field': 'retries'},
+                        ],
+                        rows=[{
+                            'month': row['month'],
+                            'provider': f"{row['provider']} ({row['model']})" if row['model'] else row['provider'],
+                            'scans': row['scans'],
+                            'p50': f"{row['p50_ms'] / 1000:.1f}",
+                            'p95': f"{row['p95_ms'] / 1000:.1f}",
+                            'image': f"{row['avg_image_kb']:.0f}",
+                            'tokens': f"{row['input_tokens']} / {row['output_tokens']}",
+                            'cost': f"{row['cost_usd']:.4f}",
+                            'failures': row['parse_failures'],
+                            'retries': row['retries'],
+                        } for row in telemetry],
+                    ).props('dense flat').classes('w-full')
+
         # --- App Constants (Lists) ---
         with ui.card().classes('w-full p-6 shadow-sm gap-4'):
             ui.label('📋 App Constants').classes('text-lg font-bold text-gray-700')
@@ -192,6 +308,7 @@ def settings_page():
                 settings.AI_PROVIDER = ai_provider.value
                 settings.GOOGLE_API_KEY = google_key.value
                 settings.OPENAI_API_KEY = openai_key.value
+                settings.SCAN_FALLBACK_PROVIDERS = list(fallback_providers.value or [])
                 
                 settings.EXPENSE_CATEGORIES = expense_cats_editor.items
                 settings.INCOME_CATEGORIES = income_cats_editor.items
@@ -209,6 +326,7 @@ def settings_page():
                 # NOTE: API keys are excluded here to prevent saving secrets to this file.
                 user_settings = {
                     "AI_PROVIDER": settings.AI_PROVIDER,
+                    "SCAN_FALLBACK_PROVIDERS": settings.SCAN_FALLBACK_PROVIDERS,
                     "EXPENSE_CATEGORIES": settings.EXPENSE_CATEGORIES,
                     "INCOME_CATEGORIES": settings.INCOME_CATEGORIES,
                     "CURRENCIES": settings.CURRENCIES,
@@ -1,43 +1,126 @@
 import json
-from decimal import Decimal
-from datetime import datetime
+import re
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime
+from typing import Any, Dict, List
+from app.core.config import settings
 from app.db.schemas import ExpenseCreate
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%y')
+
+
+class AIResponseParseError(ValueError):
+    """Raised when an AI provider's answer cannot be turned into an expense."""
+
+
+def is_structured_output_failure(err: Exception) -> bool:
+    """
+    True for failures a plain-prompt rescan can fix: an unparsable answer, or the provider
+    rejecting the structured-output request itself (HTTP 400, e.g. a model without schema support).
+    """
+    if isinstance(err, AIResponseParseError):
+        return True
+    status = getattr(err, 'status_code', None) or getattr(err, 'code', None)
+    return status == 400
+
+
+def _load_json(raw_response: str) -> Dict[str, Any]:
+    text = raw_response.strip()
+    try:
+        # Structured output is plain JSON, so this is the common case
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # Free text answers: markdown fences or prose around the object
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            raise
+        data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+
+def _parse_amount(value: Any) -> Decimal:
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    # "12,34", "€ 12.34", "1.234,56"
+    text = re.sub(r'[^\d,.\-]', '', str(value))
+    if ',' in text and '.' in text:
+        text = text.replace('.', '').replace(',', '.') if text.rfind(',') > text.rfind('.') else text.replace(',', '')
+    else:
+        text = text.replace(',', '.')
+    return Decimal(text)
+
+
+def _parse_date(value: Any) -> date:
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {text!r}")
+
+
+def _expense_from_data(data: Dict[str, Any], image_path: str) -> ExpenseCreate:
+    amount = _parse_amount(data.get('total_amount', data.get('amount', 0)))
+    expense_date = _parse_date(data['date'])
+
+    category = data.get('category')
+    if category not in settings.EXPENSE_CATEGORIES:
+        category = settings.EXPENSE_CATEGORIES[-1]
+    currency = str(data.get('currency') or '').upper()
+    if currency not in settings.CURRENCIES:
+        currency = 'UNKNOWN'
+
+    # No conversion logic as per requirement
+    return ExpenseCreate(
+        date=expense_date,
+        category=category,
+        description=data.get('description'),
+        amount=amount,
+        currency=currency,
+        amount_eur=amount,
+        exchange_rate=Decimal("1.0"),
+        receipt_image_path=image_path,
+        is_verified=False
+    )
+
 
 def parse_ai_response(raw_response: str, image_path: str) -> ExpenseCreate:
     """
-    Parses the raw JSON string response from an AI provider and converts it into an ExpenseCreate schema.
-    Handles markdown code block stripping and basic data conversion.
+    Converts an AI provider's JSON answer into an ExpenseCreate schema.
+    Accepts schema-constrained JSON as well as free text answers (markdown fences, surrounding prose),
+    amounts with a decimal comma or currency symbol, and ISO dates. Unknown categories become the
+    last configured category, unknown currencies 'UNKNOWN'. Raises AIResponseParseError if no
+    expense can be read from the answer.
+    """
+    try:
+        return _expense_from_data(_load_json(raw_response or ''), image_path)
+    except (ValueError, KeyError, InvalidOperation) as err:
+        logger.warning(f"Error parsing AI response: {err!r}; raw response: {raw_response!r}")
+        raise AIResponseParseError(f"Could not parse AI response: {err}") from err
+
+
+def parse_ai_batch_response(raw_response: str, image_paths: List[str]) -> List[ExpenseCreate]:
+    """
+    Converts the answer to a multi-receipt request into one ExpenseCreate per image, in order.
+    Entries are matched by their 'index' (1-based receipt label). Raises AIResponseParseError if the
+    answer is inconsistent (wrong count, missing or duplicate indices, an unreadable entry), so the
+    caller can split the batch.
     """
     try:
-        # Clean response text (remove markdown code blocks if present)
-        json_str = raw_response.strip()
-        if json_str.startswith("```json"):
-            json_str = json_str[7:]
-        elif json_str.startswith("```"):
-            json_str = json_str[3:]
-        
-        if json_str.endswith("```"):
-            json_str = json_str[:-3]
-        
-        data = json.loads(json_str)
-        
-        amount = Decimal(str(data.get('total_amount', 0)))
-        # No conversion logic as per requirement
-        exchange_rate = Decimal("1.0")
-        amount_eur = amount
-
-        return ExpenseCreate(
-            date=datetime.strptime(data['date'], '%d.%m.%Y').date(),
-            category=data['category'],
-            description=data['description'],
-            amount=amount,
-            currency=data['currency'],
-            amount_eur=amount_eur,
-            exchange_rate=exchange_rate,
-            receipt_image_path=image_path,
-            is_verified=False
-        )
-    except Exception as e:
-        print(f"Error parsing AI response: {e}")
-        print(f"Raw response: {raw_response}")
-        raise e
+        data = _load_json(raw_response or '')
+        items = data.get('receipts')
+        if not isinstance(items, list) or len(items) != len(image_paths):
+            raise ValueError(f"Expected {len(image_paths)} receipts, got {len(items) if isinstance(items, list) else 0}")
+        by_index = {int(item['index']): item for item in items}
+        if sorted(by_index) != list(range(1, len(image_paths) + 1)):
+            raise ValueError(f"Receipt indices {sorted(by_index)} do not match 1..{len(image_paths)}")
+        return [_expense_from_data(by_index[i], path) for i, path in enumerate(image_paths, start=1)]
+    except (ValueError, KeyError, TypeError, InvalidOperation) as err:
+        logger.warning(f"Error parsing batched AI response: {err!r}; raw response: {raw_response!r}")
+        raise AIResponseParseError(f"Could not parse batched AI response: {err}") from err
@@ -0,0 +1,104 @@
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+from app.utils.latency_window import LatencyWindow
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    closed: calls pass; each outcome is recorded, and calls slower than slow_call_seconds count as
+    failures. Once min_calls are in the window and the failure rate reaches failure_rate, it opens.
+    open: calls are refused for open_seconds.
+    half_open: a single trial call is let through; success closes the breaker, failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes = deque(maxlen=window_size)  # True = failed or slow
+        self.latencies = LatencyWindow(window_size)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def failure_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; in half_open this claims the single trial call."""
+        if self.state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self._trial_running = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+        return self.state == self.CLOSED
+
+    def release(self) -> None:
+        """Give back a claimed trial call that ended without an outcome (e.g. it was cancelled)."""
+        if self.state == self.HALF_OPEN:
+            self._trial_running = False
+
+    def record_success(self, seconds: float) -> None:
+        self.latencies.add(seconds)
+        self._record(seconds >= self.slow_call_seconds)
+
+    def record_failure(self, seconds: float) -> None:
+        self.latencies.add(seconds)
+        self._record(True)
+
+    def _record(self, failed: bool) -> None:
+        if self.state == self.HALF_OPEN:
+            self._trial_running = False
+            if failed:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            return
+        self._outcomes.append(failed)
+        if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                and self.failure_rate >= self.failure_rate_threshold):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "calls": len(self._outcomes),
+            "failure_rate": self.failure_rate,
+            "p95_seconds": self.latencies.percentile(95),
+            "retry_in_seconds": retry_in,
+        }
@@ -0,0 +1,32 @@
+import hashlib
+from PIL import Image
+
+def sha256_hex(data: bytes) -> str:
+    """Content hash used to identify identical (normalized) receipt images."""
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: str) -> str:
+    """sha256_hex of a file's contents, read in chunks."""
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def compute_dhash(image: Image.Image, hash_size: int = 8) -> str:
+    """
+    Computes a 64-bit difference hash (dHash) of an image as a 16 character hex string.
+    Re-encoded or slightly resized copies of the same photo end up within a few bits of each other.
+    """
+    # Draft mode lets the JPEG decoder skip most of the work for such a tiny target
+    image.draft('L', (hash_size * 16, hash_size * 16))
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two hex encoded hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
@@ -0,0 +1,225 @@
+import io
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+import pillow_heif
+from PIL import Image, ImageFilter, ImageOps
+
+# Register HEIF opener (also needed inside image worker processes, which only import this module)
+pillow_heif.register_heif_opener()
+
+
+def configure_heif_decoder(threads: int) -> None:
+    """Set the number of threads libheif uses to decode HEIC tiles in this process."""
+    pillow_heif.options.DECODE_THREADS = max(1, threads)
+
+# Output formats we keep as-is; everything else (HEIC/HEIF, ...) is normalized to JPEG
+OUTPUT_FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+
+ImageSource = Union[bytes, BinaryIO, str]
+
+
+def _open(source: ImageSource) -> Image.Image:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+
+def _draft(image: Image.Image, max_size: int) -> None:
+    """
+    Ask the decoder for the smallest bitmap that still covers the final size. No-op for formats
+    without reduced decoding. The request is the fitted size (not a max_size square), so
+    portrait/landscape HEIF thumbnails and JPEG DCT scales qualify whenever they cover the result.
+    """
+    width, height = image.size
+    scale = min(1.0, max_size / max(width, height))
+    image.draft('RGB', (max(1, round(width * scale)), max(1, round(height * scale))))
+
+
+def estimate_decode_cost(source: ImageSource, max_size: int) -> int:
+    """
+    Estimated peak memory in bytes for decode_receipt_image, from the image header only:
+    the bitmap at the size the decoder will produce (after draft scaling) plus a working copy.
+    Raises ValueError if the source is not an image.
+    """
+    try:
+        with _open(source) as image:
+            _draft(image, max_size)
+            width, height = image.size
+            bands = max(len(image.getbands()), 3)
+    except Exception as err:
+        raise ValueError("Uploaded file is not a valid image") from err
+    return width * height * bands * 2
+
+
+def decode_receipt_image(source: ImageSource, max_size: int) -> Image.Image:
+    """
+    Decodes an uploaded receipt exactly once into an RGB image no larger than max_size.
+
+    - Image.open only parses the header, which is enough to reject non-images cheaply.
+    - For JPEGs, draft mode lets libjpeg scale by 1/2..1/8 during DCT decoding, so a 12 MP photo
+      is never materialized at full resolution when the target is ~1200 px.
+    - For HEIC/HEIF, draft mode decodes an embedded thumbnail instead when one covers max_size.
+      Otherwise the full image is decoded (libheif cannot decode HEVC at a reduced size, so this
+      decode is most of the cost) and box-reduced by an integer factor before LANCZOS.
+    - EXIF orientation is applied once on the reduced image (pillow_heif already applied and
+      reset the HEIF orientation).
+
+    Raises ValueError if the source is not a decodable image.
+    """
+    try:
+        image = _open(source)
+        _draft(image, max_size)
+        image.load()
+    except Exception as err:
+        raise ValueError("Uploaded file is not a valid image") from err
+
+    ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if image.width > max_size or image.height > max_size:
+        # reducing_gap=1.0 box-reduces full resolution decodes (HEIF, PNG, WebP) close to the
+        # target first, about 3x faster than LANCZOS over all 12 MP; JPEG drafts are already close
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=1.0)
+    return image
+
+
+def encode_image(image: Image.Image, output_format: str, quality: int) -> bytes:
+    output = io.BytesIO()
+    save_kwargs = {'format': output_format}
+    if output_format == 'JPEG':
+        save_kwargs.update({'quality': quality, 'optimize': True})
+    elif output_format == 'WEBP':
+        save_kwargs.update({'quality': quality, 'method': 4})
+    elif output_format == 'AVIF':
+        save_kwargs.update({'quality': quality})
+    image.save(output, **save_kwargs)
+    return output.getvalue()
+
+
+def normalize_receipt_image(source: ImageSource, max_size: int, quality: int, output_format: str = 'JPEG') -> bytes:
+    """Decodes, orients and resizes an upload once and returns the encoded, display-ready image."""
+    return encode_image(decode_receipt_image(source, max_size), output_format, quality)
+
+
+def render_receipt_variants(
+    source: ImageSource,
+    max_size: int,
+    quality: int,
+    output_format: str,
+    thumb_size: int,
+    webp_quality: int,
+) -> Dict[str, bytes]:
+    """
+    Decodes an upload once and encodes every stored variant from it:
+    'original' (output_format, used for scanning), 'full' (WebP for the full-screen view)
+    and 'thumb' (small WebP for previews). 'full' is skipped if the original already is WebP.
+    """
+    image = decode_receipt_image(source, max_size)
+    variants = {'original': encode_image(image, output_format, quality)}
+    if output_format != 'WEBP':
+        variants['full'] = encode_image(image, 'WEBP', webp_quality)
+
+    thumb = image.copy()
+    thumb.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS, reducing_gap=1.0)
+    variants['thumb'] = encode_image(thumb, 'WEBP', webp_quality)
+    return variants
+
+
+def _otsu_threshold(histogram: list) -> int:
+    """Grey level that best separates a 256-bin histogram into dark and bright pixels."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best_level, best_variance = 127, 0.0
+    dark_count = dark_weighted = 0
+    for level, count in enumerate(histogram):
+        dark_count += count
+        dark_weighted += level * count
+        bright_count = total - dark_count
+        if dark_count == 0 or bright_count == 0:
+            continue
+        mean_dark = dark_weighted / dark_count
+        mean_bright = (weighted_total - dark_weighted) / bright_count
+        variance = dark_count * bright_count * (mean_dark - mean_bright) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def _bright_span(profile: bytes, min_fill: int) -> Optional[Tuple[int, int]]:
+    """First and last index whose fill (0-255) reaches min_fill, or None."""
+    indices = [i for i, fill in enumerate(profile) if fill >= min_fill]
+    return (indices[0], indices[-1] + 1) if indices else None
+
+
+def find_receipt_bbox(image: Image.Image, analysis_size: int = 256) -> Tuple[int, int, int, int]:
+    """
+    Bounding box of the receipt paper: the bright region against a darker table or background.
+    Works on a small blurred grayscale copy split at the Otsu threshold; rows and columns that are
+    mostly paper span the box, so printed text and stray bright spots do not move it.
+    Returns the full image box when no plausible receipt region is found.
+    """
+    full_box = (0, 0, image.width, image.height)
+    small = image.convert('L')
+    small.thumbnail((analysis_size, analysis_size), Image.Resampling.BOX)
+    small = small.filter(ImageFilter.BoxBlur(2))
+    threshold = _otsu_threshold(small.histogram())
+    mask = small.point([255 if level > threshold else 0 for level in range(256)])
+
+    # BOX-resizing the mask to a single row/column averages it, i.e. the paper fill per column/row
+    columns = _bright_span(mask.resize((mask.width, 1), Image.Resampling.BOX).tobytes(), 128)
+    rows = _bright_span(mask.resize((1, mask.height), Image.Resampling.BOX).tobytes(), 64)
+    if columns is None or rows is None:
+        return full_box
+
+    scale_x, scale_y = image.width / mask.width, image.height / mask.height
+    margin_x, margin_y = image.width * 0.02, image.height * 0.02
+    box = (
+        max(0, int(columns[0] * scale_x - margin_x)),
+        max(0, int(rows[0] * scale_y - margin_y)),
+        min(image.width, int(columns[1] * scale_x + margin_x)),
+        min(image.height, int(rows[1] * scale_y + margin_y)),
+    )
+    # A tiny region is more likely a reflection than the receipt
+    if (box[2] - box[0]) * (box[3] - box[1]) < 0.2 * image.width * image.height:
+        return full_box
+    return box
+
+
+def _fit_to_tiles(image: Image.Image, tile_size: int, min_scale: float = 0.8) -> Image.Image:
+    """
+    Shrink slightly when that saves a whole provider tile: a side just above a tile multiple is
+    scaled down to the multiple, as long as the image keeps at least min_scale of its size.
+    """
+    scale = 1.0
+    for side in image.size:
+        target = (side // tile_size) * tile_size
+        if 0 < target < side and target / side >= min_scale:
+            scale = min(scale, target / side)
+    if scale < 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=1.0)
+    return image
+
+
+def prepare_scan_image(
+    source: ImageSource,
+    max_size: int,
+    quality: int,
+    tile_size: int = 0,
+    grayscale: bool = True,
+    crop: bool = True,
+) -> bytes:
+    """
+    Builds the image sent to the LLM, which only needs legible text: crops to the receipt,
+    converts to high-contrast grayscale, fits max_size and (if tile_size is set) the provider's
+    image tiles, and encodes a JPEG. The stored display image is not changed.
+    """
+    image = decode_receipt_image(source, max_size)
+    if crop:
+        image = image.crop(find_receipt_bbox(image))
+    if grayscale:
+        image = ImageOps.autocontrast(image.convert('L'), cutoff=1)
+    if tile_size:
+        image = _fit_to_tiles(image, tile_size)
+    return encode_image(image, 'JPEG', quality)
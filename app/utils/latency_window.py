@@ -0,0 +1,29 @@
+import math
+from collections import deque
+from typing import Optional
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latencies (seconds) with percentile queries."""
+
+    def __init__(self, size: int = 100):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile (0-100), or None while the window is empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def tail_mean(self, above: float) -> Optional[float]:
+        """Mean of the samples slower than above, or None if there are none."""
+        tail = [sample for sample in self._samples if sample > above]
+        return sum(tail) / len(tail) if tail else None
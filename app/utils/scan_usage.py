@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+@dataclass
+class ScanUsage:
+    """Provider usage collected while a single receipt scan runs."""
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0  # Provider requests, including plain-prompt fallbacks and hedged requests
+
+
+_current_usage: ContextVar[Optional[ScanUsage]] = ContextVar('scan_usage', default=None)
+
+
+@contextmanager
+def collect_scan_usage() -> Iterator[ScanUsage]:
+    """Collect usage reported in this context, including tasks it spawns (e.g. hedged requests)."""
+    usage = ScanUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def report_usage(provider: str, model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+    """Called by adapters after every provider request; a no-op outside of a scan."""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage.provider = provider
+    usage.model = model
+    usage.input_tokens += input_tokens or 0
+    usage.output_tokens += output_tokens or 0
+    usage.calls += 1
@@ -0,0 +1,99 @@
+"""
+Per-format benchmark for the receipt upload image pipeline.
+
+Encodes a 12 MP copy of a test receipt as JPEG, PNG, WebP and HEIC (iPhone-like: 512px tile
+grid with a 320px thumbnail, and with a thumbnail large enough to be decoded instead of the full
+image), then times the legacy pipeline against normalize_receipt_image for each format.
+For the full-resolution HEIC it also splits the time into libheif decoding and the rest
+(reduce, resize, encode): libheif cannot decode HEVC at a reduced size, so without a usable
+thumbnail the full decode is the floor. Timings depend heavily on the CPU; run it on the target
+machine (e.g. the Pi) rather than extrapolating from x86 numbers.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.image_formats [--repeat 3] [--threads N]
+"""
+
+import argparse
+import io
+import os
+import platform
+import statistics
+import time
+
+import pillow_heif
+from PIL import Image
+
+from app.core.config import settings
+from app.services.image_worker import ImageWorkerPool
+from app.utils.image_processing import configure_heif_decoder, normalize_receipt_image
+from tests.benchmarks.image_pipeline import PHONE_PHOTO_SIZE, TEST_RECEIPTS_DIR, legacy_pipeline
+
+SOURCE_RECEIPT = 'spar_1.jpeg'
+
+
+def build_samples(max_size: int) -> dict:
+    with Image.open(os.path.join(TEST_RECEIPTS_DIR, SOURCE_RECEIPT)) as img:
+        photo = img.convert('RGB').resize(PHONE_PHOTO_SIZE, Image.Resampling.BICUBIC)
+
+    def encode(fmt, **kwargs):
+        buffer = io.BytesIO()
+        photo.save(buffer, format=fmt, **kwargs)
+        return buffer.getvalue()
+
+    # x265 'ultrafast' only keeps sample creation short; decoding cost is what is measured.
+    # Phones store HEIC as a grid of 512px tiles, which libheif decodes on DECODE_THREADS threads
+    pillow_heif.options.GRID_TILE_SIZE = 512
+    heic = {'quality': 80, 'enc_params': {'preset': 'ultrafast'}}
+    return {
+        'JPEG': encode('JPEG', quality=92),
+        'PNG': encode('PNG'),
+        'WebP': encode('WEBP', quality=85),
+        'HEIC': encode('HEIF', thumbnails=[320], **heic),
+        f'HEIC+{max_size + 100}px thumb': encode('HEIF', thumbnails=[320, max_size + 100], **heic),
+    }
+
+
+def median_ms(func, content, max_size, quality, repeat) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content, max_size, quality)
+        runs.append((time.perf_counter() - start) * 1000)
+    return statistics.median(runs)
+
+
+def full_decode(content, max_size, quality) -> None:
+    with Image.open(io.BytesIO(content)) as image:
+        image.load()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per format and pipeline (median is reported)')
+    parser.add_argument('--threads', type=int, help='libheif decode threads (default: as configured for image workers)')
+    args = parser.parse_args()
+
+    threads = args.threads or ImageWorkerPool.heif_decode_threads()
+    configure_heif_decoder(threads)
+    max_size = settings.RECEIPT_MAX_SIZE_PX
+    quality = settings.RECEIPT_JPEG_QUALITY
+
+    print(f"Building 12 MP samples from {SOURCE_RECEIPT}...")
+    samples = build_samples(max_size)
+
+    # Wall time, since libheif decodes on its own threads
+    print(f"{platform.machine()}, {os.cpu_count()} cores, libheif {pillow_heif.libheif_version()}")
+    print(f"Target {max_size}px, JPEG quality {quality}, {threads} HEIF decode threads, median of {args.repeat} runs\n")
+    print(f"{'format':<24} {'size MB':>8} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for name, content in samples.items():
+        legacy = median_ms(legacy_pipeline, content, max_size, quality, args.repeat)
+        current = median_ms(normalize_receipt_image, content, max_size, quality, args.repeat)
+        print(f"{name:<24} {len(content) / 1e6:>8.1f} {legacy:>10.0f} {current:>11.0f} {legacy / current:>7.1f}x")
+
+    decode = median_ms(full_decode, samples['HEIC'], max_size, quality, args.repeat)
+    current = median_ms(normalize_receipt_image, samples['HEIC'], max_size, quality, args.repeat)
+    print(f"\nHEIC without a usable thumbnail: {decode:.0f} ms full-resolution decode + {current - decode:.0f} ms reduce/resize/encode")
+
+
+if __name__ == '__main__':
+    main()
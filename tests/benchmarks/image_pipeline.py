@@ -0,0 +1,157 @@
+"""
+Benchmark for the receipt upload image pipeline.
+
+Compares the legacy pipeline (verify + full-resolution decode + convert + thumbnail) with
+normalize_receipt_image (single decode, JPEG draft-mode DCT scaling, EXIF orientation) over
+the images in tests/test_receipts, plus 12 MP upscaled copies that mimic phone photos.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.image_pipeline [--repeat 5]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.image_processing import normalize_receipt_image
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test_receipts')
+PHONE_PHOTO_SIZE = (3024, 4032)  # 12 MP
+
+
+def legacy_pipeline(content: bytes, max_size: int, quality: int) -> bytes:
+    """The pre-optimization save_receipt image handling, kept for comparison."""
+    img = Image.open(io.BytesIO(content))
+    img.verify()
+    image = Image.open(io.BytesIO(content)).convert('RGB')
+    if image.width > max_size or image.height > max_size:
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def decoded_size(content: bytes, max_size: int, draft: bool) -> tuple:
+    """Size of the bitmap the decoder actually materializes."""
+    with Image.open(io.BytesIO(content)) as img:
+        if draft:
+            img.draft('RGB', (max_size, max_size))
+        return img.size
+
+
+def load_samples() -> dict:
+    samples = {}
+    for name in sorted(os.listdir(TEST_RECEIPTS_DIR)):
+        with open(os.path.join(TEST_RECEIPTS_DIR, name), 'rb') as f:
+            content = f.read()
+        samples[name] = content
+
+        with Image.open(io.BytesIO(content)) as img:
+            buffer = io.BytesIO()
+            img.convert('RGB').resize(PHONE_PHOTO_SIZE, Image.Resampling.BICUBIC).save(buffer, format='JPEG', quality=92)
+        samples[f"{os.path.splitext(name)[0]}@12MP.jpg"] = buffer.getvalue()
+    return samples
+
+
+PIPELINES = {
+    'legacy': legacy_pipeline,
+    'draft': normalize_receipt_image,
+}
+
+
+def _read_status_kb(field: str) -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def peak_memory_mb(pipeline: str, samples_dir: str, max_size: int, quality: int) -> float:
+    """
+    Peak RSS growth while running a pipeline over all samples (Linux only).
+    Runs in a fresh interpreter so allocator caches from other runs do not skew the result;
+    writing 5 to clear_refs resets the high-water mark inherited from the parent.
+    """
+    output = subprocess.run(
+        [sys.executable, '-m', 'tests.benchmarks.image_pipeline', '--memory-probe', pipeline, '--samples-dir', samples_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def memory_probe(pipeline: str, samples_dir: str, max_size: int, quality: int) -> None:
+    samples = []
+    for name in sorted(os.listdir(samples_dir)):
+        with open(os.path.join(samples_dir, name), 'rb') as f:
+            samples.append(f.read())
+
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    baseline = _read_status_kb('VmRSS')
+    for content in samples:
+        PIPELINES[pipeline](content, max_size, quality)
+    print((_read_status_kb('VmHWM') - baseline) / 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per image and pipeline (median is reported)')
+    parser.add_argument('--memory-probe', choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument('--samples-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    max_size = settings.RECEIPT_MAX_SIZE_PX
+    quality = settings.RECEIPT_JPEG_QUALITY
+    if args.memory_probe:
+        memory_probe(args.memory_probe, args.samples_dir, max_size, quality)
+        return
+
+    samples = load_samples()
+
+    print(f"Target {max_size}px, JPEG quality {quality}, median of {args.repeat} runs\n")
+    print(f"{'image':<22} {'legacy ms':>10} {'draft ms':>10} {'speedup':>8} {'legacy MP':>10} {'draft MP':>9}")
+
+    totals = {'legacy': 0.0, 'draft': 0.0}
+    for name, content in samples.items():
+        timings = {}
+        for pipeline, func in PIPELINES.items():
+            runs = []
+            for _ in range(args.repeat):
+                start = time.process_time()
+                func(content, max_size, quality)
+                runs.append((time.process_time() - start) * 1000)
+            timings[pipeline] = statistics.median(runs)
+            totals[pipeline] += timings[pipeline]
+
+        full = decoded_size(content, max_size, draft=False)
+        reduced = decoded_size(content, max_size, draft=True)
+        print(
+            f"{name:<22} {timings['legacy']:>10.1f} {timings['draft']:>10.1f} "
+            f"{timings['legacy'] / timings['draft']:>7.1f}x "
+            f"{full[0] * full[1] / 1e6:>10.1f} {reduced[0] * reduced[1] / 1e6:>9.1f}"
+        )
+
+    print(f"\n{'total CPU':<22} {totals['legacy']:>10.1f} {totals['draft']:>10.1f} {totals['legacy'] / totals['draft']:>7.1f}x")
+    with tempfile.TemporaryDirectory() as samples_dir:
+        for name, content in samples.items():
+            with open(os.path.join(samples_dir, name), 'wb') as f:
+                f.write(content)
+        try:
+            legacy_peak = peak_memory_mb('legacy', samples_dir, max_size, quality)
+            draft_peak = peak_memory_mb('draft', samples_dir, max_size, quality)
+        except (OSError, subprocess.CalledProcessError):
+            print("peak RSS: not available on this platform (needs Linux /proc/self/clear_refs)")
+            return
+    print(f"{'peak RSS growth (MB)':<22} {legacy_peak:>10.1f} {draft_peak:>10.1f} {legacy_peak / max(draft_peak, 0.1):>7.1f}x")
+
+if __name__ == '__main__':
+    main()
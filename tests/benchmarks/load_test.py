@@ -0,0 +1,645 @@
+"""
+End-to-end load test: concurrent headless clients against a real app process.
+
+Starts app/main.py in a throwaway working directory (fresh SQLite database seeded with
+--seed-rows expenses, AI_PROVIDER=testing or a replayed scan cassette) and drives --clients
+virtual users through it. Each user logs in once and then loops over realistic sessions:
+dashboard filter changes, History grid scrolling/sorting (block fetches of the infinite row
+model), a cell edit, mobile list scrolling and search / type filter, and (with --upload-ratio)
+receipt upload -> Scan All -> Save All.
+
+The clients speak NiceGUI's own protocol without a browser: they load the page over HTTP,
+read the element tree embedded in it, connect the page's socket.io websocket and emit the
+same element events the browser would. An action's latency is the time from sending it until
+the server's answer arrives (UI update, notification or navigation), which includes the
+event handler's database work.
+
+Reported: per-action p50/p95/p99 latency, event-loop lag of the server (sampled in-process
+every 50 ms), callbacks that blocked the loop (from the app's /metrics), and CPU and resident
+memory of the server process tree (Linux /proc). --fail-on-stall turns blocking callbacks into
+a non-zero exit status for CI.
+
+Usage (from the repository root):
+    python -m tests.benchmarks.load_test [--clients 20] [--duration 60] [--seed-rows 20000]
+    python -m tests.benchmarks.load_test --provider cassette --cassette app/data/scan_cassette.jsonl
+"""
+
+import argparse
+import ast
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+from uuid import uuid4
+
+import httpx
+import socketio
+from PIL import Image, ImageDraw
+
+from app.utils.latency_window import LatencyWindow
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TEST_RECEIPTS_DIR = os.path.join(REPO_ROOT, 'tests', 'test_receipts')
+BASE_URL = 'http://127.0.0.1:8501'  # port is fixed in app/main.py
+LOOP_LAG_INTERVAL = 0.05
+SEARCH_TERMS = ['Billa', 'Spar', 'Hofer', 'Lidl', 'Coffee', 'Fuel', 'Pharmacy', 'Rent', 'Salary', 'Dinner']
+ELEMENTS_PATTERN = re.compile(r'parseElements\(String\.raw`(.*?)`\)', re.S)
+QUERY_PATTERN = re.compile(r'^\s*query: (\{.*\}),$', re.M)
+RUN_METHOD_PATTERN = re.compile(r'^return runMethod\((\d+), "(\w+)", (.*)\)$', re.S)
+HTML_UNESCAPE = [('&#36;', '$'), ('&#96;', '`'), ('&gt;', '>'), ('&lt;', '<'), ('&amp;', '&')]
+
+
+# --- Server side (runs inside the app process) ---
+
+def seed_database(rows: int) -> None:
+    """Insert rows expenses/incomes spread over the last three years."""
+    from app.core.config import settings
+    from app.core.database import Base, SessionLocal, engine
+    from app.db.models import Expense
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    today = date.today()
+    db = SessionLocal()
+    try:
+        for start in range(0, rows, 5000):
+            batch = []
+            for _ in range(start, min(rows, start + 5000)):
+                is_income = rng.random() < 0.1
+                amount = Decimal(rng.randint(100, 300000 if is_income else 20000)) / 100
+                batch.append(Expense(
+                    date=today - timedelta(days=rng.randint(0, 3 * 365)),
+                    type='income' if is_income else 'expense',
+                    category=rng.choice(settings.INCOME_CATEGORIES if is_income else settings.EXPENSE_CATEGORIES),
+                    description=f"{rng.choice(SEARCH_TERMS)} #{rng.randint(1, 999)}",
+                    amount=amount,
+                    currency='EUR',
+                    amount_eur=amount,
+                    exchange_rate=Decimal('1.0'),
+                ))
+            db.add_all(batch)
+            db.commit()
+    finally:
+        db.close()
+
+
+def serve(seed_rows: int) -> None:
+    """Seed the database, install the loop-lag probe and run app/main.py in this process."""
+    import runpy
+
+    from nicegui import app, background_tasks
+
+    seed_database(seed_rows)
+    probe = {'window': LatencyWindow(size=1_000_000)}
+
+    async def sample_loop_lag() -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            probe['window'].add(max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL))
+
+    app.on_startup(lambda: background_tasks.create(sample_loop_lag(), name='load test loop lag probe'))
+
+    @app.get('/_loadtest/loop_lag')
+    def loop_lag(reset: bool = False) -> Dict:
+        window = probe['window']
+        if reset:
+            probe['window'] = LatencyWindow(size=1_000_000)
+        return {
+            'samples': len(window),
+            **{f'p{pct}': window.percentile(pct) for pct in (50, 95, 99, 100)},
+        }
+
+    sys.argv = [os.path.join(REPO_ROOT, 'app', 'main.py')]
+    runpy.run_path(sys.argv[0], run_name='__main__')
+
+
+# --- Headless client ---
+
+class PageSession:
+    """One open page (browser tab): the element tree plus its socket.io connection."""
+
+    def __init__(self, http: httpx.AsyncClient):
+        self.http = http
+        self.elements: Dict[int, dict] = {}
+        self.list_lengths: Dict[int, int] = defaultdict(int)
+        self.client_id = ''
+        self.sio: Optional[socketio.AsyncClient] = None
+        self._inbox: List[tuple] = []
+        self._arrived = asyncio.Event()
+        self._next_message_id = 0
+
+    async def open(self, path: str) -> None:
+        response = await self.http.get(path)
+        response.raise_for_status()
+        raw = ELEMENTS_PATTERN.search(response.text).group(1)
+        for escaped, char in HTML_UNESCAPE:
+            raw = raw.replace(escaped, char)
+        self.elements = {int(key): element for key, element in json.loads(raw).items()}
+        query = ast.literal_eval(QUERY_PATTERN.search(response.text).group(1))
+        self.client_id = query['client_id']
+        query.update({'tab_id': str(uuid4()), 'document_id': str(uuid4())})
+        query['implicit_handshake'] = str(query['implicit_handshake']).lower()
+
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('*', self._on_message)
+        cookies = '; '.join(f'{name}={value}' for name, value in self.http.cookies.items())
+        await self.sio.connect(
+            f"{BASE_URL}?{urlencode(query)}",
+            headers={'Cookie': cookies},
+            transports=['websocket'],
+            socketio_path='/_nicegui_ws/socket.io',
+            wait_timeout=10,
+        )
+
+    async def _on_message(self, event: str, data=None) -> None:
+        if isinstance(data, dict) and '_id' in data:
+            self._next_message_id = max(self._next_message_id, data.pop('_id') + 1)
+        if event == 'update':
+            for element_id, element in data.items():
+                if element is None:
+                    self.elements.pop(int(element_id), None)
+                else:
+                    self.elements[int(element_id)] = element
+        elif event == 'run_javascript':
+            call = RUN_METHOD_PATTERN.match(data.get('code', ''))
+            if call:
+                self._track_list(int(call[1]), call[2], json.loads(call[3]))
+        self._inbox.append((event, data))
+        self._arrived.set()
+
+    def _track_list(self, element_id: int, method: str, args: list) -> None:
+        """Follows the length of History's mobile list through its method calls (other elements have reset() too)."""
+        if not is_mobile_list(self.elements.get(element_id, {})):
+            return
+        if method == 'reset':
+            self.list_lengths[element_id] = len(args[0])
+        elif method == 'append':
+            self.list_lengths[element_id] += len(args[0])
+        elif method == 'remove':
+            self.list_lengths[element_id] -= 1
+
+    async def close(self) -> None:
+        if self.sio is not None:
+            await self.sio.disconnect()
+            self.sio = None
+
+    def find(self, predicate: Callable[[dict], bool]) -> int:
+        for element_id, element in self.elements.items():
+            if predicate(element):
+                return element_id
+        raise LookupError('element not found on page')
+
+    def find_by_label(self, label: str) -> int:
+        return self.find(lambda e: label in (e.get('props', {}).get('label'), e.get('text')))
+
+    def find_by_icon(self, icon: str) -> int:
+        return self.find(lambda e: e.get('props', {}).get('icon') == icon)
+
+    def is_enabled(self, element_id: int) -> bool:
+        return not self.elements[element_id].get('props', {}).get('disable')
+
+    async def emit(self, element_id: int, event_type: str, *args) -> None:
+        listener = next(e for e in self.elements[element_id].get('events', []) if e['type'] == event_type)
+        await self.sio.emit('event', {
+            'id': element_id,
+            'client_id': self.client_id,
+            'listener_id': listener['listener_id'],
+            'args': [json.dumps(arg) for arg in args],
+        })
+
+    async def set_value(self, element_id: int, value) -> None:
+        """Emit the value change of an input, select or switch (update:value / update:modelValue)."""
+        event_type = next(e['type'] for e in self.elements[element_id]['events'] if e['type'].startswith('update:'))
+        await self.emit(element_id, event_type, value)
+
+    def select_option(self, element_id: int, label: str) -> dict:
+        return next(o for o in self.elements[element_id]['props']['options'] if str(o['label']) == str(label))
+
+    async def act(self, send: Callable, expect: Callable[[str, object], bool], timeout: float) -> None:
+        """Run send() and wait until a server message satisfies expect(event, data)."""
+        mark = len(self._inbox)
+        await send()
+        deadline = time.perf_counter() + timeout
+        while not any(expect(event, data) for event, data in self._inbox[mark:]):
+            self._arrived.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError('no answer from server')
+            await asyncio.wait_for(self._arrived.wait(), remaining)
+        await self.sio.emit('ack', {'client_id': self.client_id, 'next_message_id': self._next_message_id})
+
+
+def is_mobile_list(element: dict) -> bool:
+    return any(listener['type'] == 'virtualScroll' for listener in element.get('events', []))
+
+
+def is_update(event: str, _) -> bool:
+    return event == 'update'
+
+
+def is_method_call(method: str) -> Callable[[str, object], bool]:
+    return lambda event, data: event == 'run_javascript' and f'"{method}"' in data.get('code', '')
+
+
+def is_notification(*words: str) -> Callable[[str, object], bool]:
+    return lambda event, data: event == 'notify' and any(w in str(data.get('message', '')).lower() for w in words)
+
+
+# --- Scenario ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def measure(self, action: str, coro) -> bool:
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception:
+            if self.recording:
+                self.errors[action] += 1
+            return False
+        if self.recording:
+            self.latencies[action].append(time.perf_counter() - start)
+        return True
+
+
+class VirtualUser:
+    """A user with its own cookies (browser) who opens one page after another."""
+
+    def __init__(self, recorder: Recorder, args, receipts: List[bytes], seed: int):
+        self.recorder = recorder
+        self.args = args
+        self.receipts = receipts
+        self.rng = random.Random(seed)
+        self.http = httpx.AsyncClient(base_url=BASE_URL, follow_redirects=True, timeout=30)
+
+    async def think(self) -> None:
+        await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    async def page(self, path: str) -> PageSession:
+        page = PageSession(self.http)
+        if not await self.recorder.measure(f'open {path}', page.open(path)):
+            await page.close()
+            raise RuntimeError(f'could not open {path}')
+        return page
+
+    async def step(self, page: PageSession, action: str, send: Callable, expect=is_update, timeout: float = 10) -> None:
+        await self.recorder.measure(action, page.act(send, expect, timeout))
+        await self.think()
+
+    async def login(self) -> None:
+        page = await self.page('/login')
+        try:
+            await page.set_value(page.find_by_label('Username'), 'admin')
+            await page.set_value(page.find_by_label('Password'), 'admin')
+            await self.step(page, 'login', lambda: page.emit(page.find_by_label('Login'), 'click'),
+                            expect=lambda event, _: event in ('open', 'notify'))
+        finally:
+            await page.close()
+
+    async def dashboard(self) -> None:
+        page = await self.page('/')
+        try:
+            year = page.find_by_label('Year')
+            option = page.select_option(year, date.today().year - self.rng.randint(0, 1))
+            await self.step(page, 'dashboard year', lambda: page.set_value(year, option))
+            await self.step(page, 'dashboard prev month', lambda: page.emit(page.find_by_icon('chevron_left'), 'click'))
+            await self.step(page, 'dashboard next month', lambda: page.emit(page.find_by_icon('chevron_right'), 'click'))
+            whole_year = page.find_by_label('Whole Year')
+            await self.step(page, 'dashboard whole year', lambda: page.set_value(whole_year, True))
+            await self.step(page, 'dashboard whole year', lambda: page.set_value(whole_year, False))
+        finally:
+            await page.close()
+
+    async def grid_block(self, start: int, sort: Optional[List[dict]] = None, **page_filters: str) -> dict:
+        """Fetch a block like the History grid's infinite row model does while scrolling."""
+        params = {'start': start, 'end': start + 100, 'sort': json.dumps(sort or []), 'filter': '{}', **page_filters}
+        response = await self.http.get('/api/history/rows', params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def history(self) -> None:
+        page = await self.page('/history')
+        try:
+            # Rows of the page's date filters, counted right away (before other users save more):
+            # a scroll only appends to the mobile list while it holds fewer
+            dates = {key: page.elements[page.find_by_label(label)]['props']['value'] for key, label in (('from', 'From'), ('to', 'To'))}
+            mobile_total = (await self.grid_block(0, **dates))['last_row']
+
+            # Scroll through all years of history, then sort by amount
+            block = {'rows': [], 'last_row': -1}
+
+            async def first_block():
+                nonlocal block
+                block = await self.grid_block(0)
+
+            await self.recorder.measure('history grid block', first_block())
+            for _ in range(self.rng.randint(2, 4)):
+                start = self.rng.randrange(0, max(1, block['last_row']), 100)
+                await self.recorder.measure('history grid block', self.grid_block(start))
+                await self.think()
+            await self.recorder.measure('history grid sort', self.grid_block(0, [{'colId': 'amount', 'sort': 'desc'}]))
+            await self.think()
+            if block['rows']:
+                # Edit one description in the grid; the row is patched in place
+                row = self.rng.choice(block['rows'])
+                grid = page.find(lambda e: any(l['type'] == 'cellValueChanged' for l in e.get('events', [])))
+                edit = {
+                    'colId': 'description',
+                    'oldValue': row['description'],
+                    'newValue': f"{self.rng.choice(SEARCH_TERMS)} edited",
+                    'data': row,
+                }
+                await self.step(page, 'history edit cell', lambda: page.emit(grid, 'cellValueChanged', edit), is_notification('updated'))
+            # Scroll the mobile list to its end a few times
+            mobile_list = page.find(is_mobile_list)
+            for _ in range(self.rng.randint(1, 3)):
+                loaded = page.list_lengths[mobile_list]
+                if not loaded or loaded >= mobile_total:
+                    break
+                await self.step(page, 'history mobile scroll', lambda: page.emit(mobile_list, 'virtualScroll', {'to': loaded - 1}),
+                                is_method_call('append'))
+            search = page.find_by_label('Search description/category')
+            term = self.rng.choice(SEARCH_TERMS)
+            await self.step(page, 'history search', lambda: page.set_value(search, term), is_method_call('reset'))
+            type_select = page.find_by_label('Type')
+            option = page.select_option(type_select, 'expense')
+            await self.step(page, 'history type filter', lambda: page.set_value(type_select, option))
+            await self.step(page, 'history reset', lambda: page.emit(page.find_by_label('Reset'), 'click'))
+        finally:
+            await page.close()
+
+    async def upload(self) -> None:
+        page = await self.page('/add')
+        try:
+            uploader = page.find(lambda e: '/upload/' in str(e.get('props', {}).get('url', '')))
+            url = page.elements[uploader]['props']['url']
+            content = self.rng.choice(self.receipts)
+
+            async def post():
+                response = await self.http.post(url, files={'file': (f'{uuid4().hex}.jpg', content, 'image/jpeg')})
+                response.raise_for_status()
+
+            def card_added(event, data):
+                return event == 'update' and any('receipt-card' in (e or {}).get('class', []) for e in data.values())
+
+            await self.step(page, 'upload', post, expect=card_added, timeout=60)
+            await self.step(page, 'scan (until result)', lambda: page.emit(page.find_by_label('Scan All'), 'click'),
+                            expect=is_notification('scanned', 'scan failed', 'already scanned'),
+                            timeout=self.args.scan_timeout)
+            await self.step(page, 'save all', lambda: page.emit(page.find_by_label('Save All'), 'click'),
+                            expect=is_notification('saved', 'error'))
+        finally:
+            await page.close()
+
+    async def run(self, deadline: float) -> None:
+        try:
+            await self.login()
+            while time.perf_counter() < deadline:
+                session = [self.dashboard, self.history]
+                if self.rng.random() < self.args.upload_ratio:
+                    session.append(self.upload)
+                self.rng.shuffle(session)
+                for visit in session:
+                    if time.perf_counter() >= deadline:
+                        break
+                    try:
+                        await visit()
+                    except Exception:
+                        await self.think()
+        finally:
+            await self.http.aclose()
+
+
+# --- Measurement of the server process ---
+
+class ProcessSampler:
+    """CPU and resident memory of a process and its children, from /proc (Linux only)."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_percent: List[float] = []
+        self.rss_mb: List[float] = []
+        self._ticks_per_second = os.sysconf('SC_CLK_TCK')
+
+    def _tree(self, pid: int) -> List[int]:
+        pids = [pid]
+        try:
+            for task in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{task}/children') as f:
+                    for child in f.read().split():
+                        pids.extend(self._tree(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    def _read(self) -> tuple:
+        ticks, rss_kb = 0, 0
+        for pid in self._tree(self.pid):
+            try:
+                with open(f'/proc/{pid}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                ticks += int(fields[11]) + int(fields[12])  # utime + stime
+                with open(f'/proc/{pid}/status') as f:
+                    rss_kb += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            except (OSError, StopIteration):
+                continue
+        return ticks, rss_kb
+
+    async def run(self) -> None:
+        ticks, _ = self._read()
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now_ticks, rss_kb = self._read()
+            now = time.perf_counter()
+            self.cpu_percent.append((now_ticks - ticks) / self._ticks_per_second / (now - last) * 100)
+            self.rss_mb.append(rss_kb / 1024)
+            ticks, last = now_ticks, now
+
+
+# --- Driver ---
+
+def make_receipts(count: int) -> List[bytes]:
+    """Distinct JPEGs derived from the test receipts, so uploads are not deduplicated or cached."""
+    sources = [Image.open(os.path.join(TEST_RECEIPTS_DIR, name)).convert('RGB') for name in sorted(os.listdir(TEST_RECEIPTS_DIR))]
+    rng = random.Random(7)
+    receipts = []
+    for i in range(count):
+        image = sources[i % len(sources)].copy()
+        x, y = rng.randrange(image.width - 40), rng.randrange(image.height - 40)
+        ImageDraw.Draw(image).rectangle((x, y, x + 40, y + 40), fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        receipts.append(buffer.getvalue())
+    return receipts
+
+
+def start_server(args, workdir: str) -> subprocess.Popen:
+    # The app uses paths relative to the working directory (database, uploads, static files)
+    os.makedirs(os.path.join(workdir, 'app', 'ui'))
+    os.makedirs(os.path.join(workdir, 'app', 'data'))
+    os.symlink(os.path.join(REPO_ROOT, 'app', 'ui', 'static'), os.path.join(workdir, 'app', 'ui', 'static'))
+    env = {
+        **os.environ,
+        'PYTHONPATH': REPO_ROOT,
+        'DB_TYPE': 'sqlite',
+        'SQLITE_FILE': 'loadtest.db',
+        'AI_PROVIDER': args.provider,
+        'SCAN_FALLBACK_PROVIDERS': '[]',
+        'SCAN_CACHE_ENABLED': 'false',
+        'ADMIN_USERNAME': 'admin',
+        'ADMIN_PASSWORD': 'admin',
+        'LOG_LEVEL': 'WARNING',  # server.log then mostly holds the blocking-callback stacks
+    }
+    if args.provider == 'cassette':
+        env.update({'SCAN_CASSETTE_MODE': 'replay', 'SCAN_CASSETTE_PATH': os.path.abspath(args.cassette)})
+    with open(os.path.join(workdir, 'server.log'), 'w') as log:
+        return subprocess.Popen(
+            [sys.executable, '-m', 'tests.benchmarks.load_test', '--serve', '--seed-rows', str(args.seed_rows)],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+async def wait_until_ready(server: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=BASE_URL) as http:
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError('app process exited during startup')
+            try:
+                if (await http.get('/_loadtest/loop_lag')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError('app did not start in time')
+
+
+async def run_load(args, server: subprocess.Popen) -> tuple:
+    recorder = Recorder()
+    receipts = make_receipts(max(8, args.clients * 2))
+    sampler = ProcessSampler(server.pid)
+
+    deadline = time.perf_counter() + args.ramp_up + args.warmup + args.duration
+    users = [VirtualUser(recorder, args, receipts, seed=i) for i in range(args.clients)]
+
+    async def start_user(i: int, user: VirtualUser) -> None:
+        await asyncio.sleep(args.ramp_up * i / max(1, args.clients))
+        await user.run(deadline)
+
+    tasks = [asyncio.create_task(start_user(i, user)) for i, user in enumerate(users)]
+    # Logins, first page loads and JIT-like warm caches are not measured
+    await asyncio.sleep(args.ramp_up + args.warmup)
+
+    async with httpx.AsyncClient(base_url=BASE_URL) as http:
+        await http.get('/_loadtest/loop_lag', params={'reset': True})
+        stalls_before = read_metric((await http.get('/metrics')).text, 'xpense_event_loop_blocked_total')
+        recorder.recording = True
+        sampling = asyncio.create_task(sampler.run())
+        await asyncio.gather(*tasks)
+        recorder.recording = False
+        sampling.cancel()
+        loop_lag = (await http.get('/_loadtest/loop_lag')).json()
+        loop_lag['stalls'] = read_metric((await http.get('/metrics')).text, 'xpense_event_loop_blocked_total') - stalls_before
+    return recorder, sampler, loop_lag
+
+
+def read_metric(text: str, name: str) -> float:
+    match = re.search(rf'^{name} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:>8.0f}" if seconds is not None else f"{'-':>8}"
+
+
+def report(args, recorder: Recorder, sampler: ProcessSampler, loop_lag: Dict) -> None:
+    print(f"{args.clients} clients, {args.duration}s measured, {args.seed_rows} seeded rows, provider {args.provider}\n")
+    print(f"{'action':<24} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for action in sorted(set(recorder.latencies) | set(recorder.errors)):
+        samples = recorder.latencies.get(action, [])
+        window = LatencyWindow(size=max(1, len(samples)))
+        for seconds in samples:
+            window.add(seconds)
+        print(f"{action:<24} {len(samples):>6} {recorder.errors.get(action, 0):>6} "
+              f"{_ms(window.percentile(50))} {_ms(window.percentile(95))} {_ms(window.percentile(99))}")
+
+    total = sum(len(samples) for samples in recorder.latencies.values())
+    print(f"\nthroughput               {total / args.duration:.1f} actions/s")
+    print(f"event loop lag           p50 {_ms(loop_lag['p50']).strip()} ms, p95 {_ms(loop_lag['p95']).strip()} ms, "
+          f"p99 {_ms(loop_lag['p99']).strip()} ms, max {_ms(loop_lag['p100']).strip()} ms ({loop_lag['samples']} samples)")
+    print(f"blocking callbacks       {loop_lag['stalls']:.0f} (stacks in server.log, see --keep)")
+    if sampler.cpu_percent:
+        print(f"server CPU               avg {sum(sampler.cpu_percent) / len(sampler.cpu_percent):.0f}%, "
+              f"peak {max(sampler.cpu_percent):.0f}% of one core (process tree, {os.cpu_count()} cores)")
+        print(f"server RSS               avg {sum(sampler.rss_mb) / len(sampler.rss_mb):.0f} MB, "
+              f"peak {max(sampler.rss_mb):.0f} MB (sum over process tree)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='measured seconds (after ramp-up and warm-up)')
+    parser.add_argument('--ramp-up', type=float, default=10, help='seconds over which the users start')
+    parser.add_argument('--warmup', type=float, default=10, help='unmeasured seconds after the ramp-up')
+    parser.add_argument('--think', type=float, default=0.5, help='mean think time between actions in seconds')
+    parser.add_argument('--seed-rows', type=int, default=20000, help='expenses in the seeded database')
+    parser.add_argument('--upload-ratio', type=float, default=0.3, help='share of sessions that upload and scan a receipt')
+    parser.add_argument('--scan-timeout', type=float, default=90, help='longest wait for a scan result in seconds')
+    parser.add_argument('--provider', choices=['testing', 'cassette'], default='testing', help='scanner used by the app')
+    parser.add_argument('--cassette', default='app/data/scan_cassette.jsonl', help='cassette replayed with --provider cassette')
+    parser.add_argument('--fail-on-stall', action='store_true', help='exit with status 1 if a callback blocked the event loop')
+    parser.add_argument('--keep', action='store_true', help='keep the working directory (database, uploads, server.log)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.seed_rows)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='xpense-loadtest-')
+    server = start_server(args, workdir)
+    try:
+        asyncio.run(wait_until_ready(server))
+        recorder, sampler, loop_lag = asyncio.run(run_load(args, server))
+    finally:
+        stop_server(server)
+        if args.keep:
+            print(f"working directory kept: {workdir}\n")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    report(args, recorder, sampler, loop_lag)
+    if args.fail_on_stall and loop_lag['stalls']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
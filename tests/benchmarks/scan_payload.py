@@ -0,0 +1,123 @@
+"""
+Benchmark for the LLM scan preprocessing stage.
+
+For every image in tests/test_receipts, compares the stored receipt image (what scanners were
+sent before) with prepare_scan_image for each provider's ScanImageProfile: request payload size,
+estimated image tokens and preprocessing time. With --live, also times real end-to-end scans of
+both variants against the configured AI_PROVIDER (needs an API key, and costs money).
+
+Usage (from the repository root):
+    python -m tests.benchmarks.scan_payload [--repeat 3] [--live]
+"""
+
+import argparse
+import asyncio
+import io
+import math
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from app.adapters.gemini_scanner import GeminiScanner
+from app.adapters.openai_scanner import OpenAIScanner
+from app.core.config import settings
+from app.interfaces.scanner import ReceiptImage
+from app.utils.image_processing import normalize_receipt_image, prepare_scan_image
+from tests.benchmarks.image_pipeline import TEST_RECEIPTS_DIR
+
+PROFILES = {
+    'gemini': GeminiScanner.scan_profile,
+    'openai': OpenAIScanner.scan_profile,
+}
+
+
+def openai_image_tokens(width: int, height: int) -> int:
+    """High detail: fit 2048x2048, scale the short side down to 768, 85 + 170 per 512px tile."""
+    scale = min(1.0, 2048 / max(width, height))
+    scale = min(scale, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def gemini_image_tokens(width: int, height: int) -> int:
+    """gemini-1.5 bills every image as 258 tokens, whatever its size."""
+    return 258
+
+
+TOKEN_ESTIMATES = {'gemini': gemini_image_tokens, 'openai': openai_image_tokens}
+
+
+def image_size(data: bytes) -> tuple:
+    with Image.open(io.BytesIO(data)) as img:
+        return img.size
+
+
+def median_ms(func, repeat) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return statistics.median(runs)
+
+
+async def live_scan_ms(image: ReceiptImage) -> float:
+    from app.services.llm_factory import LLMFactory
+
+    scanner = LLMFactory.get_scanner()
+    start = time.perf_counter()
+    await scanner.scan_image_async(image)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='preprocessing runs per image (median is reported)')
+    parser.add_argument('--live', action='store_true', help=f'also scan with AI_PROVIDER ({settings.AI_PROVIDER})')
+    args = parser.parse_args()
+
+    stored = {}
+    for name in sorted(os.listdir(TEST_RECEIPTS_DIR)):
+        with open(os.path.join(TEST_RECEIPTS_DIR, name), 'rb') as f:
+            stored[name] = normalize_receipt_image(f.read(), settings.RECEIPT_MAX_SIZE_PX, settings.RECEIPT_JPEG_QUALITY)
+
+    for provider, profile in PROFILES.items():
+        estimate = TOKEN_ESTIMATES[provider]
+        print(f"\n{provider}: {profile}")
+        print(f"{'image':<16} {'stored KB':>10} {'scan KB':>8} {'stored tok':>11} {'scan tok':>9} {'prep ms':>8}")
+        totals = [0, 0, 0, 0]
+        for name, content in stored.items():
+            prepared = prepare_scan_image(
+                content, profile.max_size, profile.quality, profile.tile_size, profile.grayscale, profile.crop
+            )
+            prep_ms = median_ms(lambda: prepare_scan_image(
+                content, profile.max_size, profile.quality, profile.tile_size, profile.grayscale, profile.crop
+            ), args.repeat)
+            row = [len(content), len(prepared), estimate(*image_size(content)), estimate(*image_size(prepared))]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(
+                f"{name:<16} {row[0] / 1024:>10.0f} {row[1] / 1024:>8.0f} {row[2]:>11} {row[3]:>9} {prep_ms:>8.0f}"
+            )
+        print(
+            f"{'total':<16} {totals[0] / 1024:>10.0f} {totals[1] / 1024:>8.0f} {totals[2]:>11} {totals[3]:>9}"
+            f"   payload -{1 - totals[1] / totals[0]:.0%}, tokens -{1 - totals[3] / totals[2]:.0%}"
+        )
+
+    if args.live:
+        profile = PROFILES.get(settings.AI_PROVIDER.lower())
+        print(f"\nLive scans with {settings.AI_PROVIDER}")
+        print(f"{'image':<16} {'stored ms':>10} {'scan ms':>8}")
+        for name, content in stored.items():
+            original = ReceiptImage(name, data=content, mime_type='image/jpeg')
+            prepared = original
+            if profile is not None:
+                prepared = ReceiptImage(name, mime_type='image/jpeg', data=prepare_scan_image(
+                    content, profile.max_size, profile.quality, profile.tile_size, profile.grayscale, profile.crop
+                ))
+            print(f"{name:<16} {asyncio.run(live_scan_ms(original)):>10.0f} {asyncio.run(live_scan_ms(prepared)):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
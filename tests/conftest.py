@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.services import receipt_service
+from app.services.receipt_service import ReceiptService
+
+
+@pytest.fixture(autouse=True)
+def session_factory(tmp_path, monkeypatch):
+    """
+    Isolated SQLite database per test (file based so worker sessions share it). Services that
+    open SessionLocal themselves (scan cache, telemetry, receipt storage) use it too, so no test
+    writes to the app's database.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(receipt_service, 'SessionLocal', factory)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def upload_dirs(tmp_path, monkeypatch):
+    """Stored receipts and spooled uploads go to the test's tmp_path, never to app/data/uploads."""
+    monkeypatch.setattr(ReceiptService, 'UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(ReceiptService, 'SPOOL_DIR', str(tmp_path / 'spool'))
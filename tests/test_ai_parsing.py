@@ -0,0 +1,84 @@
+import asyncio
+import os
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.adapters.openai_scanner import OpenAIScanner
+from app.core.config import settings
+from app.interfaces.scanner import ReceiptImage
+from app.utils.ai_parsing import AIResponseParseError, parse_ai_batch_response, parse_ai_response
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+def test_structured_json_is_parsed():
+    result = parse_ai_response(
+        '{"date": "06.12.2025", "total_amount": 20.13, "currency": "EUR", '
+        '"category": "Lebensmittel", "description": "BILLA"}',
+        'receipt.jpg',
+    )
+    assert result.date == date(2025, 12, 6)
+    assert result.amount == result.amount_eur == Decimal("20.13")
+    assert result.category == "Lebensmittel"
+    assert result.receipt_image_path == 'receipt.jpg'
+
+
+def test_free_text_answers_are_tolerated():
+    raw = (
+        'Here is the data:\n```json\n{"date": "2025-11-18", "total_amount": "8,74 €", '
+        '"currency": "eur", "category": "Groceries", "description": "Lidl"}\n```'
+    )
+    result = parse_ai_response(raw, 'receipt.jpg')
+    assert result.date == date(2025, 11, 18)
+    assert result.amount == Decimal("8.74")
+    assert result.currency == "EUR"
+    # Categories outside the configured list fall back to the last one
+    assert result.category == settings.EXPENSE_CATEGORIES[-1]
+
+
+@pytest.mark.parametrize('raw', ['', 'no receipt found', '{"total_amount": 3}', '[1, 2]'])
+def test_unparsable_answers_raise_parse_error(raw):
+    with pytest.raises(AIResponseParseError):
+        parse_ai_response(raw, 'receipt.jpg')
+
+
+def test_batched_answers_are_matched_by_index():
+    entry = '{{"index": {}, "date": "01.02.2025", "total_amount": {}, "currency": "EUR", "category": "Lebensmittel", "description": "Shop"}}'
+    raw = '{"receipts": [' + entry.format(2, 5) + ', ' + entry.format(1, 3) + ']}'
+
+    results = parse_ai_batch_response(raw, ['one.jpg', 'two.jpg'])
+    assert [(r.receipt_image_path, r.amount) for r in results] == [('one.jpg', Decimal("3")), ('two.jpg', Decimal("5"))]
+
+    # One entry for two receipts is inconsistent, so the caller can split the batch
+    with pytest.raises(AIResponseParseError):
+        parse_ai_batch_response('{"receipts": [' + entry.format(1, 3) + ']}', ['one.jpg', 'two.jpg'])
+
+
+def test_openai_falls_back_to_plain_prompt_after_bad_structured_answer(monkeypatch):
+    requests = []
+    answers = iter([
+        '{"date": "06.12', # cut off
+        '```json\n{"date": "06.12.2025", "total_amount": 20.13, "currency": "EUR", '
+        '"category": "Lebensmittel", "description": "BILLA"}\n```',
+    ])
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        message = SimpleNamespace(content=next(answers))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    scanner = object.__new__(OpenAIScanner)
+    scanner.model = 'gpt-4o'
+    scanner.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(settings, 'SCAN_STRUCTURED_OUTPUT', True)
+
+    image = ReceiptImage(os.path.join(TEST_RECEIPTS_DIR, 'billa_1.jpeg'))
+    result = asyncio.run(scanner.scan_image_async(image))
+
+    assert result.amount == Decimal("20.13")
+    assert requests[0]['response_format']['json_schema']['strict'] is True
+    assert requests[0]['max_tokens'] == settings.SCAN_MAX_OUTPUT_TOKENS
+    assert 'response_format' not in requests[1]
@@ -59,11 +59,7 @@ def test_ai_scanning_with_testing_provider():
             assert os.path.exists(saved_path)
             
             print(f"Successfully scanned {filename}: {result.description} - {result.amount} {result.currency}")
-            
-            # Cleanup the saved file in uploads/
-            if os.path.exists(saved_path):
-                os.remove(saved_path)
-                
+
     finally:
         # Restore setting
         settings.AI_PROVIDER = original_provider
@@ -97,3 +93,130 @@ def test_create_expense_from_scan_result():
     assert created_expense.amount == Decimal("10.00")
     assert created_expense.amount_eur == Decimal("10.00") # Logic in service
     assert created_expense.description == "Test Receipt"
+
+def test_scan_concurrency_is_bounded_per_provider(monkeypatch):
+    """
+    Test that concurrent scans are awaited natively and never exceed SCAN_MAX_CONCURRENCY
+    for any provider, including the fallback that answers while the primary is down.
+    """
+    from app.adapters.fallback_scanner import FallbackScanner
+    from app.interfaces.scanner import ReceiptScanner
+    from app.services.llm_factory import LLMFactory
+
+    active = {'gemini': 0, 'openai': 0}
+    peak = {'gemini': 0, 'openai': 0}
+
+    class SlowScanner(ReceiptScanner):
+        def __init__(self, provider):
+            self.provider = provider
+
+        def scan_receipt(self, image_path):
+            raise AssertionError("sync path should not be used")
+
+        async def scan_receipt_async(self, image_path):
+            active[self.provider] += 1
+            peak[self.provider] = max(peak[self.provider], active[self.provider])
+            await asyncio.sleep(0.01)
+            active[self.provider] -= 1
+            if self.provider == 'gemini':
+                raise RuntimeError("gemini is down")
+            return ExpenseCreate(date=date.today(), category="Lebensmittel", amount=Decimal("1.00"),
+                                 receipt_image_path=image_path)
+
+    monkeypatch.setattr(settings, 'AI_PROVIDER', 'gemini')
+    monkeypatch.setattr(settings, 'SCAN_FALLBACK_PROVIDERS', ['openai'])
+    monkeypatch.setattr(settings, 'SCAN_MAX_CONCURRENCY', 2)
+    monkeypatch.setattr(settings, 'SCAN_BREAKER_MIN_CALLS', 100)
+    monkeypatch.setattr(FallbackScanner, '_breakers', {})
+    monkeypatch.setattr(FallbackScanner, '_semaphores', {})
+    monkeypatch.setattr(LLMFactory, 'get_provider_scanner', staticmethod(SlowScanner))
+
+    async def scan_many():
+        return await asyncio.gather(*(ReceiptService.scan_receipt(f"r{i}.jpg") for i in range(10)))
+
+    results = run_async(scan_many())
+
+    assert len(results) == 10
+    assert peak == {'gemini': 2, 'openai': 2}
+
+def test_scan_with_retry_retries_only_rate_limits(monkeypatch):
+    """
+    Test that scan_with_retry retries rate-limited scans and raises other errors at once.
+    """
+    from app.interfaces.scanner import ReceiptScanner
+    from app.services.llm_factory import LLMFactory
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    calls = {}
+
+    class FlakyScanner(ReceiptScanner):
+        def scan_receipt(self, image_path):
+            raise AssertionError("sync path should not be used")
+
+        async def scan_receipt_async(self, image_path):
+            calls[image_path] = calls.get(image_path, 0) + 1
+            if image_path == "broken.jpg":
+                raise ValueError("unreadable receipt")
+            if calls[image_path] == 1:
+                raise RateLimitError("Too Many Requests")
+            return ExpenseCreate(date=date.today(), category="Lebensmittel", amount=Decimal("2.50"),
+                                 receipt_image_path=image_path)
+
+    monkeypatch.setattr(settings, 'SCAN_RETRY_BASE_DELAY_SECONDS', 0)
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: FlakyScanner()))
+
+    result = run_async(ReceiptService.scan_with_retry("a.jpg"))
+    assert result.amount == Decimal("2.50")
+    assert calls["a.jpg"] == 2
+
+    # Non rate-limit errors are raised, not retried
+    with pytest.raises(ValueError):
+        run_async(ReceiptService.scan_with_retry("broken.jpg"))
+    assert calls["broken.jpg"] == 1
+
+def test_scan_receipts_batches_requests_and_splits_inconsistent_answers(monkeypatch):
+    """
+    Test that scan_receipts packs receipts into multi-image requests and splits a batch
+    whose answer does not match its images.
+    """
+    from app.interfaces.scanner import ReceiptScanner
+    from app.services.llm_factory import LLMFactory
+    from app.utils.ai_parsing import AIResponseParseError
+
+    requests = []
+
+    class BatchScanner(ReceiptScanner):
+        max_batch_size = 4
+
+        def scan_receipt(self, image_path):
+            raise AssertionError("sync path should not be used")
+
+        async def scan_image_async(self, image):
+            requests.append([image.path])
+            return ExpenseCreate(date=date.today(), category="Lebensmittel", amount=Decimal("3.00"),
+                                 description=image.path, receipt_image_path=image.path)
+
+        async def scan_images_async(self, images):
+            paths = [image.path for image in images]
+            requests.append(paths)
+            if "merged.jpg" in paths:
+                # e.g. the model returned one entry for two receipts
+                raise AIResponseParseError("Expected 4 receipts, got 3")
+            return [ExpenseCreate(date=date.today(), category="Lebensmittel", amount=Decimal("3.00"),
+                                  description=path, receipt_image_path=path) for path in paths]
+
+    monkeypatch.setattr(settings, 'SCAN_CACHE_ENABLED', False)
+    monkeypatch.setattr(settings, 'SCAN_BATCH_MAX_IMAGES', 5)
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: BatchScanner()))
+
+    paths = ["a.jpg", "b.jpg", "c.jpg", "merged.jpg", "d.jpg", "e.jpg"]
+    outcomes = run_async(ReceiptService.scan_receipts(paths))
+
+    assert [path for path, _, _ in outcomes] == paths
+    assert all(error is None and result.description == path for path, result, error in outcomes)
+    # Capped by max_batch_size; the inconsistent batch is halved until the culprit scans alone
+    assert requests[:2] == [["a.jpg", "b.jpg", "c.jpg", "merged.jpg"], ["d.jpg", "e.jpg"]]
+    assert ["a.jpg", "b.jpg"] in requests and ["merged.jpg"] in requests
+    assert len(requests) == 6
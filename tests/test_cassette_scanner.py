@@ -0,0 +1,78 @@
+import asyncio
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.adapters.cassette_scanner import CassetteScanner
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner
+from app.utils.scan_usage import collect_scan_usage, report_usage
+
+
+class ProviderStub(ReceiptScanner):
+    def __init__(self):
+        self.calls = 0
+
+    def scan_receipt(self, image_path):
+        raise NotImplementedError
+
+    async def scan_image_async(self, image):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        report_usage('gemini', 'gemini-1.5-flash', 1200, 40)
+        return ExpenseCreate(date=date(2025, 12, 6), category="Lebensmittel", description=f"Shop {self.calls}",
+                             amount=Decimal("20.13"), receipt_image_path=image.path)
+
+
+def scan(scanner, path, data):
+    async def run():
+        with collect_scan_usage() as usage:
+            result = await scanner.scan_image_async(ReceiptImage(path, data=data))
+        return result, usage
+    return asyncio.run(run())
+
+
+def test_recorded_scans_replay_offline(tmp_path):
+    cassette = str(tmp_path / 'scans.jsonl')
+    provider = ProviderStub()
+    recorder = CassetteScanner(cassette, mode='record', inner=lambda: provider)
+    scan(recorder, 'a.jpg', b'receipt a')
+    scan(recorder, 'b.jpg', b'receipt b')
+
+    player = CassetteScanner(cassette, mode='replay', time_scale=0)
+    result, usage = scan(player, 'copy_of_b.jpg', b'receipt b')
+
+    assert provider.calls == 2
+    assert result.description == 'Shop 2'
+    assert result.receipt_image_path == 'copy_of_b.jpg'
+    # Replays report the recorded usage, so scan telemetry sees realistic tokens
+    assert (usage.provider, usage.input_tokens, usage.output_tokens) == ('gemini', 1200, 40)
+
+
+def test_replay_keeps_recorded_timing_scaled(tmp_path):
+    cassette = str(tmp_path / 'scans.jsonl')
+    scan(CassetteScanner(cassette, mode='record', inner=ProviderStub), 'a.jpg', b'receipt a')
+
+    start = time.monotonic()
+    scan(CassetteScanner(cassette, mode='replay', time_scale=2.0), 'a.jpg', b'receipt a')
+    assert time.monotonic() - start >= 0.1
+
+
+def test_unknown_images_replay_a_recorded_scan_deterministically(tmp_path):
+    cassette = str(tmp_path / 'scans.jsonl')
+    provider = ProviderStub()
+    recorder = CassetteScanner(cassette, mode='record', inner=lambda: provider)
+    for name in ('a', 'b', 'c'):
+        scan(recorder, f'{name}.jpg', name.encode())
+
+    player = CassetteScanner(cassette, mode='replay', time_scale=0)
+    first, _ = scan(player, 'new.jpg', b'never recorded')
+    second, _ = scan(player, 'new.jpg', b'never recorded')
+    assert first == second
+
+
+def test_replay_without_cassette_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        scan(CassetteScanner(str(tmp_path / 'missing.jsonl'), mode='replay'), 'a.jpg', b'a')
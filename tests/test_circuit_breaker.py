@@ -0,0 +1,126 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.adapters.fallback_scanner import FallbackScanner
+from app.core.config import settings
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class StubScanner(ReceiptScanner):
+    def __init__(self, name, fail=False, delay=0.0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def scan_receipt(self, image_path):
+        raise NotImplementedError
+
+    async def scan_image_async(self, image):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return ExpenseCreate(date=date(2024, 1, 1), category="Lebensmittel", description=self.name,
+                             amount=Decimal("1.00"), receipt_image_path=image.path)
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers(monkeypatch):
+    monkeypatch.setattr(FallbackScanner, '_breakers', {})
+    monkeypatch.setattr(settings, 'SCAN_BREAKER_MIN_CALLS', 2)
+    monkeypatch.setattr(settings, 'SCAN_BREAKER_FAILURE_RATE', 0.5)
+
+
+def scan(scanner):
+    return asyncio.run(scanner.scan_image_async(ReceiptImage('receipt.jpg')))
+
+
+def test_breaker_opens_then_lets_one_trial_call_through():
+    now = [0.0]
+    breaker = CircuitBreaker('gemini', min_calls=2, failure_rate=0.5, open_seconds=30, clock=lambda: now[0])
+    breaker.record_success(1.0)
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now[0] = 31.0
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call while half-open
+    breaker.record_success(1.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker('openai', min_calls=2, failure_rate=1.0, slow_call_seconds=5)
+    breaker.record_success(6.0)
+    breaker.record_success(7.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_failing_provider_falls_back_and_is_skipped_once_open():
+    scanners = {'gemini': StubScanner('gemini', fail=True), 'openai': StubScanner('openai')}
+    for _ in range(3):
+        result = scan(FallbackScanner(['gemini', 'openai'], scanners.__getitem__))
+        assert result.description == 'openai'
+
+    # The breaker opened after two failures, so the third scan went straight to openai
+    assert scanners['gemini'].calls == 2
+    states = {state['name']: state['state'] for state in FallbackScanner.get_breaker_states()}
+    assert states == {'gemini': 'open', 'openai': 'closed'}
+
+
+def test_scans_fail_fast_when_every_breaker_is_open():
+    scanner = StubScanner('gemini', fail=True)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            scan(FallbackScanner(['gemini'], lambda name: scanner))
+
+    with pytest.raises(CircuitOpenError):
+        scan(FallbackScanner(['gemini'], lambda name: scanner))
+    assert scanner.calls == 2
+
+
+def test_hanging_provider_is_timed_out(monkeypatch):
+    monkeypatch.setattr(settings, 'SCAN_PROVIDER_TIMEOUT_SECONDS', 0.05)
+    scanners = {'gemini': StubScanner('gemini', delay=5), 'openai': StubScanner('openai')}
+    assert scan(FallbackScanner(['gemini', 'openai'], scanners.__getitem__)).description == 'openai'
+
+
+def test_cancelled_half_open_trial_is_released(monkeypatch):
+    monkeypatch.setattr(settings, 'SCAN_BREAKER_OPEN_SECONDS', 0)
+    failing = StubScanner('gemini', fail=True)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            scan(FallbackScanner(['gemini'], lambda name: failing))
+    breaker = FallbackScanner.get_breaker('gemini')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    async def cancel_trial():
+        slow = StubScanner('gemini', delay=5)
+        trial = asyncio.create_task(FallbackScanner(['gemini'], lambda name: slow).scan_image_async(ReceiptImage('receipt.jpg')))
+        await asyncio.sleep(0.01)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # E.g. a hedge cancelling its losing primary during the trial call
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(cancel_trial())
+    # The cancelled trial is neither a failure nor a success; the next call gets the trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert scan(FallbackScanner(['gemini'], lambda name: StubScanner('gemini'))).description == 'gemini'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_testing_stub_is_never_a_fallback(monkeypatch):
+    from app.services.llm_factory import LLMFactory
+
+    monkeypatch.setattr(settings, 'AI_PROVIDER', 'gemini')
+    monkeypatch.setattr(settings, 'SCAN_FALLBACK_PROVIDERS', ['testing', 'openai'])
+    assert LLMFactory.get_scanner().providers == ['gemini', 'openai']
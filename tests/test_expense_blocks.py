@@ -0,0 +1,130 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from app.db.models import Expense
+from app.services.expense_service import ExpenseService
+from app.ui.history import MobileRows
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    start = date(2024, 1, 1)
+    session.add_all([
+        Expense(
+            date=start + timedelta(days=i),
+            type='income' if i % 10 == 0 else 'expense',
+            category='Gehalt' if i % 10 == 0 else 'Lebensmittel',
+            description=f"{'Billa' if i % 2 else 'Spar'} {i}",
+            amount=Decimal(i + 1),
+            amount_eur=Decimal(i + 1),
+        )
+        for i in range(250)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_blocks_page_through_all_rows_newest_first(db):
+    first, last_row = ExpenseService.get_expense_block(db, 0, 100)
+    assert last_row == 250  # counted with the first block
+    assert [e.date for e in first] == sorted((e.date for e in first), reverse=True)
+
+    middle, last_row = ExpenseService.get_expense_block(db, 100, 200)
+    assert last_row == -1
+    end, last_row = ExpenseService.get_expense_block(db, 200, 300)
+    assert last_row == 250 and len(end) == 50
+    assert len({e.id for e in first + middle + end}) == 250
+
+
+def test_sort_and_column_filters_run_in_sql(db):
+    rows, last_row = ExpenseService.get_expense_block(
+        db, 0, 10,
+        sort_model=[{'colId': 'amount', 'sort': 'asc'}],
+        filter_model={
+            'description': {'filterType': 'text', 'type': 'startsWith', 'filter': 'billa'},
+            'amount': {'filterType': 'number', 'type': 'inRange', 'filter': 10, 'filterTo': 50},
+            'date': {'filterType': 'date', 'type': 'greaterThan', 'dateFrom': '2024-01-20 00:00:00'},
+        },
+        expense_type='expense',
+    )
+    amounts = [int(e.amount) for e in rows]
+    assert amounts == sorted(amounts)
+    assert all(e.description.startswith('Billa') and 10 <= e.amount <= 50 and e.type == 'expense' for e in rows)
+    assert all(e.date > date(2024, 1, 20) for e in rows)
+    assert len(rows) == 10 and last_row == 15  # odd offsets 21..49
+
+
+def test_combined_conditions_and_unknown_columns(db):
+    rows, _ = ExpenseService.get_expense_block(
+        db, 0, 500,
+        filter_model={
+            'amount': {'filterType': 'number', 'operator': 'OR', 'conditions': [
+                {'filterType': 'number', 'type': 'lessThan', 'filter': 3},
+                {'filterType': 'number', 'type': 'greaterThan', 'filter': 248},
+            ]},
+            'receipt_image_path': {'filterType': 'text', 'type': 'contains', 'filter': 'x'},
+        },
+        sort_model=[{'colId': 'nope', 'sort': 'asc'}],
+    )
+    assert sorted(int(e.amount) for e in rows) == [1, 2, 249, 250]
+
+
+def test_writes_return_the_changed_row(db):
+    expense_id = ExpenseService.get_expense_block(db, 0, 1)[0][0].id
+
+    updated = ExpenseService.update_expense(db, expense_id, {'amount': 12.5, 'description': 'Hofer'})
+    assert (updated.id, updated.description, float(updated.amount_eur)) == (expense_id, 'Hofer', 12.5)
+
+    deleted = ExpenseService.delete_expense(db, expense_id)
+    assert (deleted.id, deleted.description) == (expense_id, 'Hofer')  # still readable after the commit
+    assert ExpenseService.get_expense(db, expense_id) is None
+    assert ExpenseService.delete_expense(db, expense_id) is None
+    assert ExpenseService.update_expense(db, expense_id, {'description': 'x'}) is None
+
+
+def test_mobile_list_appends_blocks_until_the_end(db):
+    rows = MobileRows(block_size=30)
+    filters = {'type': 'income'}  # 25 rows
+
+    assert rows.wants_block(0)
+    first = rows.next_block(db, filters)
+    assert len(first) == 25 and rows.last_row == 25
+    assert [item['id'] for item in first] == rows.ids
+    # Everything is loaded: scrolling to the end fetches nothing more
+    assert not rows.has_more and not rows.wants_block(24)
+
+    rows.reset()
+    assert rows.ids == [] and rows.wants_block(0)
+
+
+def test_mobile_list_loads_near_the_end_of_the_loaded_rows(db):
+    rows = MobileRows(block_size=30)
+    first = rows.next_block(db, {})
+    assert len(first) == 30 and rows.last_row == 250
+    assert not rows.wants_block(10) and rows.wants_block(15)
+
+    blocks = [first]
+    while rows.has_more:
+        blocks.append(rows.next_block(db, {}))
+    # Blocks continue without gaps up to the last row, however many there are
+    assert [len(b) for b in blocks] == [30] * 8 + [10]
+    assert len(set(rows.ids)) == 250 and not rows.wants_block(249)
+
+
+def test_mobile_list_patches_single_rows_by_index(db):
+    rows = MobileRows(block_size=30)
+    rows.next_block(db, {})
+    deleted_id, next_id = rows.ids[5], rows.ids[6]
+
+    assert rows.index(next_id) == 6
+    ExpenseService.delete_expense(db, deleted_id)
+    assert rows.remove(deleted_id) == 5 and rows.last_row == 249
+    assert rows.index(next_id) == 5 and rows.remove(deleted_id) is None
+
+    # The next block starts right after the loaded rows, so no row is skipped by the shift
+    rows.next_block(db, {})
+    expected = [e.id for e in ExpenseService.get_expense_block(db, 0, 59)[0]]
+    assert rows.ids == expected
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.adapters.hedged_scanner import HedgedScanner
+from app.core.config import settings
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptImage, ReceiptScanner
+
+
+class StubScanner(ReceiptScanner):
+    """Local stand-in for a provider with a fixed latency."""
+
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.cancelled = False
+
+    def scan_receipt(self, image_path):
+        raise NotImplementedError
+
+    async def scan_image_async(self, image):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return ExpenseCreate(date=date(2024, 1, 1), category="Lebensmittel", description=self.name,
+                             amount=Decimal("1.00"), receipt_image_path=image.path)
+
+
+@pytest.fixture(autouse=True)
+def reset_hedging(monkeypatch):
+    monkeypatch.setattr(HedgedScanner, '_windows', {})
+    monkeypatch.setattr(HedgedScanner, '_stats', {'scans': 0, 'hedged': 0, 'secondary_wins': 0, 'saved_seconds': 0.0})
+    monkeypatch.setattr(settings, 'SCAN_HEDGE_DEFAULT_DELAY_SECONDS', 0.05)
+    monkeypatch.setattr(settings, 'SCAN_HEDGE_MIN_DELAY_SECONDS', 0.01)
+    monkeypatch.setattr(settings, 'SCAN_HEDGE_MIN_SAMPLES', 5)
+
+
+def scan(scanner):
+    return asyncio.run(scanner.scan_image_async(ReceiptImage('receipt.jpg')))
+
+
+def test_fast_primary_is_not_hedged():
+    secondary = StubScanner('secondary', 0.0)
+    result = scan(HedgedScanner(StubScanner('primary', 0.0), secondary))
+
+    assert result.description == 'primary'
+    assert HedgedScanner.get_stats()['hedged'] == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary = StubScanner('primary', 1.0)
+    result = scan(HedgedScanner(primary, StubScanner('secondary', 0.0)))
+
+    assert result.description == 'secondary'
+    assert primary.cancelled
+    stats = HedgedScanner.get_stats()
+    assert stats['hedged'] == stats['secondary_wins'] == 1
+
+
+def test_failed_primary_falls_through_to_secondary_without_waiting():
+    scanner = HedgedScanner(StubScanner('primary', 0.0, fail=True), StubScanner('secondary', 0.0))
+    assert scan(scanner).description == 'secondary'
+
+
+def test_error_is_raised_when_both_providers_fail():
+    scanner = HedgedScanner(StubScanner('primary', 0.0, fail=True), StubScanner('secondary', 0.0, fail=True))
+    with pytest.raises(RuntimeError, match='primary failed'):
+        scan(scanner)
+
+
+def test_hedge_delay_follows_primary_p95():
+    primary = StubScanner('primary', 0.0)
+    scanner = HedgedScanner(primary, StubScanner('secondary', 0.0))
+    assert scanner.hedge_delay() == settings.SCAN_HEDGE_DEFAULT_DELAY_SECONDS
+
+    for latency in [0.02] * 18 + [0.2, 0.3]:
+        scanner.window.add(latency)
+    assert scanner.hedge_delay() == 0.2
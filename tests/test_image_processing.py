@@ -0,0 +1,96 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.utils.image_processing import estimate_decode_cost, normalize_receipt_image, prepare_scan_image
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+def encode_jpeg(image, **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90, **kwargs)
+    return buffer.getvalue()
+
+
+def test_large_photo_is_reduced_to_max_size():
+    with Image.open(os.path.join(TEST_RECEIPTS_DIR, 'spar_1.jpeg')) as img:
+        # Simulate a 12 MP phone photo
+        photo = encode_jpeg(img.convert('RGB').resize((3024, 4032)))
+
+    data = normalize_receipt_image(photo, max_size=1200, quality=75)
+
+    with Image.open(io.BytesIO(data)) as result:
+        assert result.format == 'JPEG'
+        assert result.size == (900, 1200)
+
+
+def test_exif_orientation_is_applied():
+    landscape = Image.new('RGB', (400, 200), 'white')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotate 90 CW on display
+    data = normalize_receipt_image(encode_jpeg(landscape, exif=exif), max_size=1200, quality=75)
+
+    with Image.open(io.BytesIO(data)) as result:
+        assert result.size == (200, 400)
+        assert result.getexif().get(0x0112) in (None, 1)
+
+
+def test_png_keeps_requested_output_format():
+    buffer = io.BytesIO()
+    Image.new('RGBA', (50, 80), (255, 0, 0, 128)).save(buffer, format='PNG')
+    data = normalize_receipt_image(buffer.getvalue(), max_size=1200, quality=75, output_format='PNG')
+
+    with Image.open(io.BytesIO(data)) as result:
+        assert result.format == 'PNG'
+        assert result.mode == 'RGB'
+
+
+@pytest.mark.parametrize('bad_bytes', [b'notanimage', b'\xff\xd8\xff\xe0' + b'\x00' * 32])
+def test_invalid_or_truncated_images_raise_value_error(bad_bytes):
+    with pytest.raises(ValueError):
+        normalize_receipt_image(bad_bytes, max_size=1200, quality=75)
+
+
+def encode_heic(image, thumbnails):
+    buffer = io.BytesIO()
+    image.save(buffer, format='HEIF', quality=60, thumbnails=thumbnails, enc_params={'preset': 'ultrafast'})
+    return buffer.getvalue()
+
+
+def test_heic_uses_embedded_thumbnail_when_it_covers_the_target():
+    with Image.open(os.path.join(TEST_RECEIPTS_DIR, 'spar_1.jpeg')) as img:
+        photo = img.convert('RGB').resize((1800, 2400))
+
+    # A 1300px thumbnail covers the 1200px target: only the thumbnail is decoded
+    with_thumbnail = encode_heic(photo, thumbnails=[1300])
+    assert estimate_decode_cost(with_thumbnail, max_size=1200) <= 1000 * 1300 * 3 * 2
+    # Without one the full image is decoded and reduced
+    without_thumbnail = encode_heic(photo, thumbnails=[256])
+    assert estimate_decode_cost(without_thumbnail, max_size=1200) == 1800 * 2400 * 3 * 2
+
+    for heic in (with_thumbnail, without_thumbnail):
+        with Image.open(io.BytesIO(normalize_receipt_image(heic, max_size=1200, quality=75))) as result:
+            assert result.format == 'JPEG'
+            assert max(result.size) == 1200
+
+
+def test_scan_image_is_cropped_to_receipt_and_grayscale():
+    # White receipt with text lines on a dark table
+    photo = Image.new('RGB', (1200, 1600), (60, 45, 40))
+    receipt = Image.new('RGB', (500, 1400), 'white')
+    for y in range(50, 1350, 40):
+        receipt.paste((20, 20, 20), (40, y, 460, y + 8))
+    photo.paste(receipt, (350, 100))
+
+    data = prepare_scan_image(encode_jpeg(photo), max_size=1600, quality=80, tile_size=512)
+
+    with Image.open(io.BytesIO(data)) as result:
+        assert result.mode == 'L'
+        width, height = result.size
+        # Cropped close to the 500x1400 receipt, then fitted to whole 512px tiles where cheap
+        assert 400 <= width <= 600
+        assert height <= 1536
+        assert len(data) < len(encode_jpeg(photo))
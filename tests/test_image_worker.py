@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.image_worker import ImageQueueFullError, ImageWorkerPool, MemoryBudget
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, 'IMAGE_WORKER_PROCESSES', 1)
+    monkeypatch.setattr(settings, 'IMAGE_QUEUE_MAX_DEPTH', 1)
+    monkeypatch.setattr(settings, 'IMAGE_JOB_TIMEOUT_SECONDS', 30.0)
+    worker_pool = ImageWorkerPool()
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+def test_queue_positions_and_backpressure(pool):
+    positions = []
+
+    async def scenario():
+        first = asyncio.create_task(pool.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pool.run(time.sleep, 0, on_position=positions.append))
+        await asyncio.sleep(0)
+
+        # One job running, one waiting: the queue is at its depth limit
+        with pytest.raises(ImageQueueFullError):
+            await pool.run(time.sleep, 0)
+
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+    assert positions == [1, 0]
+    assert pool.waiting == 0
+
+
+def test_timed_out_job_recycles_the_pool(pool, monkeypatch):
+    monkeypatch.setattr(settings, 'IMAGE_JOB_TIMEOUT_SECONDS', 0.5)
+
+    async def scenario():
+        await pool.start()
+        workers = list(pool._executor._processes.values())
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 5, memory_cost=1024)
+        # The stuck worker is killed before its memory reservation is released
+        assert not any(worker.is_alive() for worker in workers)
+        assert pool.memory_budget.in_use == 0
+        # Fresh processes pick up new work right away
+        return await pool.run(abs, -3)
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_memory_budget_queues_then_rejects(monkeypatch):
+    monkeypatch.setattr(settings, 'UPLOAD_MEMORY_BUDGET_MB', 1)
+    monkeypatch.setattr(settings, 'UPLOAD_BUDGET_WAIT_SECONDS', 0.2)
+    budget = MemoryBudget()
+    half = budget.capacity // 2 + 1
+    order = []
+
+    async def job(name, hold):
+        async with budget.reserve(half):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        # The second job does not fit next to the first and waits for it to finish
+        await asyncio.gather(job('first', 0.1), job('second', 0))
+        # A job that would wait longer than UPLOAD_BUDGET_WAIT_SECONDS is rejected
+        holder = asyncio.create_task(job('holder', 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(ImageQueueFullError):
+            await job('rejected', 0)
+        await holder
+
+    asyncio.run(scenario())
+    assert order == ['first', 'second', 'holder']
+    assert budget.in_use == 0
+
+
+def test_image_larger_than_the_budget_runs_alone(monkeypatch):
+    monkeypatch.setattr(settings, 'UPLOAD_MEMORY_BUDGET_MB', 1)
+    monkeypatch.setattr(settings, 'UPLOAD_BUDGET_WAIT_SECONDS', 1.0)
+    budget = MemoryBudget()
+    order = []
+
+    async def job(name, nbytes, hold):
+        async with budget.reserve(nbytes):
+            order.append((name, budget.in_use))
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        small = asyncio.create_task(job('small', budget.capacity // 4, 0.1))
+        await asyncio.sleep(0)
+        # Waits for the small job, then holds the whole budget instead of being rejected
+        await job('huge', budget.capacity * 3, 0)
+        await small
+
+    asyncio.run(scenario())
+    assert order == [('small', budget.capacity // 4), ('huge', budget.capacity)]
+    assert budget.in_use == 0
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services.loop_monitor import LoopMonitor
+
+
+def blocking_handler():
+    time.sleep(0.4)
+
+
+def test_blocking_callback_is_captured_with_its_stack(monkeypatch):
+    monkeypatch.setattr(settings, 'LOOP_MONITOR_INTERVAL_SECONDS', 0.02)
+    monkeypatch.setattr(settings, 'LOOP_BLOCKING_THRESHOLD_SECONDS', 0.1)
+    monitor = LoopMonitor()
+
+    async def scenario():
+        await monitor.start()
+        await asyncio.sleep(0.1)
+        blocking_handler()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.stalls == 1
+    stall = monitor.recent_stalls[-1]
+    assert 'blocking_handler' in stall['stack']
+    assert stall['seconds'] >= 0.3
+    assert monitor.max_lag >= 0.3
+    assert 'xpense_event_loop_blocked_total 1' in monitor.render_metrics()
+
+
+def test_short_callbacks_are_not_reported(monkeypatch):
+    monkeypatch.setattr(settings, 'LOOP_MONITOR_INTERVAL_SECONDS', 0.02)
+    monkeypatch.setattr(settings, 'LOOP_BLOCKING_THRESHOLD_SECONDS', 0.2)
+    monitor = LoopMonitor()
+
+    async def scenario():
+        await monitor.start()
+        for _ in range(5):
+            time.sleep(0.02)
+            await asyncio.sleep(0.02)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.stalls == 0
+    assert monitor.snapshot()['lag_p50'] is not None
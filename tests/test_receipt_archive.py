@@ -0,0 +1,65 @@
+import asyncio
+import io
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.db.schemas import ExpenseCreate
+from app.services.expense_service import ExpenseService
+from app.services.receipt_archiver import ReceiptArchiver
+from app.services.receipt_service import ReceiptService
+from app.services.receipt_storage_service import ReceiptStorageService
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+@pytest.fixture(autouse=True)
+def archive_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'RECEIPT_ARCHIVE_AFTER_DAYS', 30)
+    monkeypatch.setattr(settings, 'RECEIPT_ARCHIVE_FORMAT', 'WEBP')
+
+
+def save(name):
+    with open(os.path.join(TEST_RECEIPTS_DIR, name), 'rb') as f:
+        return asyncio.run(ReceiptService.save_receipt(io.BytesIO(f.read()), name))
+
+
+def test_aged_receipts_of_saved_expenses_are_archived(session_factory):
+    saved = save('spar_1.jpeg')
+    unsaved = save('hofer_1.jpeg')
+    original_size = os.path.getsize(saved)
+
+    db = session_factory()
+    ExpenseService.create_expense(db, ExpenseCreate(date=date(2024, 1, 5), category="Lebensmittel",
+                                                    amount=Decimal("3.20"), receipt_image_path=saved))
+    db.close()
+
+    archiver = ReceiptArchiver(session_factory)
+    # Nothing is old enough yet
+    assert asyncio.run(archiver.archive())['receipts'] == 0
+
+    report = asyncio.run(archiver.archive(now=datetime.now() + timedelta(days=31)))
+
+    archived = ReceiptService.archive_filename(saved, 'WEBP')
+    assert report['receipts'] == 1
+    assert report['bytes_saved'] > 0
+    assert not os.path.exists(saved) and os.path.exists(archived)
+    assert os.path.getsize(archived) < original_size
+    with Image.open(archived) as img:
+        assert max(img.size) <= settings.RECEIPT_ARCHIVE_MAX_SIZE_PX
+    # Receipts not linked to an expense are left to the retention sweeper
+    assert os.path.exists(unsaved)
+
+    # The tier is resolved transparently; the preview thumbnail is kept
+    relative = os.path.relpath(archived, ReceiptService.UPLOAD_DIR).replace(os.sep, '/')
+    assert ReceiptService.get_public_url(saved) == f"/uploads/{relative}"
+    assert ReceiptService.get_public_url(saved, size='full') == f"/uploads/{relative}"
+    assert ReceiptService.get_public_url(saved, size='thumb').endswith('.thumb.webp')
+
+    db = session_factory()
+    assert ReceiptStorageService.get_tier_stats(db)['archive']['receipts'] == 1
+    db.close()
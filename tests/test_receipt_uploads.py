@@ -3,16 +3,6 @@ import os
 import pytest
 from app.services.receipt_service import ReceiptService
 
-TEST_UPLOAD_DIR = ReceiptService.UPLOAD_DIR
-
-@pytest.fixture(autouse=True)
-def cleanup_upload_dir(tmp_path, monkeypatch):
-    # Redirect upload dir to a tmp path for tests
-    monkeypatch.setattr(ReceiptService, 'UPLOAD_DIR', str(tmp_path))
-    os.makedirs(ReceiptService.UPLOAD_DIR, exist_ok=True)
-    yield
-    # cleanup handled by tmp_path
-
 def read_fixture(name):
     path = os.path.join(os.path.dirname(__file__), 'test_receipts', name)
     with open(path, 'rb') as f:
@@ -40,3 +30,151 @@ def test_safe_filename_blocks_traversal():
     result, path = asyncio.run(ReceiptService.process_receipt(io.BytesIO(img_bytes), '../evil.jpg'))
     assert os.path.exists(path)
     assert '..' not in os.path.basename(path)
+
+def test_thumbnail_and_webp_variants_saved():
+    from PIL import Image
+    img_bytes = read_fixture('spar_1.jpeg')
+    import asyncio
+    path = asyncio.run(ReceiptService.save_receipt(io.BytesIO(img_bytes), 'spar_1.jpeg'))
+    thumb_url = ReceiptService.get_public_url(path, size='thumb')
+    full_url = ReceiptService.get_public_url(path, size='full')
+    assert thumb_url.endswith('.thumb.webp')
+    assert full_url.endswith('.webp') and not full_url.endswith('.thumb.webp')
+
+    thumb_path = ReceiptService.variant_filename(path, 'thumb')
+    with Image.open(thumb_path) as thumb:
+        assert thumb.format == 'WEBP'
+        assert max(thumb.size) <= 360
+    assert os.path.getsize(thumb_path) < os.path.getsize(path)
+
+def test_public_url_falls_back_to_original_without_variants():
+    assert ReceiptService.get_public_url('legacy.jpg', size='thumb') == '/uploads/legacy.jpg'
+
+def test_duplicate_uploads_share_one_sharded_file():
+    img_bytes = read_fixture('spar_1.jpeg')
+    import asyncio
+    first = asyncio.run(ReceiptService.save_receipt(io.BytesIO(img_bytes), 'spar_1.jpeg'))
+    second = asyncio.run(ReceiptService.save_receipt(io.BytesIO(img_bytes), 'copy.jpeg'))
+
+    assert first == second
+    content_hash = os.path.splitext(os.path.basename(first))[0]
+    assert first == os.path.join(ReceiptService.UPLOAD_DIR, content_hash[:2], content_hash[2:4], content_hash + '.jpeg')
+    assert ReceiptService.get_public_url(first) == f"/uploads/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.jpeg"
+    assert len(os.listdir(os.path.dirname(first))) == 3  # original, thumbnail and WebP variant
+
+def test_uploads_are_spooled_to_disk_and_cleaned_up():
+    import asyncio
+    path = asyncio.run(ReceiptService.save_receipt(io.BytesIO(read_fixture('billa_1.jpeg')), 'billa_1.jpeg'))
+    assert os.path.exists(path)
+    # The raw upload only lives in the spool directory while it is processed
+    assert os.listdir(ReceiptService.SPOOL_DIR) == []
+
+def test_storage_index_queries_run_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    db_threads = []
+    for name in ('_find_stored_upload', '_register_stored_upload'):
+        original = getattr(ReceiptService, name)
+
+        def recorded(*args, _original=original):
+            db_threads.append(threading.get_ident())
+            return _original(*args)
+
+        monkeypatch.setattr(ReceiptService, name, staticmethod(recorded))
+
+    async def upload():
+        await ReceiptService.save_receipt(io.BytesIO(read_fixture('billa_1.jpeg')), 'billa_1.jpeg')
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(upload())
+    assert len(db_threads) == 2 and loop_thread not in db_threads
+
+def test_process_receipt_passes_encoded_bytes_to_scanner(monkeypatch):
+    from datetime import date
+    from decimal import Decimal
+    from app.core.config import settings
+    from app.db.schemas import ExpenseCreate
+    from app.interfaces.scanner import ReceiptScanner
+    from app.services.llm_factory import LLMFactory
+
+    received = []
+
+    class BytesScanner(ReceiptScanner):
+        def scan_receipt(self, image_path):
+            raise AssertionError("path based scanning should not be used")
+
+        async def scan_image_async(self, image):
+            received.append(image)
+            return ExpenseCreate(date=date(2024, 2, 1), category="Lebensmittel",
+                                 amount=Decimal("1.00"), receipt_image_path=image.path)
+
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: BytesScanner()))
+    monkeypatch.setattr(settings, 'SCAN_CACHE_ENABLED', False)
+    import asyncio
+    result, path = asyncio.run(ReceiptService.process_receipt(io.BytesIO(read_fixture('lidl_1.jpeg')), 'lidl_1.jpeg'))
+
+    image = received[0]
+    assert image.path == path == result.receipt_image_path
+    assert image.mime_type == 'image/jpeg'
+    # The bytes come from the pipeline, identical to what was written to disk
+    with open(path, 'rb') as f:
+        assert image.data == f.read()
+
+def test_scanner_profile_gets_preprocessed_image(monkeypatch):
+    from datetime import date
+    from decimal import Decimal
+    from PIL import Image
+    from app.core.config import settings
+    from app.db.schemas import ExpenseCreate
+    from app.interfaces.scanner import ReceiptScanner, ScanImageProfile
+    from app.services.llm_factory import LLMFactory
+
+    received = []
+
+    class ProfileScanner(ReceiptScanner):
+        scan_profile = ScanImageProfile(max_size=800, tile_size=512)
+
+        def scan_receipt(self, image_path):
+            raise AssertionError("path based scanning should not be used")
+
+        async def scan_image_async(self, image):
+            received.append(image)
+            return ExpenseCreate(date=date(2024, 2, 1), category="Lebensmittel",
+                                 amount=Decimal("1.00"), receipt_image_path=image.path)
+
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: ProfileScanner()))
+    monkeypatch.setattr(settings, 'SCAN_CACHE_ENABLED', False)
+    monkeypatch.setattr(settings, 'IMAGE_WORKER_PROCESSES', 0)
+    import asyncio
+    result, path = asyncio.run(ReceiptService.process_receipt(io.BytesIO(read_fixture('spar_1.jpeg')), 'spar_1.jpeg'))
+
+    image = received[0]
+    assert image.path == path == result.receipt_image_path
+    with Image.open(io.BytesIO(image.data)) as sent:
+        assert sent.mode == 'L'
+        assert max(sent.size) <= 800
+    # Only the request payload is preprocessed; the stored receipt keeps its colour image
+    with Image.open(path) as stored:
+        assert stored.mode == 'RGB'
+    assert len(image.data) < os.path.getsize(path)
+
+def test_preprocessing_reads_the_uploaded_bytes_not_the_file(monkeypatch):
+    from app.interfaces.scanner import ReceiptImage, ScanImageProfile
+    from app.services import receipt_service
+    import asyncio
+    sources = []
+
+    async def run(fn, source, *args, **kwargs):
+        sources.append(source)
+        return fn(source, *args)
+
+    monkeypatch.setattr(receipt_service.image_worker_pool, 'run', run)
+    profile = ScanImageProfile(max_size=800)
+    data = read_fixture('spar_1.jpeg')
+
+    asyncio.run(ReceiptService.prepare_scan_image(ReceiptImage('missing.jpeg', data), profile))
+    path = os.path.join(os.path.dirname(__file__), 'test_receipts', 'spar_1.jpeg')
+    asyncio.run(ReceiptService.prepare_scan_image(ReceiptImage(path), profile))
+
+    # In-memory bytes go to the worker as they are; only images without them are read from disk
+    assert sources == [data, path]
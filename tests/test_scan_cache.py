@@ -0,0 +1,144 @@
+import asyncio
+import os
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptScanner
+from app.services import receipt_service
+from app.services.llm_factory import LLMFactory
+from app.services.receipt_service import ReceiptService
+from app.services.scan_cache_service import ScanCacheService
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+class CountingScanner(ReceiptScanner):
+    calls = 0
+
+    def scan_receipt(self, image_path):
+        raise AssertionError("sync path should not be used")
+
+    async def scan_receipt_async(self, image_path):
+        CountingScanner.calls += 1
+        return ExpenseCreate(date=date(2024, 3, 2), category="Lebensmittel", description="Hofer",
+                             amount=Decimal("7.45"), receipt_image_path=image_path)
+
+
+@pytest.fixture
+def cache_db(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, 'AI_PROVIDER', 'testing')
+    monkeypatch.setattr(settings, 'SCAN_CACHE_ENABLED', True)
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: CountingScanner()))
+    CountingScanner.calls = 0
+    ScanCacheService._stats.update({'hits': 0, 'near_hits': 0, 'misses': 0})
+    return session_factory
+
+
+def write_copy(tmp_path, name, quality):
+    with Image.open(os.path.join(TEST_RECEIPTS_DIR, 'hofer_1.jpeg')) as img:
+        img = img.convert('RGB')
+        img.thumbnail((800, 800))
+        path = tmp_path / name
+        img.save(path, format='JPEG', quality=quality)
+    return str(path)
+
+
+def test_repeat_scan_is_served_from_cache(tmp_path, cache_db):
+    first = write_copy(tmp_path, 'a.jpg', 80)
+    again = tmp_path / 'b.jpg'
+    again.write_bytes(open(first, 'rb').read())
+
+    asyncio.run(ReceiptService.scan_receipt(first))
+    result = asyncio.run(ReceiptService.scan_receipt(str(again)))
+
+    assert CountingScanner.calls == 1
+    assert result.amount == Decimal("7.45")
+    # Cached results point at the receipt that was just scanned
+    assert result.receipt_image_path == str(again)
+
+    db = cache_db()
+    try:
+        stats = ScanCacheService.get_stats(db)
+    finally:
+        db.close()
+    assert stats['entries'] == 1
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_reencoded_copy_is_a_near_duplicate_hit_only_when_enabled(tmp_path, cache_db, monkeypatch):
+    monkeypatch.setattr(settings, 'SCAN_CACHE_NEAR_DUPLICATE_DISTANCE', 4)
+    asyncio.run(ReceiptService.scan_receipt(write_copy(tmp_path, 'a.jpg', 90)))
+
+    # Exact matches only by default: a near-identical image may carry different amounts
+    monkeypatch.setattr(settings, 'SCAN_CACHE_NEAR_DUPLICATE_DISTANCE', 0)
+    asyncio.run(ReceiptService.scan_receipt(write_copy(tmp_path, 'b.jpg', 40)))
+    assert CountingScanner.calls == 2
+
+    monkeypatch.setattr(settings, 'SCAN_CACHE_NEAR_DUPLICATE_DISTANCE', 4)
+    asyncio.run(ReceiptService.scan_receipt(write_copy(tmp_path, 'c.jpg', 60)))
+    assert CountingScanner.calls == 2
+    assert ScanCacheService._stats['near_hits'] == 1
+
+
+def test_exact_only_cache_does_not_decode_the_image(tmp_path, cache_db, monkeypatch):
+    def no_decode(image):
+        raise AssertionError("the dHash is only needed for near-duplicate lookups")
+
+    monkeypatch.setattr(receipt_service, 'compute_dhash', no_decode)
+    path = write_copy(tmp_path, 'a.jpg', 80)
+    asyncio.run(ReceiptService.scan_receipt(path))
+    asyncio.run(ReceiptService.scan_receipt(path))
+    assert CountingScanner.calls == 1
+
+
+def test_invalidated_scan_asks_the_provider_again(tmp_path, cache_db):
+    path = write_copy(tmp_path, 'a.jpg', 80)
+    asyncio.run(ReceiptService.scan_receipt(path))
+
+    ReceiptService.invalidate_cached_scan(path)
+    asyncio.run(ReceiptService.scan_receipt(path))
+
+    assert CountingScanner.calls == 2
+    assert ScanCacheService._stats['hits'] == 0
+
+
+def test_cache_and_telemetry_writes_run_off_the_event_loop(tmp_path, cache_db, monkeypatch):
+    loop_threads = set()
+    db_threads = []
+    for name in ('_cache_lookup', '_cache_store', '_record_telemetry'):
+        original = getattr(ReceiptService, name)
+
+        def recorded(*args, _original=original, **kwargs):
+            db_threads.append(threading.get_ident())
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(ReceiptService, name, staticmethod(recorded))
+
+    async def scan_twice(path):
+        loop_threads.add(threading.get_ident())
+        await ReceiptService.scan_receipt(path)
+        await ReceiptService.scan_receipts([path])
+
+    asyncio.run(scan_twice(write_copy(tmp_path, 'a.jpg', 80)))
+
+    assert len(db_threads) == 5  # miss, store, telemetry; then hit, telemetry
+    assert not loop_threads & set(db_threads)
+
+
+def test_cache_evicts_least_recently_used_entries(cache_db, monkeypatch):
+    monkeypatch.setattr(settings, 'SCAN_CACHE_MAX_ENTRIES', 2)
+    result = ExpenseCreate(date=date(2024, 3, 2), category="Lebensmittel", amount=Decimal("1.00"))
+
+    db = cache_db()
+    try:
+        for i in range(3):
+            ScanCacheService.store(db, f"{i:064x}", f"{i:016x}", 'testing', result)
+        assert ScanCacheService.get_stats(db)['entries'] == 2
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptScanner
+from app.services.llm_factory import LLMFactory
+from app.services.scan_job_service import ScanJobService
+from app.services.scan_worker import ScanWorkerPool
+
+
+class StubScanner(ReceiptScanner):
+    def scan_receipt(self, image_path):
+        raise AssertionError("sync path should not be used")
+
+    async def scan_receipt_async(self, image_path):
+        if "broken" in image_path:
+            raise ValueError("unreadable receipt")
+        return ExpenseCreate(date=date(2024, 5, 1), category="Lebensmittel", description="Spar",
+                             amount=Decimal("12.30"), receipt_image_path=image_path)
+
+
+def test_worker_completes_jobs_and_stores_results(session_factory, monkeypatch):
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: StubScanner()))
+    pool = ScanWorkerPool(session_factory=session_factory)
+
+    job_id = pool.enqueue("uploads/receipt_1.jpg")
+    # Re-queueing the same file while pending reuses the job
+    assert pool.enqueue("uploads/receipt_1.jpg") == job_id
+
+    assert asyncio.run(pool.process_next()) is True
+    assert asyncio.run(pool.process_next()) is False
+
+    db = session_factory()
+    try:
+        job = ScanJobService.get_jobs(db, [job_id])[0]
+        assert job.status == 'done'
+        assert job.attempts == 1
+        result = ScanJobService.get_result(job)
+        assert result.amount == Decimal("12.30")
+        assert result.receipt_image_path == "uploads/receipt_1.jpg"
+    finally:
+        db.close()
+
+
+def test_failed_jobs_retry_until_max_attempts(session_factory, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, 'SCAN_JOB_MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: StubScanner()))
+    pool = ScanWorkerPool(session_factory=session_factory)
+
+    job_id = pool.enqueue("uploads/broken.jpg")
+    asyncio.run(pool.process_next())
+    asyncio.run(pool.process_next())
+
+    db = session_factory()
+    try:
+        job = ScanJobService.get_jobs(db, [job_id])[0]
+        assert job.status == 'failed'
+        assert job.attempts == 2
+        assert "unreadable" in job.error
+    finally:
+        db.close()
+
+
+def test_failed_batch_requeues_or_fails_every_claimed_job(session_factory, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, 'SCAN_JOB_MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(settings, 'SCAN_BATCH_MAX_IMAGES', 4)
+
+    def no_scanner():
+        raise ValueError("GEMINI_API_KEY is missing")
+
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(no_scanner))
+    pool = ScanWorkerPool(session_factory=session_factory)
+    job_ids = [pool.enqueue(f"uploads/receipt_{i}.jpg") for i in range(2)]
+
+    assert asyncio.run(pool.process_next()) is True
+    db = session_factory()
+    try:
+        # Never left 'running': retried while attempts remain, then failed with the error
+        assert [job.status for job in ScanJobService.get_jobs(db, job_ids)] == ['queued', 'queued']
+        asyncio.run(pool.process_next())
+        jobs = ScanJobService.get_jobs(db, job_ids)
+        assert [(job.status, job.attempts) for job in jobs] == [('failed', 2), ('failed', 2)]
+        assert all("GEMINI_API_KEY" in job.error for job in jobs)
+    finally:
+        db.close()
+
+
+def test_interrupted_jobs_are_requeued_on_restart(session_factory):
+    db = session_factory()
+    try:
+        job = ScanJobService.enqueue(db, "uploads/receipt_2.jpg")
+        assert ScanJobService.claim_next(db).id == job.id
+        # Nothing else to claim while the job is running
+        assert ScanJobService.claim_next(db) is None
+
+        # Simulated restart
+        assert ScanJobService.requeue_stale(db) == 1
+        assert [j.id for j in ScanJobService.get_open_jobs(db)] == [job.id]
+
+        ScanJobService.dismiss(db, job.id)
+        assert ScanJobService.get_open_jobs(db) == []
+    finally:
+        db.close()
@@ -0,0 +1,68 @@
+import asyncio
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import ScanTelemetry
+from app.db.schemas import ExpenseCreate
+from app.interfaces.scanner import ReceiptScanner
+from app.services.llm_factory import LLMFactory
+from app.services.receipt_service import ReceiptService
+from app.services.scan_telemetry_service import ScanTelemetryService
+from app.utils.ai_parsing import parse_ai_response
+from app.utils.scan_usage import report_usage
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+class MeteredScanner(ReceiptScanner):
+    """Reports usage like the provider adapters; receipts named 'bad' get an unparsable answer."""
+
+    def scan_receipt(self, image_path):
+        raise AssertionError("sync path should not be used")
+
+    async def scan_image_async(self, image):
+        report_usage('gemini', 'gemini-1.5-flash', 1000, 50)
+        if 'bad' in image.path:
+            return parse_ai_response('not json', image.path)
+        return ExpenseCreate(date=date(2024, 3, 2), category="Lebensmittel", description="Spar",
+                             amount=Decimal("7.45"), receipt_image_path=image.path)
+
+
+@pytest.fixture
+def telemetry_db(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, 'SCAN_CACHE_ENABLED', False)
+    monkeypatch.setattr(LLMFactory, 'get_scanner', staticmethod(lambda: MeteredScanner()))
+    return session_factory
+
+
+def test_every_scan_is_recorded_with_usage_and_parse_outcome(tmp_path, telemetry_db):
+    good = os.path.join(TEST_RECEIPTS_DIR, 'spar_1.jpeg')
+    bad = tmp_path / 'bad.jpg'
+    bad.write_bytes(b'x' * 10)
+
+    asyncio.run(ReceiptService.scan_receipt(good, retries=2))
+    with pytest.raises(ValueError):
+        asyncio.run(ReceiptService.scan_receipt(str(bad)))
+
+    db = telemetry_db()
+    try:
+        rows = db.query(ScanTelemetry).order_by(ScanTelemetry.id).all()
+        assert [(row.provider, row.model, row.parse_ok, row.retries) for row in rows] == [
+            ('gemini', 'gemini-1.5-flash', True, 2),
+            ('gemini', 'gemini-1.5-flash', False, 0),
+        ]
+        assert rows[0].image_bytes == os.path.getsize(good)
+        assert rows[0].input_tokens == 1000 and rows[0].output_tokens == 50
+        assert rows[1].error
+
+        stats = ScanTelemetryService.get_monthly_stats(db)
+        assert len(stats) == 1
+        assert stats[0]['scans'] == 2 and stats[0]['parse_failures'] == 1
+        assert stats[0]['p95_ms'] >= stats[0]['p50_ms']
+        assert stats[0]['cost_usd'] == pytest.approx((2000 * 0.075 + 100 * 0.30) / 1_000_000)
+    finally:
+        db.close()
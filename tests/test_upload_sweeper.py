@@ -0,0 +1,67 @@
+import asyncio
+import io
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import ReceiptBlob
+from app.db.schemas import ExpenseCreate
+from app.services.expense_service import ExpenseService
+from app.services.receipt_service import ReceiptService
+from app.services.scan_job_service import ScanJobService
+from app.services.upload_sweeper import UploadSweeper
+
+TEST_RECEIPTS_DIR = os.path.join(os.path.dirname(__file__), 'test_receipts')
+
+
+@pytest.fixture(autouse=True)
+def sweep_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'UPLOAD_RETENTION_MINUTES', 60)
+    monkeypatch.setattr(settings, 'UPLOAD_SWEEP_BATCH_SIZE', 1)
+    os.makedirs(ReceiptService.UPLOAD_DIR)
+
+
+def save(name):
+    with open(os.path.join(TEST_RECEIPTS_DIR, name), 'rb') as f:
+        return asyncio.run(ReceiptService.save_receipt(io.BytesIO(f.read()), name))
+
+
+def test_sweep_removes_only_expired_unreferenced_receipts(session_factory):
+    kept_by_expense = save('spar_1.jpeg')
+    kept_by_job = save('hofer_1.jpeg')
+    expired = save('billa_1.jpeg')
+
+    db = session_factory()
+    ExpenseService.create_expense(db, ExpenseCreate(date=date(2024, 1, 5), category="Lebensmittel",
+                                                    amount=Decimal("3.20"), receipt_image_path=kept_by_expense))
+    ScanJobService.enqueue(db, kept_by_job)
+    db.close()
+
+    report = UploadSweeper(session_factory).sweep(now=datetime.now() + timedelta(hours=2))
+
+    assert report['receipts'] == 1
+    assert report['files'] == 3  # original, thumbnail and WebP variant
+    assert report['bytes'] > 0
+    assert not any(os.path.exists(path) for path in ReceiptService.stored_files(expired))
+    assert os.path.exists(kept_by_expense) and os.path.exists(kept_by_job)
+    db = session_factory()
+    assert db.query(ReceiptBlob).count() == 2
+    db.close()
+
+
+def test_sweep_keeps_recent_receipts_and_expires_legacy_flat_files(session_factory):
+    recent = save('spar_1.jpeg')
+    legacy = os.path.join(ReceiptService.UPLOAD_DIR, 'receipt_1700000000_abcd1234.jpg')
+    with open(legacy, 'wb') as f:
+        f.write(b'x' * 100)
+    old = (datetime.now() - timedelta(days=2)).timestamp()
+    os.utime(legacy, (old, old))
+
+    report = UploadSweeper(session_factory).sweep()
+
+    assert report == {'receipts': 0, 'files': 1, 'bytes': 100}
+    assert not os.path.exists(legacy)
+    assert os.path.exists(recent)